@@ -1,7 +1,37 @@
 from django.contrib import admin
+from .materialized import materialize_match
 from .models import Set,Match,PlayerPerformance
 
+
+class MaterializedMatchAdmin(admin.ModelAdmin):
+    """Rehace la representación guardada del partido tras cualquier edición en el admin"""
+
+    def match_id_of(self, obj):
+        return obj.match_id
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        materialize_match(self.match_id_of(obj))
+
+    def delete_model(self, request, obj):
+        match_id = self.match_id_of(obj)
+        super().delete_model(request, obj)
+        materialize_match(match_id)
+
+    def delete_queryset(self, request, queryset):
+        match_ids = {self.match_id_of(obj) for obj in queryset}
+        super().delete_queryset(request, queryset)
+        for match_id in match_ids:
+            materialize_match(match_id)
+
+
+class MatchAdmin(MaterializedMatchAdmin):
+
+    def match_id_of(self, obj):
+        return obj.pk
+
+
 # Register your models here.
-admin.site.register(Set)
-admin.site.register(Match)
-admin.site.register(PlayerPerformance)
\ No newline at end of file
+admin.site.register(Set, MaterializedMatchAdmin)
+admin.site.register(Match, MatchAdmin)
+admin.site.register(PlayerPerformance, MaterializedMatchAdmin)
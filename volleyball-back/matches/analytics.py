@@ -0,0 +1,223 @@
+# matches/analytics.py
+import datetime
+import os
+
+from django.utils import timezone
+from teams.models import Player
+from .exports import iter_keyset_chunks
+from .models import Match, PlayerPerformance, PointEvent, Set
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Dependencia opcional: pip install pyarrow
+    pa = None
+
+ANALYTICS_FORMATS = ('parquet', 'arrow')
+EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow'}
+CONTENT_TYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+# Categorías fijas: el mismo diccionario en todos los bloques (Arrow IPC no admite reemplazarlo)
+CATEGORIES = {
+    'point_type': [code for code, _ in PointEvent.POINT_TYPES],
+    'position': [code for code, _ in Player.POSITION_CHOICES],
+}
+
+# Tabla -> (modelo, [(columna, lookup, tipo)]). Los tipos son nombres que resuelve `_arrow_type`
+TABLES = {
+    'point_events': (PointEvent, [
+        ('id', 'id', 'int64'),
+        ('match_id', 'match_id', 'int64'),
+        ('match_date', 'match__date', 'timestamp'),
+        ('set_number', 'set__set_number', 'int16'),
+        ('sequence', 'sequence', 'int32'),
+        ('timestamp', 'timestamp', 'timestamp'),
+        ('team_id', 'team_id', 'int64'),
+        ('team', 'team__name', 'string'),
+        ('player_id', 'player_id', 'int64'),
+        ('player', 'player__name', 'string'),
+        ('jersey_number', 'player__jersey_number', 'int16'),
+        ('point_type', 'point_type', 'category'),
+        ('home_score_after', 'home_score_after', 'int16'),
+        ('away_score_after', 'away_score_after', 'int16'),
+    ]),
+    'sets': (Set, [
+        ('id', 'id', 'int64'),
+        ('match_id', 'match_id', 'int64'),
+        ('match_date', 'match__date', 'timestamp'),
+        ('set_number', 'set_number', 'int16'),
+        ('home_team_score', 'home_team_score', 'int16'),
+        ('away_team_score', 'away_team_score', 'int16'),
+        ('home_timeouts', 'home_timeouts', 'int8'),
+        ('away_timeouts', 'away_timeouts', 'int8'),
+        ('start_time', 'start_time', 'timestamp'),
+        ('end_time', 'end_time', 'timestamp'),
+        ('duration', 'duration', 'duration'),
+    ]),
+    'performances': (PlayerPerformance, [
+        ('id', 'id', 'int64'),
+        ('match_id', 'match_id', 'int64'),
+        ('match_date', 'match__date', 'timestamp'),
+        # Nulo en las filas por partido que crea `start_match`
+        ('set_number', 'set__set_number', 'int16'),
+        ('player_id', 'player_id', 'int64'),
+        ('player', 'player__name', 'string'),
+        ('position', 'player__position', 'category'),
+        ('team_id', 'player__team_id', 'int64'),
+        ('points', 'points', 'int16'),
+        ('spike_points', 'spike_points', 'int16'),
+        ('block_points', 'block_points', 'int16'),
+        ('aces', 'aces', 'int16'),
+        ('errors', 'errors', 'int16'),
+    ]),
+}
+
+
+class AnalyticsUnavailable(Exception):
+    """pyarrow no está instalado"""
+
+
+def require_pyarrow():
+    if pa is None:
+        raise AnalyticsUnavailable("La exportación columnar requiere pyarrow (pip install pyarrow).")
+
+
+def _arrow_type(name):
+    if name == 'timestamp':
+        return pa.timestamp('us', tz='UTC')
+    if name == 'duration':
+        return pa.duration('us')
+    if name == 'category':
+        return pa.dictionary(pa.int8(), pa.string())
+    return getattr(pa, name)()
+
+
+def table_schema(table):
+    require_pyarrow()
+    _, columns = TABLES[table]
+    return pa.schema([(name, _arrow_type(kind)) for name, _, kind in columns])
+
+
+def _category_array(values, categories):
+    positions = {value: index for index, value in enumerate(categories)}
+    indices = pa.array([positions.get(value) for value in values], type=pa.int8())
+    return pa.DictionaryArray.from_arrays(indices, pa.array(categories, type=pa.string()))
+
+
+def _record_batch(table, schema, rows):
+    _, columns = TABLES[table]
+    arrays = []
+    for (name, _, kind), values in zip(columns, zip(*rows)):
+        if kind == 'category':
+            arrays.append(_category_array(values, CATEGORIES[name]))
+        else:
+            arrays.append(pa.array(values, type=schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def month_bounds(season, month=None):
+    """Rango [inicio, fin) de un mes, o de la temporada entera (año natural) si `month` es None"""
+    start = datetime.datetime(season, month or 1, 1)
+    if month is None or month == 12:
+        end = datetime.datetime(season + 1, 1, 1)
+    else:
+        end = datetime.datetime(season, month + 1, 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def season_months(season):
+    """Meses de la temporada con partidos (una consulta)"""
+    start, end = month_bounds(season)
+    return [moment.month for moment in Match.objects.filter(date__gte=start, date__lt=end).datetimes('date', 'month')]
+
+
+def iter_batches(table, season, month=None, chunk_size=50_000):
+    """RecordBatches de una tabla para los partidos del mes (o temporada), leídos por bloques de id"""
+    require_pyarrow()
+    model, columns = TABLES[table]
+    schema = table_schema(table)
+    start, end = month_bounds(season, month)
+    queryset = model.objects.filter(match__date__gte=start, match__date__lt=end)
+    for rows in iter_keyset_chunks(queryset, [lookup for _, lookup, _ in columns], chunk_size=chunk_size):
+        yield _record_batch(table, schema, rows)
+
+
+class _Sink:
+    """Destino de escritura que se puede vaciar: permite enviar el archivo mientras se genera"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _open_writer(sink, schema, file_format):
+    if file_format == 'parquet':
+        return pq.ParquetWriter(sink, schema, compression='zstd')
+    return pa.ipc.new_file(sink, schema)
+
+
+def stream_table(table, season, month=None, file_format='parquet', chunk_size=50_000):
+    """
+    Genera los bytes de un archivo Parquet o Arrow IPC con una tabla de la temporada (o de un mes)
+
+    Cada bloque de filas se convierte en un RecordBatch y se envía en cuanto se escribe; la
+    memoria queda acotada a un bloque.
+    """
+    require_pyarrow()
+    sink = _Sink()
+    writer = _open_writer(sink, table_schema(table), file_format)
+    for batch in iter_batches(table, season, month, chunk_size):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def write_season(season, output_dir, file_format='parquet', tables=tuple(TABLES), chunk_size=50_000):
+    """
+    Escribe la temporada particionada en `<tabla>/season=<año>/month=<mes>/part-0.<ext>`
+
+    Returns:
+        list: (ruta, filas) de cada archivo escrito
+    """
+    require_pyarrow()
+    written = []
+    for month in season_months(season):
+        for table in tables:
+            directory = os.path.join(output_dir, table, f"season={season}", f"month={month:02d}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-0.{EXTENSIONS[file_format]}")
+            rows = 0
+            with open(path, 'wb') as output:
+                writer = _open_writer(output, table_schema(table), file_format)
+                for batch in iter_batches(table, season, month, chunk_size):
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+                writer.close()
+            written.append((path, rows))
+    return written
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class MatchesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'matches'
+
+    def ready(self):
+        # Versiones de partidos para los ETag de list/retrieve
+        from . import signals  # noqa: F401
+        # Cachés compartidas entre procesos para versiones, idempotencia y estadísticas
+        from volley_back import checks  # noqa: F401
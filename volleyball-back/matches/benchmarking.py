@@ -0,0 +1,20 @@
+# matches/benchmarking.py
+import statistics
+import time
+
+
+def percentiles(samples):
+    """Devuelve (p50, p95) de una lista de mediciones"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return statistics.median(ordered), p95
+
+
+def time_call(function, repeat):
+    """Ejecuta `function` `repeat` veces y devuelve los tiempos en milisegundos"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
@@ -0,0 +1,142 @@
+# matches/exports.py
+import csv
+import datetime
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from .models import PointEvent
+
+EXPORT_FORMATS = ('ndjson', 'csv', 'columns')
+
+# (columna exportada, lookup en PointEvent)
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('match_id', 'match_id'),
+    ('match_date', 'match__date'),
+    ('set_number', 'set__set_number'),
+    ('sequence', 'sequence'),
+    ('timestamp', 'timestamp'),
+    ('team_id', 'team_id'),
+    ('team', 'team__name'),
+    ('player_id', 'player_id'),
+    ('player', 'player__name'),
+    ('jersey_number', 'player__jersey_number'),
+    ('point_type', 'point_type'),
+    ('home_score_after', 'home_score_after'),
+    ('away_score_after', 'away_score_after'),
+]
+COLUMN_NAMES = [name for name, _ in EXPORT_COLUMNS]
+COLUMN_LOOKUPS = [lookup for _, lookup in EXPORT_COLUMNS]
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'columns': 'application/x-ndjson',
+}
+
+
+class PointEventExportParams(serializers.Serializer):
+    """Parámetros de la exportación de puntos (query string)"""
+    type = serializers.ChoiceField(choices=EXPORT_FORMATS, default='ndjson')
+    match = serializers.IntegerField(required=False)
+    team = serializers.IntegerField(required=False, help_text="Partidos en los que jugó el equipo")
+    date_from = serializers.DateField(required=False, help_text="Fecha del partido desde (inclusive)")
+    date_to = serializers.DateField(required=False, help_text="Fecha del partido hasta (inclusive)")
+    point_type = serializers.ChoiceField(choices=[code for code, _ in PointEvent.POINT_TYPES], required=False)
+
+    def validate(self, attrs):
+        if 'date_from' in attrs and 'date_to' in attrs and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from no puede ser posterior a date_to.")
+        return attrs
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def filter_point_events(params):
+    """Queryset de PointEvent según los parámetros ya validados"""
+    queryset = PointEvent.objects.all()
+    if 'match' in params:
+        queryset = queryset.filter(match_id=params['match'])
+    if 'team' in params:
+        queryset = queryset.filter(Q(match__home_team_id=params['team']) | Q(match__away_team_id=params['team']))
+    # Rangos sobre el datetime (no `__date`): se comparan valores sin convertir cada fila
+    if 'date_from' in params:
+        queryset = queryset.filter(match__date__gte=_start_of_day(params['date_from']))
+    if 'date_to' in params:
+        queryset = queryset.filter(match__date__lt=_start_of_day(params['date_to'] + datetime.timedelta(days=1)))
+    if 'point_type' in params:
+        queryset = queryset.filter(point_type=params['point_type'])
+    return queryset
+
+
+def iter_keyset_chunks(queryset, lookups, chunk_size=2000):
+    """
+    Recorre el queryset por bloques de id creciente (keyset) y produce listas de tuplas con
+    los valores de `lookups` (el primero debe ser `id`)
+
+    Cada bloque es una consulta `id > último ORDER BY id LIMIT n`, así que funciona sin
+    cursores del lado del servidor (DISABLE_SERVER_SIDE_CURSORS) y la memoria queda
+    acotada a un bloque sin importar el tamaño de la temporada.
+    """
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list(*lookups)[:chunk_size])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        yield rows
+
+
+def _value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def render_ndjson(chunks):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for rows in chunks:
+        yield ''.join(encoder.encode(dict(zip(COLUMN_NAMES, row))) + '\n' for row in rows)
+
+
+def render_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    for rows in chunks:
+        writer.writerows([['' if value is None else _value(value) for value in row] for row in rows])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Sin filas también se envía la cabecera
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def render_columns(chunks):
+    """Una línea JSON por bloque con los valores agrupados por columna"""
+    for rows in chunks:
+        values = zip(*rows)
+        yield json.dumps({
+            'rows': len(rows),
+            'columns': {name: [_value(value) for value in column] for name, column in zip(COLUMN_NAMES, values)},
+        }, ensure_ascii=False) + '\n'
+
+
+RENDERERS = {
+    'ndjson': render_ndjson,
+    'csv': render_csv,
+    'columns': render_columns,
+}
+
+
+def export_point_events(params, chunk_size=2000):
+    """Genera la exportación en el formato `params['type']` a partir de los parámetros validados"""
+    chunks = iter_keyset_chunks(filter_point_events(params), COLUMN_LOOKUPS, chunk_size=chunk_size)
+    return RENDERERS[params['type']](chunks)
@@ -0,0 +1,110 @@
+# matches/live.py
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def encode_event(event_type, data):
+    """Arma el frame Server-Sent Events una sola vez, se envíe a uno o a mil espectadores"""
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f"event: {event_type}\ndata: {payload}\n\n".encode()
+
+
+class BaseBroker:
+    """
+    Interfaz de difusión de marcadores en vivo
+
+    `publish` se llama desde código síncrono (vistas) y `subscribe` desde la vista SSE
+    asíncrona. Un broker externo (Redis pub/sub, etc.) solo necesita implementar ambos
+    métodos y configurarse en `LIVE_SCORE_BROKER`.
+    """
+
+    def publish(self, match_id, frame):
+        raise NotImplementedError
+
+    def subscribe(self, match_id):
+        """Devuelve una suscripción con `get()` asíncrono y `close()`"""
+        raise NotImplementedError
+
+
+class Subscription:
+    RESYNC_FRAME = encode_event('resync', {})
+
+    def __init__(self, broker, match_id, maxsize):
+        self.broker = broker
+        self.match_id = match_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def push(self, frame):
+        # Se ejecuta en el event loop del suscriptor
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Cliente demasiado lento: se descartan sus deltas y se le pide recargar
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.RESYNC_FRAME)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(BaseBroker):
+    """Difusión en memoria dentro de un mismo proceso (servidor local, tests, un solo worker ASGI)"""
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, match_id, frame):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(match_id, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.push, frame)
+
+    def subscribe(self, match_id):
+        subscription = Subscription(self, match_id, self.maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(match_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.match_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.match_id]
+
+    def subscriber_count(self, match_id):
+        with self._lock:
+            return len(self._subscriptions.get(match_id, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            broker_path = getattr(settings, 'LIVE_SCORE_BROKER', 'matches.live.InProcessBroker')
+            _broker = import_string(broker_path)()
+        return _broker
+
+
+def publish_live(match_id, event_type, data):
+    """Publica un delta del partido cuando la transacción en curso se confirma"""
+    frame = encode_event(event_type, {'match': int(match_id), **data})
+    transaction.on_commit(lambda: get_broker().publish(int(match_id), frame))
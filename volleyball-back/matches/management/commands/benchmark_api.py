@@ -0,0 +1,90 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from matches.benchmarking import percentiles
+from matches.models import Match, PointEvent, Set
+from teams.models import Team
+
+
+class Command(BaseCommand):
+    help = (
+        "Recorre los endpoints principales con el cliente de pruebas de DRF sobre la base configurada "
+        "(SQLite o PostgreSQL) e informa latencia p50/p95, consultas por petición y tamaño de respuesta. "
+        "Las escrituras se deshacen al terminar cada petición"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30, help="Peticiones por endpoint")
+        parser.add_argument('--json', action='store_true', help="Imprime los resultados como JSON")
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help="No vacía la caché de estadísticas entre peticiones (mide aciertos de caché)")
+
+    def handle(self, *args, **options):
+        finished = Match.objects.filter(status='finished').order_by('-pk').first()
+        live_set = Set.objects.filter(match__status='live', end_time__isnull=True).select_related('match').order_by('-pk').first()
+        team = Team.objects.order_by('pk').first()
+        if finished is None or live_set is None or team is None:
+            raise CommandError("La base no tiene datos suficientes: ejecuta antes `manage.py seed_league`")
+        scorer = PointEvent.objects.filter(set=live_set).values_list('player_id', flat=True).first() \
+            or live_set.match.home_team.players.values_list('pk', flat=True).first()
+
+        cases = [
+            ('GET equipos', 'get', reverse('team-list'), None),
+            ('GET equipo', 'get', reverse('team-detail', args=[team.pk]), None),
+            ('GET partidos', 'get', reverse('match-list'), None),
+            ('GET partidos (resumen)', 'get', reverse('match-list') + '?view=summary', None),
+            ('GET partido', 'get', reverse('match-detail', args=[finished.pk]), None),
+            ('GET partido (campos)', 'get', reverse('match-detail', args=[finished.pk]) + '?fields=id,status,sets.home_team_score,sets.away_team_score', None),
+            ('GET línea de tiempo', 'get', reverse('match-timeline', args=[live_set.match_id]), None),
+            ('GET estadísticas', 'get', reverse('statistics'), None),
+            ('GET estadísticas partido', 'get', reverse('match-statistics', args=[finished.pk]), None),
+            ('PATCH update_score', 'patch', reverse('match-update-score', args=[live_set.match_id]),
+             {'set_number': live_set.set_number, 'player_id': scorer, 'point_type': 'SPK'}),
+        ]
+
+        client = APIClient()
+        results = []
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, method, url, data in cases:
+                results.append(self.measure(client, name, method, url, data, options['repeat'], options['warm_cache']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'endpoint':<28}{'estado':>7}{'p50 ms':>10}{'p95 ms':>10}{'consultas':>11}{'bytes':>10}")
+        for row in results:
+            self.stdout.write(
+                f"{row['endpoint']:<28}{row['status']:>7}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['queries']:>11}{row['bytes']:>10}")
+
+    def measure(self, client, name, method, url, data, repeat, warm_cache):
+        timings, queries = [], []
+        for _ in range(repeat):
+            if not warm_cache:
+                # Sin caché de estadísticas se mide el trabajo real de cada petición
+                caches[getattr(settings, 'STATISTICS_CACHE_ALIAS', 'default')].clear()
+            with transaction.atomic(), CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data, format='json') if data else getattr(client, method)(url)
+                timings.append((time.perf_counter() - started) * 1000)
+                transaction.set_rollback(True)
+            queries.append(len(context.captured_queries))
+
+        p50, p95 = percentiles(timings)
+        return {
+            'endpoint': name,
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(p50, 2),
+            'p95_ms': round(p95, 2),
+            'queries': max(queries),
+            'bytes': len(response.content),
+        }
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from matches.benchmarking import percentiles, time_call
+from matches.models import Match, Set, PlayerPerformance, PointEvent
+from matches.seeding import LeagueSeeder
+from matches.timeline import state_at
+from statistic.match_statistics import compute_match_statistics
+from statistic.tracking import compute_statistics
+from weather.models import Weather
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de las consultas de puntuación y estadísticas sobre una base sembrada. "
+        "Para comparar antes/después de los índices, ejecutar tras `migrate matches 0015` y de nuevo "
+        "con todas las migraciones aplicadas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=100_000, help="Puntos a sembrar (por defecto 100000)")
+        parser.add_argument('--repeat', type=int, default=50, help="Repeticiones por consulta")
+        parser.add_argument('--keep', action='store_true', help="Conserva los datos sembrados")
+        parser.add_argument('--seed', type=int, default=1, help="Semilla aleatoria")
+
+    def handle(self, *args, **options):
+        self.seed_value = options['seed']
+        with transaction.atomic():
+            started = time.perf_counter()
+            match, totals = self.seed(options['points'])
+            self.stdout.write(
+                f"Sembrados {totals['point_events']} puntos en {time.perf_counter() - started:.1f}s")
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            self.report(self.cases(match), options['repeat'])
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def seed(self, total_points):
+        """Partidos de una liga pequeña hasta sumar unos `total_points` puntos; devuelve uno en vivo"""
+        seeder = LeagueSeeder(seed=self.seed_value)
+        teams = seeder.create_teams(8, prefix='Bench')
+        # Un partido de la liga generada tiene de media unos 180 puntos
+        totals = seeder.create_matches(teams, max(1, total_points // 180), live=1)
+        return Match.objects.filter(status='live', home_team__in=teams).order_by('-pk').first(), totals
+
+    def cases(self, match):
+        current_set = Set.objects.get(match=match, end_time__isnull=True)
+        player = PointEvent.objects.filter(set=current_set).values_list('player_id', flat=True).first()
+        return [
+            ('set por número', lambda: Set.objects.filter(match=match, set_number=current_set.set_number).first()),
+            ('set en curso', lambda: Set.objects.filter(
+                match=match, end_time__isnull=True).order_by('-set_number').first()),
+            ('rendimiento del jugador en el set', lambda: PlayerPerformance.objects.filter(
+                match=match, set=current_set, player_id=player).first()),
+            ('último punto a deshacer', lambda: PointEvent.objects.filter(
+                match=match, set=current_set, player_id=player, point_type='SPK'
+            ).order_by(F('sequence').desc(nulls_last=True), '-timestamp').first()),
+            ('último clima del partido', lambda: Weather.objects.filter(match=match).order_by('-timestamp').first()),
+            ('estado desde el registro', lambda: state_at(match.pk)),
+            ('estadísticas del partido', lambda: compute_match_statistics(match)),
+            ('estadísticas globales', compute_statistics),
+        ]
+
+    def report(self, cases, repeat):
+        self.stdout.write(f"{'consulta':<36}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, run in cases:
+            p50, p95 = percentiles(time_call(run, repeat))
+            self.stdout.write(f"{name:<36}{p50:>10.3f}{p95:>10.3f}")
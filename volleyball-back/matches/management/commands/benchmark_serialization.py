@@ -0,0 +1,92 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from matches.benchmarking import percentiles
+from matches.models import Match
+from matches.serializers import MatchSerializer
+from volley_back.query_planner import plan_queryset
+from volley_back.renderers import FastJSONRenderer, orjson
+
+CASES = [
+    # (nombre, funciones planas, renderer orjson)
+    ('DRF campo a campo + JSONRenderer', False, False),
+    ('funciones planas + JSONRenderer', True, False),
+    ('funciones planas + orjson', True, True),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el rendimiento de serialización y renderizado JSON del detalle de un partido grande "
+        "(por defecto, el de más puntos de la base; ver `manage.py seed_league`). "
+        "Los datos se cargan una vez: solo se mide CPU, no consultas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--match', type=int, default=None, help="Partido a serializar")
+        parser.add_argument('--repeat', type=int, default=50, help="Repeticiones por caso")
+        parser.add_argument('--json', action='store_true', help="Imprime los resultados como JSON")
+
+    def handle(self, *args, **options):
+        match = self.load_match(options['match'])
+        cases = [case for case in CASES if orjson is not None or not case[2]]
+        if len(cases) < len(CASES):
+            self.stderr.write("orjson no está instalado: se omite el caso con orjson (pip install orjson)")
+
+        results = [self.measure(match, *case, options['repeat']) for case in cases]
+        baseline = results[0]['total_ms']
+        for row in results:
+            row['speedup'] = round(baseline / row['total_ms'], 2) if row['total_ms'] else None
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"Partido {match.pk}: {match.event_count} puntos, {match.sets.count()} sets")
+        self.stdout.write(
+            f"{'caso':<36}{'serializar ms':>15}{'renderizar ms':>15}{'total ms':>10}{'MB/s':>8}{'x':>7}")
+        for row in results:
+            self.stdout.write(
+                f"{row['case']:<36}{row['serialize_ms']:>15.2f}{row['render_ms']:>15.2f}"
+                f"{row['total_ms']:>10.2f}{row['mb_per_s']:>8.1f}{row['speedup']:>7.2f}")
+
+    def load_match(self, match_id):
+        queryset = Match.objects.annotate(event_count=Count('point_events'))
+        if match_id is not None:
+            queryset = queryset.filter(pk=match_id)
+        else:
+            queryset = queryset.order_by('-event_count', '-pk')
+        # Sin la representación guardada de los finalizados: se mide la serialización real
+        queryset = plan_queryset(queryset.defer('materialized'), MatchSerializer)
+        match = queryset.first()
+        if match is None:
+            raise CommandError("No hay partidos: ejecuta antes `manage.py seed_league`")
+        # Primera pasada: llena la caché de planteles para que no se mida la carga de jugadores
+        MatchSerializer(match).data
+        return match
+
+    def measure(self, match, name, plain, fast_json, repeat):
+        renderer = FastJSONRenderer() if fast_json else JSONRenderer()
+        serialize, render = [], []
+        with override_settings(FAST_SERIALIZERS_ENABLED=plain, FAST_JSON_ENABLED=fast_json):
+            for _ in range(repeat):
+                started = time.perf_counter()
+                data = MatchSerializer(match).data
+                serialized = time.perf_counter()
+                content = renderer.render(data)
+                serialize.append((serialized - started) * 1000)
+                render.append((time.perf_counter() - serialized) * 1000)
+
+        serialize_ms, render_ms = percentiles(serialize)[0], percentiles(render)[0]
+        total_ms = serialize_ms + render_ms
+        return {
+            'case': name,
+            'serialize_ms': round(serialize_ms, 2),
+            'render_ms': round(render_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'bytes': len(content),
+            'mb_per_s': round(len(content) / 1_000_000 / (total_ms / 1000), 1) if total_ms else 0.0,
+        }
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from matches.analytics import ANALYTICS_FORMATS, TABLES, AnalyticsUnavailable, write_season
+
+
+class Command(BaseCommand):
+    help = (
+        "Escribe una temporada (año natural) en archivos Parquet o Arrow IPC particionados por mes: "
+        "<salida>/<tabla>/season=<año>/month=<mes>/part-0.<ext>. Requiere pyarrow"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('season', type=int, help="Año de la temporada")
+        parser.add_argument('--output', default='exports', help="Directorio de salida")
+        parser.add_argument('--format', choices=ANALYTICS_FORMATS, default='parquet', help="Formato de los archivos")
+        parser.add_argument('--tables', nargs='+', choices=list(TABLES), default=list(TABLES), help="Tablas a exportar")
+        parser.add_argument('--chunk-size', type=int, default=50_000, help="Filas leídas por consulta")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            written = write_season(options['season'], options['output'], options['format'],
+                                   options['tables'], options['chunk_size'])
+        except AnalyticsUnavailable as e:
+            raise CommandError(str(e))
+
+        for path, rows in written:
+            self.stdout.write(f"{path}: {rows} filas")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(written)} archivos escritos en {time.perf_counter() - started:.1f}s"))
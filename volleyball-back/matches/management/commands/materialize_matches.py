@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from matches.materialized import materialize_match
+from matches.models import Match
+
+
+class Command(BaseCommand):
+    help = "Guarda la representación serializada de los partidos finalizados (o la borra en los demás)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('match_ids', nargs='*', type=int, help="Partidos a procesar (por defecto, todos los finalizados)")
+
+    def handle(self, *args, **options):
+        matches = Match.objects.order_by('pk')
+        if options['match_ids']:
+            matches = matches.filter(pk__in=options['match_ids'])
+        else:
+            matches = matches.filter(status='finished')
+        match_ids = list(matches.values_list('pk', flat=True))
+
+        stored = sum(materialize_match(match_id) is not None for match_id in match_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"{stored} partido(s) finalizados guardados de {len(match_ids)} procesado(s)"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from matches.materialized import materialize_match
+from matches.models import Match
+from matches.timeline import check_projection, rebuild_projection
+
+
+class Command(BaseCommand):
+    help = "Reconstruye marcadores, tiempos fuera y rendimientos por set desde el registro de eventos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('match_ids', nargs='*', type=int, help="Partidos a procesar (por defecto, todos)")
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Solo compara las tablas con el registro, sin escribir")
+
+    def handle(self, *args, **options):
+        matches = Match.objects.order_by('pk')
+        if options['match_ids']:
+            matches = matches.filter(pk__in=options['match_ids'])
+        match_ids = list(matches.values_list('pk', flat=True))
+
+        if options['check']:
+            inconsistent = 0
+            for match_id in match_ids:
+                differences = check_projection(match_id)
+                if differences:
+                    inconsistent += 1
+                    for difference in differences:
+                        self.stderr.write(f"Partido {match_id}: {difference}")
+            if inconsistent:
+                raise CommandError(f"{inconsistent} partido(s) no coinciden con su registro de eventos")
+            self.stdout.write(self.style.SUCCESS(f"{len(match_ids)} partido(s) consistentes con su registro"))
+            return
+
+        for match_id in match_ids:
+            rebuild_projection(match_id)
+            materialize_match(match_id)
+        self.stdout.write(self.style.SUCCESS(f"Proyección reconstruida para {len(match_ids)} partido(s)"))
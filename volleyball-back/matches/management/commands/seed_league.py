@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from matches.seeding import LeagueSeeder
+from statistic.tracking import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = "Genera una liga de prueba (equipos, jugadores, partidos punto a punto y clima) con bulk_create"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', type=int, default=200, help="Equipos a crear (mitad masculinos, mitad femeninos)")
+        parser.add_argument('--players', type=int, default=12, help="Jugadores por equipo")
+        parser.add_argument('--matches', type=int, default=1000, help="Partidos finalizados")
+        parser.add_argument('--live', type=int, default=5, help="Partidos en curso")
+        parser.add_argument('--upcoming', type=int, default=20, help="Partidos por jugar")
+        parser.add_argument('--seed', type=int, default=None, help="Semilla aleatoria (para repetir la misma liga)")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Filas por INSERT")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        seeder = LeagueSeeder(seed=options['seed'], batch_size=options['batch_size'])
+        teams = seeder.create_teams(options['teams'], options['players'])
+        totals = seeder.create_matches(teams, options['matches'], live=options['live'], upcoming=options['upcoming'])
+        # bulk_create no dispara señales: los acumulados se recalculan al final
+        rebuild_statistics()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Liga generada en {time.perf_counter() - started:.1f}s: {len(teams)} equipos, "
+            f"{len(teams) * options['players']} jugadores, {totals['matches']} partidos, {totals['sets']} sets, "
+            f"{totals['point_events']} puntos, {totals['performances']} rendimientos, {totals['weather']} climas"))
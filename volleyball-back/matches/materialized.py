@@ -0,0 +1,28 @@
+# matches/materialized.py
+from volley_back.query_planner import plan_queryset
+from .models import Match
+from .serializers import MatchSerializer
+
+# Los equipos no se congelan: salen de la caché de planteles al leer (ver teams/cache.py); los
+# nombres de jugadores de `player_performances` se completan con esos planteles al renderizar
+LIVE_FIELDS = ('home_team', 'away_team')
+
+
+def materialize_match(match_id):
+    """
+    Guarda en `Match.materialized` la representación de un partido finalizado
+
+    Sets, puntos, rendimientos y clima ya no cambian, así que se serializan una sola vez y
+    los listados y detalles los devuelven tal cual. Si el partido no está finalizado se
+    borra la representación guardada. Se llama al finalizar el partido (o su último set) y
+    tras cualquier edición del partido o de su clima desde la API o el admin.
+    """
+    serializer = MatchSerializer(omit=list(LIVE_FIELDS))
+    match = plan_queryset(Match.objects.defer('materialized'), serializer).filter(pk=match_id).first()
+    if match is None:
+        return None
+    representation = None
+    if match.status == 'finished':
+        representation = MatchSerializer(match, omit=list(LIVE_FIELDS)).data
+    Match.objects.filter(pk=match_id).update(materialized=representation)
+    return representation
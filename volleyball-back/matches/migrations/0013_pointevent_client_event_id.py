@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0012_remove_match_match_notes_and_more'),
+        ('teams', '0004_rename_avatar_url_player_avatar_team_gender'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointevent',
+            name='client_event_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='pointevent',
+            constraint=models.UniqueConstraint(fields=('match', 'client_event_id'), name='unique_point_event_client_id'),
+        ),
+    ]
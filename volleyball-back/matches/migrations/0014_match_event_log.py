@@ -0,0 +1,52 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0013_pointevent_client_event_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='last_sequence',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pointevent',
+            name='sequence',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='MatchEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('point', 'Punto'), ('undo', 'Punto deshecho'), ('set_started', 'Inicio de set'), ('set_ended', 'Fin de set'), ('timeout', 'Tiempo fuera'), ('status', 'Cambio de estado'), ('weather', 'Cambio de clima')], max_length=20)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='matches.match')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('match', 'sequence'), name='unique_match_event_sequence')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MatchSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('state', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='matches.match')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('match', 'sequence'), name='unique_match_snapshot_sequence')],
+            },
+        ),
+    ]
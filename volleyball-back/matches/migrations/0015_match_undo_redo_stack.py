@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0014_match_event_log'),
+        ('teams', '0004_rename_avatar_url_player_avatar_team_gender'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='redo_head',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='undo_head',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='matchevent',
+            name='kind',
+            field=models.CharField(choices=[('point', 'Punto'), ('undo', 'Acción deshecha'), ('redo', 'Acción rehecha'), ('set_started', 'Inicio de set'), ('set_ended', 'Fin de set'), ('timeout', 'Tiempo fuera'), ('status', 'Cambio de estado'), ('weather', 'Cambio de clima')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='pointevent',
+            index=models.Index(fields=['match', 'sequence'], name='pointevent_match_seq_idx'),
+        ),
+    ]
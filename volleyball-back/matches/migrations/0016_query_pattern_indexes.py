@@ -0,0 +1,102 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:06
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+COUNTERS = ('points', 'spike_points', 'block_points', 'aces', 'errors')
+
+
+def merge_duplicate_sets(apps, schema_editor):
+    """
+    Junta en una sola fila los sets repetidos con el mismo número en un partido
+
+    Los puntos y rendimientos de las copias pasan al set que se conserva (el de menor id), que
+    suma sus marcadores; queda abierto si alguna copia lo estaba.
+    """
+    Set = apps.get_model('matches', 'Set')
+    PointEvent = apps.get_model('matches', 'PointEvent')
+    PlayerPerformance = apps.get_model('matches', 'PlayerPerformance')
+    duplicates = Set.objects.values('match', 'set_number').annotate(
+        rows=Count('id'), keep=Min('id')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        rows = list(Set.objects.filter(match=duplicate['match'], set_number=duplicate['set_number']))
+        kept = next(row for row in rows if row.pk == duplicate['keep'])
+        extra = [row.pk for row in rows if row.pk != kept.pk]
+        PointEvent.objects.filter(set__in=extra).update(set=kept)
+        PlayerPerformance.objects.filter(set__in=extra).update(set=kept)
+
+        kept.home_team_score = sum(row.home_team_score for row in rows)
+        kept.away_team_score = sum(row.away_team_score for row in rows)
+        kept.home_timeouts = max(row.home_timeouts for row in rows)
+        kept.away_timeouts = max(row.away_timeouts for row in rows)
+        start_times = [row.start_time for row in rows if row.start_time]
+        kept.start_time = min(start_times) if start_times else None
+        if any(row.end_time is None for row in rows):
+            kept.end_time = kept.duration = None
+        else:
+            kept.end_time = max(row.end_time for row in rows)
+            kept.duration = kept.end_time - kept.start_time if kept.start_time else None
+        kept.save()
+        Set.objects.filter(pk__in=extra).delete()
+
+
+def merge_duplicate_performances(apps, schema_editor):
+    """Suma en una sola fila los rendimientos repetidos de un jugador en un mismo set"""
+    PlayerPerformance = apps.get_model('matches', 'PlayerPerformance')
+    duplicates = PlayerPerformance.objects.filter(set__isnull=False).values('match', 'set', 'player').annotate(
+        rows=Count('id'), keep=Min('id')).filter(rows__gt=1)
+    for duplicate in duplicates:
+        rows = list(PlayerPerformance.objects.filter(
+            match=duplicate['match'], set=duplicate['set'], player=duplicate['player']))
+        kept = next(row for row in rows if row.pk == duplicate['keep'])
+        for counter in COUNTERS:
+            setattr(kept, counter, sum(getattr(row, counter) or 0 for row in rows))
+        kept.save(update_fields=COUNTERS)
+        PlayerPerformance.objects.filter(pk__in=[row.pk for row in rows if row.pk != kept.pk]).delete()
+
+
+def close_stale_open_sets(apps, schema_editor):
+    """Solo el último set de cada partido puede seguir abierto; los anteriores se cierran"""
+    Set = apps.get_model('matches', 'Set')
+    open_sets = Set.objects.filter(end_time__isnull=True).values('match').annotate(
+        rows=Count('id'), last=Max('set_number')).filter(rows__gt=1)
+    for row in open_sets:
+        for stale in Set.objects.filter(match=row['match'], end_time__isnull=True, set_number__lt=row['last']):
+            stale.end_time = stale.start_time or stale.match.start_time or stale.match.date
+            stale.save(update_fields=['end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0015_match_undo_redo_stack'),
+        ('teams', '0004_rename_avatar_url_player_avatar_team_gender'),
+    ]
+
+    operations = [
+        # Primero los sets: al juntarlos pueden quedar rendimientos repetidos en el set conservado
+        migrations.RunPython(merge_duplicate_sets, migrations.RunPython.noop),
+        migrations.RunPython(merge_duplicate_performances, migrations.RunPython.noop),
+        migrations.RunPython(close_stale_open_sets, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='playerperformance',
+            index=models.Index(condition=models.Q(('set__isnull', True)), fields=['match', 'player'], name='match_performance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pointevent',
+            index=models.Index(fields=['set', 'player', 'point_type', 'sequence'], name='pointevent_undo_lookup_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='playerperformance',
+            constraint=models.UniqueConstraint(condition=models.Q(('set__isnull', False)), fields=('match', 'set', 'player'), name='unique_set_performance'),
+        ),
+        migrations.AddConstraint(
+            model_name='set',
+            constraint=models.UniqueConstraint(fields=('match', 'set_number'), name='unique_set_number_per_match'),
+        ),
+        migrations.AddConstraint(
+            model_name='set',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_time__isnull', True)), fields=('match',), name='unique_open_set_per_match'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0016_query_pattern_indexes'),
+        ('teams', '0005_list_cursor_indexes'),
+        ('weather', '0002_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['date', 'id'], name='match_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0017_list_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='materialized',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,9 +1,34 @@
 # matches/models.py
 from django.db import models
+from django.db.models import Count, F, Max, Q
 from django.utils import timezone
 from teams.models import Team, Player
 
 
+class MatchQuerySet(models.QuerySet):
+    def with_summary(self):
+        """
+        Anota nombres de equipos, marcador de cada set y sets ganados en una sola consulta
+
+        Los sets se pivotean por número (1..MAX_SETS) con agregados condicionales, por lo que
+        no hace falta traer las filas de Set ni los eventos de punto.
+        """
+        finished_set = Q(sets__end_time__isnull=False)
+        set_scores = {}
+        for number in range(1, Match.MAX_SETS + 1):
+            in_set = Q(sets__set_number=number)
+            set_scores[f'set_{number}_home'] = Max('sets__home_team_score', filter=in_set)
+            set_scores[f'set_{number}_away'] = Max('sets__away_team_score', filter=in_set)
+
+        return self.annotate(
+            home_team_name=F('home_team__name'),
+            away_team_name=F('away_team__name'),
+            sets_won_home=Count('sets', filter=finished_set & Q(sets__home_team_score__gt=F('sets__away_team_score'))),
+            sets_won_away=Count('sets', filter=finished_set & Q(sets__away_team_score__gt=F('sets__home_team_score'))),
+            **set_scores,
+        )
+
+
 class Match(models.Model):
     STATUS_CHOICES = [
         ('upcoming', 'Próximamente'),
@@ -12,6 +37,8 @@ class Match(models.Model):
         ('suspended', 'Suspendido'),
         ('rescheduled', 'Reprogramado')
     ]  
+    MAX_SETS = 5
+
     home_team = models.ForeignKey(Team, related_name='home_matches', on_delete=models.CASCADE)
     away_team = models.ForeignKey(Team, related_name='away_matches', on_delete=models.CASCADE)
     date = models.DateTimeField()
@@ -25,6 +52,22 @@ class Match(models.Model):
     current_weather = models.ForeignKey('weather.Weather', on_delete=models.SET_NULL, null=True, blank=True, related_name='current_for_match')
     home_timeouts = models.PositiveIntegerField(default=0)
     away_timeouts = models.PositiveIntegerField(default=0)
+    # Último número de secuencia asignado en el registro de eventos (ver matches/timeline.py)
+    last_sequence = models.PositiveIntegerField(default=0, editable=False)
+    # Cimas de las pilas de deshacer/rehacer: secuencia del evento a deshacer y del último
+    # `undo` que se puede rehacer (0 = pila vacía)
+    undo_head = models.PositiveIntegerField(default=0, editable=False)
+    redo_head = models.PositiveIntegerField(default=0, editable=False)
+    # Representación serializada de un partido finalizado, sin los equipos (ver matches/materialized.py)
+    materialized = models.JSONField(null=True, blank=True, editable=False)
+
+    objects = MatchQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Paginación por cursor del listado de partidos (más recientes primero)
+            models.Index(fields=['date', 'id'], name='match_date_idx'),
+        ]
 
     def start_match(self):
         self.status = 'live'
@@ -46,6 +89,13 @@ class Set(models.Model):
     home_timeouts = models.PositiveIntegerField(default=0)  
     away_timeouts = models.PositiveIntegerField(default=0)  # Añadir para tiempo fuera de visitante
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['match', 'set_number'], name='unique_set_number_per_match'),
+            # Índice parcial: también sirve para buscar el set en curso de un partido
+            models.UniqueConstraint(fields=['match'], condition=Q(end_time__isnull=True), name='unique_open_set_per_match'),
+        ]
+
     def __str__(self):
         return f"Set {self.set_number} of {self.match}"
 
@@ -59,7 +109,17 @@ class PlayerPerformance(models.Model):
     block_points = models.PositiveIntegerField(default=0)
     aces = models.PositiveIntegerField(default=0)
     errors = models.PositiveIntegerField(default=0)
-    
+
+    class Meta:
+        constraints = [
+            # Una fila por jugador y set; las filas sin set (de `start_match`) quedan fuera
+            models.UniqueConstraint(
+                fields=['match', 'set', 'player'], condition=Q(set__isnull=False), name='unique_set_performance'),
+        ]
+        indexes = [
+            models.Index(fields=['match', 'player'], condition=Q(set__isnull=True), name='match_performance_idx'),
+        ]
+
     def __str__(self):
         set_info = f"Set {self.set.set_number}" if self.set else "No set"
         return f"{self.player} performance in {self.match} {set_info}"
@@ -81,3 +141,66 @@ class PointEvent(models.Model):
     home_score_after = models.PositiveIntegerField(null=True, blank=True)
     away_score_after = models.PositiveIntegerField(null=True, blank=True)
     description = models.TextField(blank=True)
+    # Identificador generado por el cliente (tablet) para reenviar lotes sin duplicar puntos
+    client_event_id = models.CharField(max_length=64, null=True, blank=True)
+    # Secuencia del MatchEvent que registró el punto (nula en puntos anteriores al registro)
+    sequence = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['match', 'client_event_id'], name='unique_point_event_client_id'),
+        ]
+        indexes = [
+            models.Index(fields=['match', 'sequence'], name='pointevent_match_seq_idx'),
+            # Deshacer desde `update_score`: último punto de un jugador y tipo en un set
+            models.Index(fields=['set', 'player', 'point_type', 'sequence'], name='pointevent_undo_lookup_idx'),
+        ]
+
+
+class MatchEvent(models.Model):
+    """
+    Registro de solo escritura de todo lo que cambia el estado de un partido
+
+    Los marcadores de Set, los rendimientos por set y los tiempos fuera son una proyección
+    de este registro: se pueden reconstruir reproduciendo los eventos desde la instantánea
+    más cercana (ver matches/timeline.py).
+    """
+    KIND_CHOICES = [
+        ('point', 'Punto'),
+        ('undo', 'Acción deshecha'),
+        ('redo', 'Acción rehecha'),
+        ('set_started', 'Inicio de set'),
+        ('set_ended', 'Fin de set'),
+        ('timeout', 'Tiempo fuera'),
+        ('status', 'Cambio de estado'),
+        ('weather', 'Cambio de clima'),
+    ]
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='events')
+    sequence = models.PositiveIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['match', 'sequence'], name='unique_match_event_sequence'),
+        ]
+
+    def __str__(self):
+        return f"#{self.sequence} {self.kind} in {self.match}"
+
+
+class MatchSnapshot(models.Model):
+    """Estado completo de un partido tras aplicar el evento `sequence`"""
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='snapshots')
+    sequence = models.PositiveIntegerField()
+    state = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['match', 'sequence'], name='unique_match_snapshot_sequence'),
+        ]
+
+    def __str__(self):
+        return f"Snapshot #{self.sequence} of {self.match}"
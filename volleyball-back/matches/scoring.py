@@ -0,0 +1,504 @@
+# matches/scoring.py
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework import status
+from teams.models import Player
+from statistic.cache import invalidate_statistics
+from statistic.tracking import record_points
+from .models import Match, MatchEvent, Set, PlayerPerformance, PointEvent
+from .timeline import append_events
+
+# Contador de PlayerPerformance que incrementa cada tipo de punto
+POINT_FIELDS = {
+    'SPK': 'spike_points',
+    'BLK': 'block_points',
+    'ACE': 'aces',
+    'ERR': 'errors'
+}
+
+# Los errores del rival suman al marcador pero no a los puntos del jugador
+SCORING_POINT_TYPES = ('SPK', 'BLK', 'ACE')
+
+
+class ScoringError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def lock_match(match_id, live_only=True):
+    """
+    Bloquea la fila del partido (SELECT ... FOR UPDATE)
+
+    Todas las escrituras de un partido (puntos, sets, tiempos fuera) bloquean primero su fila:
+    así se reparten números de secuencia del registro sin huecos y dos anotadores simultáneos
+    se serializan en lugar de pisarse los incrementos. Con `live_only=False` también se
+    bloquean partidos que no están en curso (p. ej. para cerrar el último set tras finalizarlo).
+    """
+    match = Match.objects.select_for_update().filter(pk=match_id).first()
+    if match is None:
+        raise ScoringError("Partido no encontrado", status.HTTP_404_NOT_FOUND)
+    if live_only and match.status != 'live':
+        raise ScoringError("El partido no está en curso")
+    return match
+
+
+def lock_set(match_id, set_number):
+    """Bloquea el partido y devuelve su set `set_number` leído ya bajo el bloqueo"""
+    match = lock_match(match_id)
+    current_set = Set.objects.filter(match=match, set_number=set_number).first()
+    if current_set is None:
+        raise ScoringError("Set no encontrado", status.HTTP_404_NOT_FOUND)
+    current_set.match = match
+    return current_set
+
+
+def _point_entry(kind, match, set_number, player, point_type, **extra):
+    return (kind, {
+        'set_number': int(set_number),
+        'player_id': player.pk,
+        'side': 'home' if player.team_id == match.home_team_id else 'away',
+        'point_type': point_type,
+        **extra,
+    })
+
+
+def _score_field(match, team_id):
+    return 'home_team_score' if team_id == match.home_team_id else 'away_team_score'
+
+
+def apply_point(match_id, set_number, player_id, point_type):
+    """
+    Registra un punto en el registro del partido y lo proyecta con incrementos atómicos (F())
+
+    Returns:
+        dict: home_score, away_score, performance y event ya actualizados en memoria,
+        sin volver a leer las filas
+    """
+    if point_type not in POINT_FIELDS:
+        raise ScoringError("Tipo de punto no válido")
+
+    with transaction.atomic():
+        current_set = lock_set(match_id, set_number)
+        match = current_set.match
+        counter = POINT_FIELDS[point_type]
+        scores = point_type in SCORING_POINT_TYPES
+
+        performance = PlayerPerformance.objects.select_related('player').filter(
+            match=match, set=current_set, player_id=player_id).first()
+
+        if performance is None:
+            player = Player.objects.only('id', 'name', 'team_id').filter(pk=player_id).first()
+            if player is None:
+                raise ScoringError("Registro de jugador no encontrado", status.HTTP_404_NOT_FOUND)
+            if player.team_id not in (match.home_team_id, match.away_team_id):
+                raise ScoringError("El jugador no pertenece a ninguno de los equipos del partido")
+        else:
+            player = performance.player
+
+        sequence = append_events(
+            match, [_point_entry('point', match, current_set.set_number, player, point_type)], locked=True)
+
+        if performance is None:
+            performance = PlayerPerformance.objects.create(
+                player=player, match=match, set=current_set,
+                points=1 if scores else 0, **{counter: 1})
+        else:
+            updates = {counter: F(counter) + 1}
+            if scores:
+                updates['points'] = F('points') + 1
+            PlayerPerformance.objects.filter(pk=performance.pk).update(**updates)
+            # El bloqueo del partido garantiza que el valor leído es el vigente
+            setattr(performance, counter, getattr(performance, counter) + 1)
+            if scores:
+                performance.points += 1
+
+        score_field = _score_field(match, player.team_id)
+        Set.objects.filter(pk=current_set.pk).update(**{score_field: F(score_field) + 1})
+        setattr(current_set, score_field, getattr(current_set, score_field) + 1)
+
+        event = PointEvent.objects.create(
+            match=match,
+            set=current_set,
+            player=player,
+            team_id=player.team_id,
+            timestamp=timezone.now(),
+            point_type=point_type,
+            home_score_after=current_set.home_team_score,
+            away_score_after=current_set.away_team_score,
+            description=f"Punto por {point_type} del jugador {player.name}",
+            sequence=sequence,
+        )
+        if scores:
+            record_points({player.pk: 1})
+        invalidate_statistics(match.pk)
+
+    return {
+        'home_score': current_set.home_team_score,
+        'away_score': current_set.away_team_score,
+        'performance': performance,
+        'event': event,
+    }
+
+
+def revert_point(match_id, set_number, player_id, point_type):
+    """
+    Deshace el último punto del jugador con ese tipo, bajo el mismo bloqueo que `apply_point`
+
+    El registro no se reescribe: se añade un evento `undo` que compensa al punto original.
+    """
+    if point_type not in POINT_FIELDS:
+        raise ScoringError("Tipo de punto no válido")
+
+    with transaction.atomic():
+        current_set = lock_set(match_id, set_number)
+        match = current_set.match
+        counter = POINT_FIELDS[point_type]
+
+        last_event = PointEvent.objects.filter(
+            match=match,
+            set=current_set,
+            player_id=player_id,
+            point_type=point_type
+        ).order_by(F('sequence').desc(nulls_last=True), '-timestamp').select_related('player').only(
+            'id', 'team_id', 'sequence', 'player__id', 'player__team_id').first()
+
+        if not last_event:
+            raise ScoringError("No hay eventos para deshacer")
+
+        append_events(match, [_point_entry(
+            'undo', match, current_set.set_number, last_event.player, point_type, target=last_event.sequence)],
+            locked=True)
+
+        performance = PlayerPerformance.objects.select_related('player').filter(
+            match=match, set=current_set, player_id=player_id).first()
+        if performance is not None and getattr(performance, counter) > 0:
+            updates = {counter: F(counter) - 1}
+            if point_type in SCORING_POINT_TYPES and performance.points > 0:
+                updates['points'] = F('points') - 1
+                performance.points -= 1
+                record_points({performance.player_id: -1})
+            PlayerPerformance.objects.filter(pk=performance.pk).update(**updates)
+            setattr(performance, counter, getattr(performance, counter) - 1)
+
+        score_field = _score_field(match, last_event.team_id)
+        if getattr(current_set, score_field) > 0:
+            Set.objects.filter(pk=current_set.pk).update(**{score_field: F(score_field) - 1})
+            setattr(current_set, score_field, getattr(current_set, score_field) - 1)
+
+        last_event.delete()
+        invalidate_statistics(match.pk)
+
+    return {
+        'home_score': current_set.home_team_score,
+        'away_score': current_set.away_team_score,
+        'performance': performance,
+    }
+
+
+def _stack_payload(payload):
+    # Campos de la acción, sin los punteros de las pilas
+    return {key: value for key, value in payload.items()
+            if key not in ('previous', 'target', 'redo_previous', 'action')}
+
+
+def _shift_point(match, current_set, payload, sign):
+    """Suma (sign=1) o resta (sign=-1) un punto ya registrado en marcador y rendimiento"""
+    point_type = payload['point_type']
+    counter = POINT_FIELDS[point_type]
+    score_field = 'home_team_score' if payload['side'] == 'home' else 'away_team_score'
+    if sign > 0 or getattr(current_set, score_field) > 0:
+        Set.objects.filter(pk=current_set.pk).update(**{score_field: F(score_field) + sign})
+        setattr(current_set, score_field, getattr(current_set, score_field) + sign)
+
+    performance = PlayerPerformance.objects.select_related('player').filter(
+        match=match, set=current_set, player_id=payload['player_id']).first()
+    if performance is None:
+        if sign < 0:
+            return None
+        performance = PlayerPerformance.objects.create(
+            player=Player.objects.only('id', 'name', 'team_id').get(pk=payload['player_id']),
+            match=match, set=current_set)
+
+    updates = {}
+    fields = [counter, 'points'] if point_type in SCORING_POINT_TYPES else [counter]
+    for field in fields:
+        if sign > 0 or getattr(performance, field) > 0:
+            updates[field] = F(field) + sign
+            setattr(performance, field, getattr(performance, field) + sign)
+    if updates:
+        PlayerPerformance.objects.filter(pk=performance.pk).update(**updates)
+    if 'points' in updates:
+        record_points({performance.player_id: sign})
+    return performance
+
+
+def _shift_timeout(current_set, payload, sign):
+    field = f"{payload['team']}_timeouts"
+    if sign > 0 or getattr(current_set, field) > 0:
+        Set.objects.filter(pk=current_set.pk).update(**{field: F(field) + sign})
+        setattr(current_set, field, getattr(current_set, field) + sign)
+
+
+def _stack_result(match, action, current_set, sequence, performance=None):
+    return {
+        'action': action,
+        'sequence': sequence,
+        'set_number': current_set.set_number,
+        'home_score': current_set.home_team_score,
+        'away_score': current_set.away_team_score,
+        'home_timeouts': current_set.home_timeouts,
+        'away_timeouts': current_set.away_timeouts,
+        'performance': performance,
+        'can_undo': bool(match.undo_head),
+        'can_redo': bool(match.redo_head),
+    }
+
+
+def _open_set(match, set_number):
+    current_set = Set.objects.filter(match=match, set_number=set_number).first()
+    if current_set is None:
+        raise ScoringError("Set no encontrado", status.HTTP_404_NOT_FOUND)
+    if current_set.end_time:
+        raise ScoringError(f"El set {set_number} ya ha finalizado")
+    return current_set
+
+
+def undo_last(match_id):
+    """
+    Deshace la última acción (punto o tiempo fuera) de la pila del partido
+
+    La cima de la pila es `Match.undo_head` y cada evento apunta al anterior en `previous`,
+    así que cada paso es una búsqueda por (partido, secuencia). Los puntos ya revertidos
+    con `update_score` se saltan.
+    """
+    with transaction.atomic():
+        match = lock_match(match_id)
+        sequence = match.undo_head
+        while sequence:
+            target = MatchEvent.objects.only('kind', 'payload').get(match=match, sequence=sequence)
+            action = target.payload.get('action', target.kind)
+            # El PointEvent nace con la secuencia del evento que lo creó (punto o redo)
+            if action != 'point' or PointEvent.objects.filter(match=match, sequence=sequence).delete()[0]:
+                break
+            sequence = target.payload['previous']
+        if not sequence:
+            raise ScoringError("No hay acciones para deshacer")
+
+        fields = _stack_payload(target.payload)
+        current_set = _open_set(match, fields['set_number'])
+        undo_sequence = append_events(
+            match,
+            [('undo', {**fields, 'action': action, 'target': sequence, 'redo_previous': match.redo_head})],
+            locked=True, stack=(target.payload['previous'], match.last_sequence + 1))
+
+        performance = None
+        if action == 'point':
+            performance = _shift_point(match, current_set, fields, -1)
+        else:
+            _shift_timeout(current_set, fields, -1)
+        invalidate_statistics(match.pk)
+
+    return _stack_result(match, action, current_set, undo_sequence, performance)
+
+
+def redo_last(match_id):
+    """Repite la última acción deshecha; vuelve a la pila de deshacer como un evento `redo`"""
+    with transaction.atomic():
+        match = lock_match(match_id)
+        if not match.redo_head:
+            raise ScoringError("No hay acciones para rehacer")
+
+        undo_event = MatchEvent.objects.only('payload').get(match=match, sequence=match.redo_head)
+        action = undo_event.payload['action']
+        fields = _stack_payload(undo_event.payload)
+        current_set = _open_set(match, fields['set_number'])
+        redo_sequence = match.last_sequence + 1
+        append_events(
+            match,
+            [('redo', {**fields, 'action': action, 'target': undo_event.payload['target'],
+                       'previous': match.undo_head})],
+            locked=True, stack=(redo_sequence, undo_event.payload['redo_previous']))
+
+        performance = None
+        if action == 'point':
+            performance = _shift_point(match, current_set, fields, 1)
+            PointEvent.objects.create(
+                match=match,
+                set=current_set,
+                player=performance.player,
+                team_id=performance.player.team_id,
+                timestamp=timezone.now(),
+                point_type=fields['point_type'],
+                home_score_after=current_set.home_team_score,
+                away_score_after=current_set.away_team_score,
+                description=f"Punto por {fields['point_type']} del jugador {performance.player.name}",
+                sequence=redo_sequence,
+            )
+        else:
+            _shift_timeout(current_set, fields, 1)
+        invalidate_statistics(match.pk)
+
+    return _stack_result(match, action, current_set, redo_sequence, performance)
+
+
+def apply_points_batch(match_id, points):
+    """
+    Aplica en una sola transacción una lista ordenada de puntos enviada por un cliente offline
+
+    Cada punto lleva `client_event_id`; los que ya se registraron en un envío anterior se
+    ignoran, así que el lote se puede reenviar sin duplicar puntos. Todo el lote se valida
+    contra el estado actual de los sets antes de escribir: si un punto es inválido no se
+    aplica ninguno.
+
+    Args:
+        match_id: Id del partido
+        points: Lista de dicts con client_event_id, set_number, player_id y point_type
+    Returns:
+        dict: applied, duplicates y el marcador final de cada set tocado
+    """
+    if not isinstance(points, list) or not points:
+        raise ScoringError("Se requiere una lista de puntos")
+
+    for index, point in enumerate(points):
+        if not isinstance(point, dict) or not all(
+                point.get(key) for key in ('client_event_id', 'set_number', 'player_id', 'point_type')):
+            raise ScoringError(f"Punto {index}: faltan datos requeridos")
+        if point['point_type'] not in POINT_FIELDS:
+            raise ScoringError(f"Punto {index}: tipo de punto no válido")
+        try:
+            point['set_number'] = int(point['set_number'])
+            point['player_id'] = int(point['player_id'])
+        except (TypeError, ValueError):
+            raise ScoringError(f"Punto {index}: set_number y player_id deben ser enteros")
+
+    client_ids = [str(point['client_event_id']) for point in points]
+    if len(set(client_ids)) != len(client_ids):
+        raise ScoringError("El lote contiene client_event_id repetidos")
+
+    with transaction.atomic():
+        match = lock_match(match_id)
+        set_numbers = {point['set_number'] for point in points}
+        sets = {
+            current_set.set_number: current_set
+            for current_set in Set.objects.filter(match=match, set_number__in=set_numbers)
+        }
+        if not sets:
+            raise ScoringError("Set no encontrado", status.HTTP_404_NOT_FOUND)
+
+        already_applied = set(PointEvent.objects.filter(
+            match_id=match_id, client_event_id__in=client_ids).values_list('client_event_id', flat=True))
+        pending = [point for point in points if str(point['client_event_id']) not in already_applied]
+
+        players = {
+            player.pk: player
+            for player in Player.objects.only('id', 'name', 'team_id').filter(
+                pk__in={point['player_id'] for point in pending},
+                team_id__in=(match.home_team_id, match.away_team_id))
+        }
+
+        events = []
+        entries = []
+        # (set_id, player_id) -> {contador: incremento}
+        performance_deltas = {}
+        # set_id -> {campo de marcador: incremento}
+        set_deltas = {}
+        now = timezone.now()
+        for index, point in enumerate(pending):
+            current_set = sets.get(point['set_number'])
+            if current_set is None:
+                raise ScoringError(f"Punto {index}: set {point['set_number']} no encontrado", status.HTTP_404_NOT_FOUND)
+            if current_set.end_time:
+                raise ScoringError(f"Punto {index}: el set {current_set.set_number} ya ha finalizado")
+            player = players.get(point['player_id'])
+            if player is None:
+                raise ScoringError(f"Punto {index}: el jugador no pertenece a ninguno de los equipos del partido")
+
+            point_type = point['point_type']
+            score_field = _score_field(match, player.team_id)
+            setattr(current_set, score_field, getattr(current_set, score_field) + 1)
+            score_deltas = set_deltas.setdefault(current_set.pk, {})
+            score_deltas[score_field] = score_deltas.get(score_field, 0) + 1
+
+            deltas = performance_deltas.setdefault((current_set.pk, player.pk), {})
+            deltas[POINT_FIELDS[point_type]] = deltas.get(POINT_FIELDS[point_type], 0) + 1
+            if point_type in SCORING_POINT_TYPES:
+                deltas['points'] = deltas.get('points', 0) + 1
+
+            entries.append(_point_entry('point', match, current_set.set_number, player, point_type))
+            events.append(PointEvent(
+                match=match,
+                set=current_set,
+                player=player,
+                team_id=player.team_id,
+                timestamp=now,
+                point_type=point_type,
+                home_score_after=current_set.home_team_score,
+                away_score_after=current_set.away_team_score,
+                description=f"Punto por {point_type} del jugador {player.name}",
+                client_event_id=str(point['client_event_id']),
+            ))
+
+        if events:
+            first_sequence = append_events(match, entries, locked=True)
+            for offset, event in enumerate(events):
+                event.sequence = first_sequence + offset
+            PointEvent.objects.bulk_create(events)
+            _apply_set_deltas(set_deltas)
+            _apply_performance_deltas(match, performance_deltas)
+
+            player_points = {}
+            for (_, player_id), deltas in performance_deltas.items():
+                player_points[player_id] = player_points.get(player_id, 0) + deltas.get('points', 0)
+            record_points(player_points)
+            invalidate_statistics(match.pk)
+
+    return {
+        'applied': len(events),
+        'duplicates': len(points) - len(pending),
+        'sets': [
+            {
+                'set_number': current_set.set_number,
+                'home_score': current_set.home_team_score,
+                'away_score': current_set.away_team_score,
+            }
+            for current_set in sorted(sets.values(), key=lambda s: s.set_number)
+        ],
+    }
+
+
+def _apply_set_deltas(set_deltas):
+    """Un UPDATE con F() por set tocado (normalmente uno solo por lote)"""
+    for set_id, deltas in set_deltas.items():
+        Set.objects.filter(pk=set_id).update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def _apply_performance_deltas(match, performance_deltas):
+    """Suma los incrementos agregados con un único UPDATE (CASE por fila) y crea las filas nuevas"""
+    existing = {
+        (performance.set_id, performance.player_id): performance.pk
+        for performance in PlayerPerformance.objects.filter(
+            match=match, set_id__in={set_id for set_id, _ in performance_deltas}).only('id', 'set_id', 'player_id')
+        if (performance.set_id, performance.player_id) in performance_deltas
+    }
+
+    counters = set(POINT_FIELDS.values()) | {'points'}
+    updates = {}
+    for counter in counters:
+        whens = [
+            When(pk=existing[key], then=Value(deltas[counter]))
+            for key, deltas in performance_deltas.items()
+            if key in existing and deltas.get(counter)
+        ]
+        if whens:
+            updates[counter] = F(counter) + Case(*whens, default=Value(0))
+    if updates:
+        PlayerPerformance.objects.filter(pk__in=existing.values()).update(**updates)
+
+    PlayerPerformance.objects.bulk_create([
+        PlayerPerformance(match=match, set_id=set_id, player_id=player_id, **deltas)
+        for (set_id, player_id), deltas in performance_deltas.items()
+        if (set_id, player_id) not in existing
+    ])
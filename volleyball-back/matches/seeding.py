@@ -0,0 +1,189 @@
+# matches/seeding.py
+import random
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from teams.models import Team, Player
+from weather.models import Weather
+from .models import Match, Set, PlayerPerformance, PointEvent
+from .timeline import COUNTER_FIELDS, SCORING_POINT_TYPES
+
+POSITIONS = ['AR', 'OP', 'PR', 'PR', 'CE', 'CE', 'LI']
+# Reparto aproximado de cómo se gana un punto en voleibol
+POINT_TYPE_WEIGHTS = {'SPK': 55, 'ERR': 28, 'BLK': 10, 'ACE': 7}
+CONDITIONS = ['Clear', 'Cloudy', 'Rainy', 'Windy']
+
+
+class LeagueSeeder:
+    """
+    Genera temporadas realistas con bulk_create: equipos, jugadores, partidos jugados punto a
+    punto (sets a 25, el quinto a 15, con diferencia de 2), rendimientos por set y clima
+
+    Los partidos se escriben por bloques para que la memoria no crezca con el tamaño de la liga.
+    """
+
+    def __init__(self, seed=None, batch_size=2000):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.point_types = list(POINT_TYPE_WEIGHTS)
+        self.point_weights = list(POINT_TYPE_WEIGHTS.values())
+
+    def create_teams(self, count, players_per_team=12, prefix='Club'):
+        teams = Team.objects.bulk_create(
+            # Géneros por parejas para que hasta una liga de dos equipos pueda jugar
+            [Team(name=f"{prefix} {number}", gender='M' if (number - 1) // 2 % 2 == 0 else 'F')
+             for number in range(1, count + 1)],
+            batch_size=self.batch_size)
+
+        players = []
+        for team in teams:
+            avatar = Player.DEFAULT_AVATAR_MALE if team.gender == 'M' else Player.DEFAULT_AVATAR_FEMALE
+            for number in range(1, players_per_team + 1):
+                players.append(Player(
+                    team=team, name=f"{team.name} Jugador {number}", jersey_number=number,
+                    position=POSITIONS[(number - 1) % len(POSITIONS)], avatar=avatar))
+        Player.objects.bulk_create(players, batch_size=self.batch_size)
+        return teams
+
+    def create_matches(self, teams, count, live=0, upcoming=0, chunk_size=200):
+        """
+        Crea `count` partidos finalizados entre equipos del mismo género, más `live` en curso
+        y `upcoming` por jugar
+
+        Returns:
+            dict: Totales creados por tabla
+        """
+        rosters = {}
+        for player in Player.objects.filter(team__in=teams).only('id', 'team_id'):
+            rosters.setdefault(player.team_id, []).append(player.pk)
+        by_gender = {}
+        for team in teams:
+            if len(rosters.get(team.pk, ())) >= 1:
+                by_gender.setdefault(team.gender, []).append(team)
+        pools = [pool for pool in by_gender.values() if len(pool) >= 2]
+        if not pools:
+            raise ValueError("Se necesitan al menos dos equipos del mismo género con jugadores")
+
+        totals = {'matches': 0, 'sets': 0, 'point_events': 0, 'performances': 0, 'weather': 0}
+        kinds = ['finished'] * count + ['live'] * live + ['upcoming'] * upcoming
+        start = timezone.now() - timedelta(days=365)
+        for offset in range(0, len(kinds), chunk_size):
+            with transaction.atomic():
+                chunk = kinds[offset:offset + chunk_size]
+                self._create_chunk(pools, rosters, chunk, start + timedelta(hours=offset), totals)
+        return totals
+
+    def _create_chunk(self, pools, rosters, kinds, first_date, totals):
+        matches = []
+        for index, kind in enumerate(kinds):
+            home, away = self.random.sample(self.random.choice(pools), 2)
+            date = first_date + timedelta(hours=index)
+            matches.append(Match(
+                home_team=home, away_team=away, date=date, location=f"Gimnasio {home.pk}",
+                status=kind, start_time=None if kind == 'upcoming' else date))
+        matches = Match.objects.bulk_create(matches, batch_size=self.batch_size)
+
+        weather = [
+            Weather(match=match, temperature=self.random.randint(8, 32), condition=self.random.choice(CONDITIONS))
+            for match in matches if match.status != 'upcoming'
+        ]
+        Weather.objects.bulk_create(weather, batch_size=self.batch_size)
+        for record in weather:
+            record.match.current_weather = record
+
+        # Primero los sets con su marcador final, después sus eventos (necesitan el id del set)
+        played = []
+        for match in matches:
+            if match.status == 'upcoming':
+                continue
+            rallies = self._play_match(match, live=match.status == 'live')
+            played.append((match, rallies))
+            if match.status == 'finished':
+                match.end_time = match.start_time + timedelta(minutes=25 * len(rallies))
+                match.duration = match.end_time - match.start_time
+        Match.objects.bulk_update(
+            [match for match, _ in played], ['current_weather', 'end_time', 'duration'], batch_size=self.batch_size)
+
+        sets = []
+        for match, rallies in played:
+            for number, (points, finished) in enumerate(rallies, start=1):
+                home_score = sum(1 for side, _ in points if side == 'home')
+                begin = match.start_time + timedelta(minutes=25 * (number - 1))
+                sets.append(Set(
+                    match=match, set_number=number, home_team_score=home_score,
+                    away_team_score=len(points) - home_score, start_time=begin,
+                    end_time=begin + timedelta(minutes=24) if finished else None,
+                    duration=timedelta(minutes=24) if finished else None))
+        sets = Set.objects.bulk_create(sets, batch_size=self.batch_size)
+
+        events = []
+        performances = {}
+        set_iter = iter(sets)
+        for match, rallies in played:
+            for points, _ in rallies:
+                current_set = next(set_iter)
+                home_score = away_score = 0
+                for rally, (side, point_type) in enumerate(points):
+                    team_id = match.home_team_id if side == 'home' else match.away_team_id
+                    player_id = self.random.choice(rosters[team_id])
+                    if side == 'home':
+                        home_score += 1
+                    else:
+                        away_score += 1
+                    events.append(PointEvent(
+                        match=match, set=current_set, player_id=player_id, team_id=team_id,
+                        timestamp=current_set.start_time + timedelta(seconds=30 * rally),
+                        point_type=point_type, home_score_after=home_score, away_score_after=away_score,
+                        description=f"Punto por {point_type}"))
+
+                    performance = performances.get((current_set.pk, player_id))
+                    if performance is None:
+                        performance = performances[(current_set.pk, player_id)] = PlayerPerformance(
+                            match=match, set=current_set, player_id=player_id)
+                    counter = COUNTER_FIELDS[point_type]
+                    setattr(performance, counter, getattr(performance, counter) + 1)
+                    if point_type in SCORING_POINT_TYPES:
+                        performance.points += 1
+
+        PointEvent.objects.bulk_create(events, batch_size=self.batch_size)
+        PlayerPerformance.objects.bulk_create(performances.values(), batch_size=self.batch_size)
+
+        totals['matches'] += len(matches)
+        totals['sets'] += len(sets)
+        totals['point_events'] += len(events)
+        totals['performances'] += len(performances)
+        totals['weather'] += len(weather)
+
+    def _play_match(self, match, live=False):
+        """Juega un partido al mejor de 5; uno en vivo se corta a mitad de un set"""
+        # Cada partido tiene un favorito para que los marcadores no salgan siempre parejos
+        home_strength = self.random.uniform(0.4, 0.6)
+        # Un partido dura al menos 3 sets, así que el corte siempre llega a producirse
+        stop_at = self.random.randint(1, 3) if live else None
+        won = {'home': 0, 'away': 0}
+        rallies = []
+        while max(won.values()) < 3:
+            number = len(rallies) + 1
+            if number == stop_at:
+                points = self._play_set(home_strength, 25, cut=self.random.randint(5, 35))
+                rallies.append((points, False))
+                break
+            points = self._play_set(home_strength, 15 if number == 5 else 25)
+            rallies.append((points, True))
+            home = sum(1 for side, _ in points if side == 'home')
+            won['home' if home > len(points) - home else 'away'] += 1
+        return rallies
+
+    def _play_set(self, home_strength, target, cut=None):
+        points = []
+        score = {'home': 0, 'away': 0}
+        while True:
+            if cut is not None and len(points) >= cut:
+                return points
+            leader, trailer = max(score.values()), min(score.values())
+            if cut is None and leader >= target and leader - trailer >= 2:
+                return points
+            side = 'home' if self.random.random() < home_strength else 'away'
+            score[side] += 1
+            points.append((side, self.random.choices(self.point_types, self.point_weights)[0]))
@@ -1,33 +1,130 @@
 # matches/serializers.py
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Match, Set, PlayerPerformance, PointEvent
-from teams.models import Team
-from teams.serializers import TeamSerializer
+from teams.models import Player, Team
+from teams.cache import prime_rosters
+from teams.serializers import RosterPrimingListSerializer, TeamSerializer, PlayerSerializer
 from weather.serializers import WeatherSerializer
+from volley_back.serializers import DynamicFieldsMixin
 
-class PointEventSerializer(serializers.ModelSerializer):
+# Representaciones planas de las lecturas calientes (sets con sus puntos y rendimientos):
+# mismos campos y formatos que los serializers de abajo, sin recorrer campo a campo
+def _iso_datetime(value, tz):
+    """Como DateTimeField de DRF (ISO 8601 en la zona horaria actual), con la zona ya resuelta"""
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def point_event_data(event, tz=None):
+    tz = tz or timezone.get_current_timezone()
+    return {
+        'id': event.id,
+        'match': event.match_id,
+        'set': event.set_id,
+        'player': event.player_id,
+        'team': event.team_id,
+        'timestamp': _iso_datetime(event.timestamp, tz),
+        'point_type': event.point_type,
+        'home_score_after': event.home_score_after,
+        'away_score_after': event.away_score_after,
+        'description': event.description,
+    }
+
+
+def set_data(current_set):
+    tz = timezone.get_current_timezone()
+    return {
+        'id': current_set.id,
+        'set_number': current_set.set_number,
+        'home_team_score': current_set.home_team_score,
+        'away_team_score': current_set.away_team_score,
+        'start_time': _iso_datetime(current_set.start_time, tz),
+        'end_time': _iso_datetime(current_set.end_time, tz),
+        'point_events': [point_event_data(event, tz) for event in current_set.point_events.all()],
+    }
+
+
+def player_performance_data(performance):
+    return {
+        'id': performance.id,
+        'player': performance.player_id,
+        'player_name': performance.player.name,
+        'points': performance.points,
+        'spike_points': performance.spike_points,
+        'block_points': performance.block_points,
+        'aces': performance.aces,
+        'errors': performance.errors,
+    }
+
+
+def with_live_player_names(performances, teams):
+    """
+    Rendimientos guardados (`Match.materialized`) con el nombre actual de cada jugador
+
+    Los nombres salen de los planteles ya renderizados de los dos equipos; solo los jugadores
+    que ya no están en ninguno (traspasados) se leen de la base, en una consulta.
+    """
+    names = {player['id']: player['name'] for team in teams for player in (team or {}).get('players', ())}
+    missing = {row['player'] for row in performances if row['player'] not in names}
+    if missing:
+        names.update(Player.objects.filter(pk__in=missing).values_list('id', 'name'))
+    return [{**row, 'player_name': names.get(row['player'], row['player_name'])} for row in performances]
+
+
+def match_event_data(sequence, kind, payload, created_at):
+    """Un evento del registro para la sincronización incremental (`GET matches/<pk>/events/`)"""
+    # `previous` solo sirve a la pila de deshacer del servidor
+    payload = {key: value for key, value in payload.items() if key != 'previous'}
+    return {
+        'sequence': sequence,
+        'kind': kind,
+        'payload': payload,
+        'at': _iso_datetime(created_at, timezone.get_current_timezone()),
+    }
+
+
+class PointEventSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = PointEvent
         fields = ['id', 'match', 'set', 'player', 'team', 'timestamp', 'point_type', 'home_score_after', 'away_score_after', 'description']
+        expandable_fields = {
+            'player': (PlayerSerializer, {}),
+            'team': (TeamSerializer, {}),
+        }
+
+    def plain_representation(self, instance):
+        return point_event_data(instance)
 
 
-class SetSerializer(serializers.ModelSerializer):
+class SetSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     point_events = PointEventSerializer(many=True, read_only=True)
 
     class Meta:
         model = Set
         fields = ['id', 'set_number', 'home_team_score', 'away_team_score', 'start_time', 'end_time','point_events']
 
+    def plain_representation(self, instance):
+        return set_data(instance)
 
-class PlayerPerformanceSerializer(serializers.ModelSerializer):
+
+class PlayerPerformanceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     player_name = serializers.CharField(source='player.name', read_only=True)
 
     class Meta:
         model = PlayerPerformance
         fields = ['id', 'player', 'player_name', 'points', 'spike_points', 'block_points', 'aces', 'errors']
+        expandable_fields = {
+            'player': (PlayerSerializer, {}),
+        }
+
+    def plain_representation(self, instance):
+        return player_performance_data(instance)
 
 
-class MatchSerializer(serializers.ModelSerializer):
+class MatchSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     home_team = TeamSerializer(read_only=True)
     away_team = TeamSerializer(read_only=True)
     home_team_id = serializers.PrimaryKeyRelatedField(queryset=Team.objects.all(), source='home_team', write_only=True)
@@ -41,6 +138,9 @@ class MatchSerializer(serializers.ModelSerializer):
     sets_won_home = serializers.IntegerField(read_only=True)
     sets_won_away = serializers.IntegerField(read_only=True)
 
+    # Los equipos se toman de la caché de planteles, preparada en bloque para toda la página
+    primes_rosters = True
+
     class Meta:
         model = Match
         fields = [
@@ -49,6 +149,45 @@ class MatchSerializer(serializers.ModelSerializer):
             'start_time', 'duration', 'home_timeouts', 'away_timeouts', 'current_weather', 'status', 
             'sets_won_home', 'sets_won_away',
         ]
+        list_serializer_class = RosterPrimingListSerializer
+
+    def _cached_team_fields(self):
+        return [name for name in ('home_team', 'away_team')
+                if name in self.fields and self.fields[name].uses_roster_cache()]
+
+    def roster_renderer(self):
+        names = self._cached_team_fields()
+        return self.fields[names[0]] if names else None
+
+    def roster_teams(self, match):
+        return [getattr(match, name) for name in self._cached_team_fields()]
+
+    def uses_materialized(self, instance):
+        """Un partido finalizado con su representación guardada y sin recortes en la petición"""
+        # `materialized` diferido (no está en __dict__) significa que no se quiere usar
+        return (instance.__dict__.get('materialized') is not None
+                and self._sparse_fields is None and self._sparse_omit is None and self._sparse_expand is None)
+
+    def to_representation(self, instance):
+        # Un solo partido (retrieve): los dos equipos en una lectura de caché
+        renderer = self.roster_renderer()
+        if renderer is not None:
+            prime_rosters(renderer, self.roster_teams(instance))
+        if not self.uses_materialized(instance):
+            return super().to_representation(instance)
+        stored = instance.materialized
+        representation = {}
+        for name, field in self.fields.items():
+            if name in ('home_team', 'away_team'):
+                representation[name] = field.to_representation(getattr(instance, name))
+            elif name in stored:
+                representation[name] = stored[name]
+        # Los nombres de jugadores tampoco se congelan: pueden cambiar sin tocar el partido
+        if 'player_performances' in representation:
+            representation['player_performances'] = with_live_player_names(
+                representation['player_performances'],
+                [representation.get('home_team'), representation.get('away_team')])
+        return representation
 
     def create(self, validated_data):
         match = super().create(validated_data)
@@ -59,3 +198,32 @@ class MatchSerializer(serializers.ModelSerializer):
         if 'status' in validated_data and validated_data['status'] == 'live':
             instance.start_match()
         return super().update(instance, validated_data)
+
+
+class MatchSummarySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Representación ligera para listados; requiere un queryset con `Match.objects.with_summary()`"""
+    home_team_name = serializers.CharField(read_only=True)
+    away_team_name = serializers.CharField(read_only=True)
+    set_scores = serializers.SerializerMethodField()
+    sets_won_home = serializers.IntegerField(read_only=True)
+    sets_won_away = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Match
+        fields = [
+            'id', 'home_team_name', 'away_team_name', 'date', 'status',
+            'set_scores', 'sets_won_home', 'sets_won_away',
+        ]
+
+    def get_set_scores(self, obj):
+        set_scores = []
+        for number in range(1, Match.MAX_SETS + 1):
+            home = getattr(obj, f'set_{number}_home')
+            if home is None:
+                continue
+            set_scores.append({
+                'set_number': number,
+                'home': home,
+                'away': getattr(obj, f'set_{number}_away'),
+            })
+        return set_scores
@@ -0,0 +1,22 @@
+# matches/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from volley_back.conditional import bump_versions, match_scopes
+from .models import Match, PlayerPerformance, Set
+
+
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+def bump_match_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_versions(*match_scopes(instance.pk))
+
+
+@receiver(post_save, sender=Set)
+@receiver(post_delete, sender=Set)
+@receiver(post_save, sender=PlayerPerformance)
+@receiver(post_delete, sender=PlayerPerformance)
+def bump_match_version_for_child(sender, instance, raw=False, **kwargs):
+    # Los puntos no tienen señal: todo cambio de puntuación pasa por append_events
+    if not raw:
+        bump_versions(*match_scopes(instance.match_id))
@@ -1,3 +1,1376 @@
-from django.test import TestCase
+# matches/tests.py
+import asyncio
+import datetime
+import decimal
+import json
+import os
+import tempfile
+import uuid
+import zoneinfo
+from io import BytesIO, StringIO
+from unittest import mock, skipIf
+import threading
+from asgiref.sync import sync_to_async
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from teams.models import Team, Player
+from weather.models import Weather
+from matches import analytics
+from matches.exports import export_point_events
+from matches.live import InProcessBroker, encode_event
+from volley_back import checks, compression
+from volley_back.instrumentation import RequestMetrics, registry
+from volley_back.renderers import FastJSONRenderer, orjson
+from matches.serializers import MatchSerializer
+from matches.models import Match, Set, PlayerPerformance, PointEvent, MatchEvent, MatchSnapshot
+from matches.timeline import SNAPSHOT_INTERVAL, check_projection, rebuild_projection, state_at
 
-# Create your tests here.
+
+def create_team(name, gender='M', players=6):
+    team = Team.objects.create(name=name, gender=gender)
+    for number in range(1, players + 1):
+        Player.objects.create(team=team, name=f"{name} {number}", jersey_number=number, position='CE')
+    return team
+
+
+def create_match(home_team, away_team, sets=1, points_per_set=2):
+    match = Match.objects.create(
+        home_team=home_team, away_team=away_team, date=timezone.now(),
+        location='Estadio', status='live', start_time=timezone.now())
+    match.current_weather = Weather.objects.create(match=match, temperature=20, condition='Clear')
+    match.save()
+
+    scorer = home_team.players.first()
+    for set_number in range(1, sets + 1):
+        # Solo el último set queda abierto
+        current_set = Set.objects.create(
+            match=match, set_number=set_number, start_time=timezone.now(),
+            end_time=timezone.now() if set_number < sets else None)
+        PlayerPerformance.objects.create(player=scorer, match=match, set=current_set)
+        for point in range(1, points_per_set + 1):
+            PointEvent.objects.create(
+                match=match, set=current_set, player=scorer, team=home_team,
+                timestamp=timezone.now(), point_type='SPK',
+                home_score_after=point, away_score_after=0)
+    return match
+
+
+class MatchQueryPlanTests(APITestCase):
+
+    def setUp(self):
+        self.list_url = reverse('match-list')
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+
+    def count_queries(self, url):
+        # Caché de planteles vacía: se cuenta también la carga de jugadores
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_is_independent_of_data_size(self):
+        """El listado de partidos no debe hacer más consultas cuando crecen sets, puntos y jugadores"""
+        create_match(self.home_team, self.away_team)
+        baseline = self.count_queries(self.list_url)
+
+        big_home = create_team('Local Grande', players=14)
+        big_away = create_team('Visita Grande', players=14)
+        for _ in range(5):
+            create_match(big_home, big_away, sets=5, points_per_set=25)
+
+        self.assertEqual(self.count_queries(self.list_url), baseline)
+
+    def test_detail_query_count_is_independent_of_data_size(self):
+        """El detalle de un partido usa las mismas consultas con 1 o 5 sets completos"""
+        small = create_match(self.home_team, self.away_team)
+        big = create_match(create_team('A', players=14), create_team('B', players=14), sets=5, points_per_set=25)
+
+        small_queries = self.count_queries(reverse('match-detail', args=[small.pk]))
+        big_queries = self.count_queries(reverse('match-detail', args=[big.pk]))
+        self.assertEqual(small_queries, big_queries)
+
+    def test_detail_keeps_nested_payload(self):
+        """La precarga no cambia la forma de la respuesta"""
+        match = create_match(self.home_team, self.away_team, sets=2, points_per_set=3)
+        response = self.client.get(reverse('match-detail', args=[match.pk]))
+
+        self.assertEqual(len(response.data['home_team']['players']), 6)
+        self.assertEqual(len(response.data['sets']), 2)
+        self.assertEqual(len(response.data['sets'][0]['point_events']), 3)
+        self.assertEqual(response.data['current_weather']['condition'], 'Clear')
+
+
+class MatchSummaryTests(APITestCase):
+
+    def setUp(self):
+        self.list_url = reverse('match-list')
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+
+    def test_summary_returns_set_scores_and_sets_won(self):
+        """`?view=summary` devuelve nombres, marcadores por set y sets ganados"""
+        match = create_match(self.home_team, self.away_team, sets=0)
+        Set.objects.create(match=match, set_number=1, home_team_score=25, away_team_score=20, end_time=timezone.now())
+        Set.objects.create(match=match, set_number=2, home_team_score=18, away_team_score=25, end_time=timezone.now())
+        Set.objects.create(match=match, set_number=3, home_team_score=10, away_team_score=4)
+
+        response = self.client.get(self.list_url, {'view': 'summary'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        summary = response.data['results'][0]
+        self.assertEqual(summary['home_team_name'], 'Local')
+        self.assertEqual(summary['away_team_name'], 'Visita')
+        self.assertEqual(summary['sets_won_home'], 1)
+        self.assertEqual(summary['sets_won_away'], 1)
+        self.assertEqual(summary['set_scores'], [
+            {'set_number': 1, 'home': 25, 'away': 20},
+            {'set_number': 2, 'home': 18, 'away': 25},
+            {'set_number': 3, 'home': 10, 'away': 4},
+        ])
+        self.assertNotIn('sets', summary)
+
+    def test_summary_uses_a_single_query_per_page(self):
+        """El resumen usa la consulta de conteo y una única consulta para la página"""
+        for _ in range(3):
+            create_match(self.home_team, self.away_team, sets=5, points_per_set=10)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.list_url, {'view': 'summary'})
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(len(context.captured_queries), 2)
+
+
+class SparseFieldsetTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=2, points_per_set=3)
+        self.detail_url = reverse('match-detail', args=[self.match.pk])
+
+    def test_fields_trims_nested_output(self):
+        """`?fields=` admite rutas anidadas con punto"""
+        response = self.client.get(self.detail_url, {'fields': 'id,status,sets.set_number,sets.home_team_score'})
+        self.assertEqual(set(response.data), {'id', 'status', 'sets'})
+        self.assertEqual(set(response.data['sets'][0]), {'set_number', 'home_team_score'})
+
+    def test_omit_removes_fields(self):
+        """`?omit=` quita campos, también dentro de relaciones anidadas"""
+        response = self.client.get(self.detail_url, {'omit': 'home_team,away_team,sets.point_events'})
+        self.assertNotIn('home_team', response.data)
+        self.assertNotIn('point_events', response.data['sets'][0])
+        self.assertIn('set_number', response.data['sets'][0])
+
+    def test_expand_nests_related_objects(self):
+        """`?expand=` reemplaza la clave primaria por el objeto anidado"""
+        response = self.client.get(self.detail_url, {'expand': 'sets.point_events.player'})
+        player = response.data['sets'][0]['point_events'][0]['player']
+        self.assertEqual(player['name'], 'Local 1')
+
+    def test_trimmed_fields_drop_their_prefetches(self):
+        """Un marcador sin eventos ni plantillas no consulta esas tablas"""
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(self.detail_url)
+        with CaptureQueriesContext(connection) as scoreboard:
+            self.client.get(self.detail_url, {'fields': 'id,sets.home_team_score,sets.away_team_score'})
+
+        self.assertLess(len(scoreboard.captured_queries), len(full.captured_queries))
+        tables = ' '.join(query['sql'] for query in scoreboard.captured_queries)
+        self.assertNotIn('matches_pointevent', tables)
+        self.assertNotIn('teams_player', tables)
+
+    def test_expand_is_planned_without_extra_queries_per_row(self):
+        """Expandir el jugador de cada evento se resuelve con select_related"""
+        url = reverse('match-list')
+        cache.clear()
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url, {'expand': 'sets.point_events.player'})
+        create_match(self.home_team, self.away_team, sets=5, points_per_set=20)
+        cache.clear()
+        with CaptureQueriesContext(connection) as big:
+            self.client.get(url, {'expand': 'sets.point_events.player'})
+        self.assertEqual(len(small.captured_queries), len(big.captured_queries))
+
+
+class UpdateScoreTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        self.set = Set.objects.create(match=self.match, set_number=1, start_time=timezone.now())
+        self.url = reverse('match-update-score', args=[self.match.pk])
+        self.home_player = self.home_team.players.first()
+        self.away_player = self.away_team.players.first()
+
+    def score(self, player, point_type='SPK', **extra):
+        data = {'set_number': 1, 'player_id': player.pk, 'point_type': point_type, **extra}
+        return self.client.patch(self.url, data, format='json')
+
+    def test_point_updates_set_performance_and_event(self):
+        """Un punto suma al marcador, al rendimiento del jugador y crea el evento"""
+        self.score(self.home_player)
+        response = self.score(self.home_player, 'ACE')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['home_score'], response.data['away_score']), (2, 0))
+        self.assertEqual(response.data['player_performance']['points'], 2)
+        self.assertEqual(response.data['player_performance']['aces'], 1)
+
+        self.set.refresh_from_db()
+        self.assertEqual(self.set.home_team_score, 2)
+        performance = PlayerPerformance.objects.get(match=self.match, set=self.set, player=self.home_player)
+        self.assertEqual((performance.points, performance.spike_points, performance.aces), (2, 1, 1))
+        event = PointEvent.objects.filter(set=self.set).latest('id')
+        self.assertEqual((event.home_score_after, event.away_score_after), (2, 0))
+
+    def test_opponent_error_scores_without_player_points(self):
+        """Los errores del rival suman al marcador pero no a los puntos del jugador"""
+        response = self.score(self.away_player, 'ERR')
+        self.assertEqual((response.data['home_score'], response.data['away_score']), (0, 1))
+        self.assertEqual(response.data['player_performance']['points'], 0)
+        self.assertEqual(response.data['player_performance']['errors'], 1)
+
+    def test_undo_reverts_last_point(self):
+        """`undo` revierte marcador, rendimiento y borra el evento"""
+        self.score(self.home_player)
+        self.score(self.home_player)
+        response = self.score(self.home_player, undo=True)
+
+        self.assertEqual(response.data['home_score'], 1)
+        self.assertEqual(response.data['player_performance']['spike_points'], 1)
+        self.assertEqual(PointEvent.objects.filter(set=self.set).count(), 1)
+
+    def test_score_requires_live_match(self):
+        self.match.status = 'finished'
+        self.match.save()
+        response = self.score(self.home_player)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_score_unknown_set(self):
+        response = self.client.patch(self.url, {'set_number': 4, 'player_id': self.home_player.pk, 'point_type': 'SPK'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_score_uses_a_fixed_number_of_queries(self):
+        """Registrar un punto no vuelve a leer el set ni el equipo del jugador"""
+        self.score(self.home_player)
+        with CaptureQueriesContext(connection) as context:
+            self.score(self.home_player)
+        writes = [q for q in context.captured_queries if q['sql'].startswith(('UPDATE', 'INSERT'))]
+        # Secuencia y evento del registro, rendimiento, marcador y PointEvent, más el acumulado
+        # y el líder de estadísticas
+        self.assertEqual(len(writes), 7)
+        self.assertLessEqual(len(context.captured_queries), 12)
+
+
+class BatchPointsTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        self.set = Set.objects.create(match=self.match, set_number=1, start_time=timezone.now())
+        self.url = reverse('match-points-batch', args=[self.match.pk])
+        self.home_players = list(self.home_team.players.all())
+        self.away_player = self.away_team.players.first()
+
+    def build_points(self, count, start=0):
+        points = []
+        for index in range(start, start + count):
+            player = self.away_player if index % 3 == 2 else self.home_players[index % len(self.home_players)]
+            points.append({
+                'client_event_id': f"tablet-1-{index}",
+                'set_number': 1,
+                'player_id': player.pk,
+                'point_type': 'ERR' if index % 5 == 4 else 'SPK',
+            })
+        return points
+
+    def test_batch_applies_points_in_order(self):
+        """El lote actualiza marcador, rendimientos y eventos como si fueran puntos sueltos"""
+        points = self.build_points(30)
+        response = self.client.post(self.url, {'points': points}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['applied'], 30)
+
+        away_points = sum(1 for point in points if point['player_id'] == self.away_player.pk)
+        self.set.refresh_from_db()
+        self.assertEqual((self.set.home_team_score, self.set.away_team_score), (30 - away_points, away_points))
+
+        last_event = PointEvent.objects.filter(set=self.set).latest('id')
+        self.assertEqual((last_event.home_score_after, last_event.away_score_after), (30 - away_points, away_points))
+        total_points = sum(PlayerPerformance.objects.filter(set=self.set).values_list('points', flat=True))
+        self.assertEqual(total_points, sum(1 for point in points if point['point_type'] == 'SPK'))
+
+    def test_replayed_batch_is_idempotent(self):
+        """Reenviar el mismo lote (o uno solapado) no duplica puntos"""
+        self.client.post(self.url, {'points': self.build_points(10)}, format='json')
+        response = self.client.post(self.url, {'points': self.build_points(15)}, format='json')
+
+        self.assertEqual(response.data['applied'], 5)
+        self.assertEqual(response.data['duplicates'], 10)
+        self.assertEqual(PointEvent.objects.filter(match=self.match).count(), 15)
+
+    def test_invalid_point_rejects_whole_batch(self):
+        points = self.build_points(5)
+        points[3]['player_id'] = create_team('Otro').players.first().pk
+        response = self.client.post(self.url, {'points': points}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PointEvent.objects.filter(match=self.match).count(), 0)
+
+    def test_batch_query_count_does_not_grow_with_points(self):
+        """200 puntos se aplican con un número fijo de consultas"""
+        self.client.post(self.url, {'points': self.build_points(20)}, format='json')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, {'points': self.build_points(200, start=20)}, format='json')
+        self.assertEqual(response.data['applied'], 200)
+        # Incluye el registro de eventos y la instantánea que toca al pasar de 200 eventos
+        self.assertLessEqual(len(context.captured_queries), 21)
+
+
+class MatchTimelineTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        self.set = Set.objects.create(match=self.match, set_number=1, start_time=timezone.now())
+        self.home_player = self.home_team.players.first()
+        self.away_player = self.away_team.players.first()
+
+    def score(self, player, point_type='SPK', **extra):
+        data = {'set_number': 1, 'player_id': player.pk, 'point_type': point_type, **extra}
+        return self.client.patch(reverse('match-update-score', args=[self.match.pk]), data, format='json')
+
+    def test_writes_are_logged_and_projection_matches(self):
+        """Puntos, undo y tiempos fuera quedan en el registro y las tablas coinciden con él"""
+        self.score(self.home_player)
+        self.score(self.away_player, 'ACE')
+        self.score(self.home_player, 'BLK')
+        self.score(self.home_player, 'BLK', undo=True)
+        self.client.post(reverse('update-timeouts', args=[self.match.pk]), {'team': 'away'}, format='json')
+
+        kinds = list(MatchEvent.objects.filter(match=self.match).order_by('sequence').values_list('kind', flat=True))
+        self.assertEqual(kinds, ['point', 'point', 'point', 'undo', 'timeout'])
+        self.assertEqual(check_projection(self.match.pk), [])
+
+        state = state_at(self.match.pk)
+        self.assertEqual(state['sets']['1']['home'], 1)
+        self.assertEqual(state['sets']['1']['away'], 1)
+        self.assertEqual(state['sets']['1']['away_timeouts'], 1)
+
+    def test_timeline_returns_state_at_any_sequence(self):
+        self.score(self.home_player)
+        self.score(self.home_player)
+        self.score(self.away_player)
+        url = reverse('match-timeline', args=[self.match.pk])
+
+        response = self.client.get(url, {'at': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['last_sequence'], 3)
+        self.assertEqual((response.data['state']['sets']['1']['home'], response.data['state']['sets']['1']['away']), (2, 0))
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['sequence'], 3)
+        self.assertEqual(response.data['state']['sets']['1']['away'], 1)
+
+        self.assertEqual(self.client.get(url, {'at': 4}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'at': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_snapshots_bound_the_replay(self):
+        """Con instantáneas periódicas, cualquier estado intermedio coincide con el marcador de su punto"""
+        points = [
+            {'client_event_id': f"p{index}", 'set_number': 1,
+             'player_id': (self.away_player if index % 3 == 0 else self.home_player).pk, 'point_type': 'SPK'}
+            for index in range(SNAPSHOT_INTERVAL * 2 + 10)
+        ]
+        self.client.post(reverse('match-points-batch', args=[self.match.pk]), {'points': points}, format='json')
+        self.assertEqual(MatchSnapshot.objects.filter(match=self.match).count(), 2)
+
+        event = PointEvent.objects.get(match=self.match, sequence=SNAPSHOT_INTERVAL + 7)
+        with self.assertNumQueries(2):
+            state = state_at(self.match.pk, event.sequence)
+        self.assertEqual((state['sets']['1']['home'], state['sets']['1']['away']),
+                         (event.home_score_after, event.away_score_after))
+
+    def test_drift_is_detected_and_rebuilt(self):
+        self.score(self.home_player)
+        self.score(self.home_player, 'ACE')
+        Set.objects.filter(pk=self.set.pk).update(home_team_score=7)
+        PlayerPerformance.objects.filter(set=self.set, player=self.home_player).update(aces=0)
+
+        self.assertEqual(len(check_projection(self.match.pk)), 2)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_match_projection', self.match.pk, '--check', stdout=StringIO(), stderr=StringIO())
+
+        rebuild_projection(self.match.pk)
+        self.set.refresh_from_db()
+        self.assertEqual(self.set.home_team_score, 2)
+        self.assertEqual(check_projection(self.match.pk), [])
+
+    def test_start_match_logs_status_and_first_set(self):
+        match = Match.objects.create(
+            home_team=self.home_team, away_team=self.away_team, date=timezone.now(), location='Estadio')
+        self.client.post(reverse('match-start', args=[match.pk]))
+
+        events = list(MatchEvent.objects.filter(match=match).order_by('sequence').values_list('kind', 'payload'))
+        self.assertEqual(events, [('set_started', {'set_number': 1}), ('status', {'status': 'live'})])
+        self.assertEqual(state_at(match.pk)['status'], 'live')
+
+
+class MatchEventsSyncTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        Set.objects.create(match=self.match, set_number=1, start_time=timezone.now())
+        self.url = reverse('match-events', args=[self.match.pk])
+        for _ in range(3):
+            self.score()
+
+    def tearDown(self):
+        cache.clear()
+
+    def score(self, point_type='SPK'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('match-update-score', args=[self.match.pk]),
+                {'set_number': 1, 'player_id': self.home_team.players.first().pk, 'point_type': point_type},
+                format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_returns_only_events_after_sequence(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'since': 1})
+        self.assertEqual(len(context.captured_queries), 2)
+
+        self.assertEqual(response.data['last_sequence'], 3)
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual([event['sequence'] for event in response.data['events']], [2, 3])
+        self.assertEqual(response.data['events'][0]['kind'], 'point')
+        self.assertEqual(response.data['events'][0]['payload']['point_type'], 'SPK')
+        self.assertNotIn('previous', response.data['events'][0]['payload'])
+
+    def test_limit_pages_through_the_log(self):
+        response = self.client.get(self.url, {'since': 0, 'limit': 2})
+        self.assertTrue(response.data['has_more'])
+        self.assertEqual([event['sequence'] for event in response.data['events']], [1, 2])
+
+        response = self.client.get(self.url, {'since': 2, 'limit': 2})
+        self.assertFalse(response.data['has_more'])
+
+    def test_polling_without_changes_returns_not_modified(self):
+        first = self.client.get(self.url, {'since': 3})
+        self.assertEqual(first.data['events'], [])
+        response = self.client.get(self.url, {'since': 3}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.score('ACE')
+        response = self.client.get(self.url, {'since': 3}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(event['sequence'], event['payload']['point_type']) for event in response.data['events']],
+                         [(4, 'ACE')])
+
+    def test_invalid_parameters(self):
+        for params in ({'since': 'x'}, {'since': 4}, {'since': -1}, {'limit': 0}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+        response = self.client.get(reverse('match-events', args=[self.match.pk + 100]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class UndoRedoTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        self.set = Set.objects.create(match=self.match, set_number=1, start_time=timezone.now())
+        self.home_player = self.home_team.players.first()
+        self.away_player = self.away_team.players.first()
+
+    def score(self, player, point_type='SPK', **extra):
+        data = {'set_number': 1, 'player_id': player.pk, 'point_type': point_type, **extra}
+        return self.client.patch(reverse('match-update-score', args=[self.match.pk]), data, format='json')
+
+    def undo(self):
+        return self.client.post(reverse('match-undo', args=[self.match.pk]))
+
+    def redo(self):
+        return self.client.post(reverse('match-redo', args=[self.match.pk]))
+
+    def test_undo_and_redo_walk_the_stack(self):
+        """Deshacer revierte puntos y tiempos fuera en orden inverso; rehacer los repite"""
+        self.score(self.home_player, 'ACE')
+        self.score(self.away_player)
+        self.client.post(reverse('update-timeouts', args=[self.match.pk]), {'team': 'home'}, format='json')
+
+        response = self.undo()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['action'], response.data['home_timeouts']), ('timeout', 0))
+        response = self.undo()
+        self.assertEqual((response.data['action'], response.data['away_score']), ('point', 0))
+        response = self.undo()
+        self.assertEqual(response.data['home_score'], 0)
+        self.assertEqual(response.data['player_performance']['aces'], 0)
+        self.assertFalse(response.data['can_undo'])
+        self.assertEqual(self.undo().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PointEvent.objects.filter(match=self.match).count(), 0)
+
+        response = self.redo()
+        self.assertEqual((response.data['home_score'], response.data['player_performance']['points']), (1, 1))
+        response = self.redo()
+        self.assertEqual(response.data['away_score'], 1)
+        self.assertTrue(response.data['can_redo'])
+        self.assertEqual(PointEvent.objects.filter(match=self.match).count(), 2)
+
+        # Una acción nueva vacía la pila de rehacer
+        self.score(self.home_player)
+        self.assertEqual(self.redo().status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Lo rehecho también se puede deshacer
+        self.undo()
+        response = self.undo()
+        self.assertEqual((response.data['home_score'], response.data['away_score']), (1, 0))
+        self.assertEqual(check_projection(self.match.pk), [])
+
+    def test_undo_skips_points_reverted_with_update_score(self):
+        self.score(self.home_player)
+        self.score(self.away_player)
+        self.score(self.away_player, undo=True)
+
+        response = self.undo()
+        self.assertEqual((response.data['home_score'], response.data['away_score']), (0, 0))
+        self.assertEqual(check_projection(self.match.pk), [])
+
+    def test_undo_refuses_finished_sets(self):
+        self.score(self.home_player)
+        Set.objects.filter(pk=self.set.pk).update(end_time=timezone.now())
+        self.assertEqual(self.undo().status_code, status.HTTP_400_BAD_REQUEST)
+        self.set.refresh_from_db()
+        self.assertEqual(self.set.home_team_score, 1)
+
+    def test_undo_cost_does_not_depend_on_history(self):
+        points = [
+            {'client_event_id': f"p{index}", 'set_number': 1, 'player_id': self.home_player.pk, 'point_type': 'SPK'}
+            for index in range(120)
+        ]
+        self.client.post(reverse('match-points-batch', args=[self.match.pk]), {'points': points}, format='json')
+        self.undo()
+        with CaptureQueriesContext(connection) as context:
+            response = self.undo()
+        self.assertEqual(response.data['home_score'], 118)
+        self.assertLessEqual(len(context.captured_queries), 14)
+
+
+class SetConstraintTests(APITestCase):
+
+    def setUp(self):
+        self.match = create_match(create_team('Local'), create_team('Visita'), sets=1)
+
+    def test_one_set_per_number_and_one_open_set(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Set.objects.create(match=self.match, set_number=1, end_time=timezone.now())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Set.objects.create(match=self.match, set_number=2)
+
+        Set.objects.filter(match=self.match).update(end_time=timezone.now())
+        Set.objects.create(match=self.match, set_number=2)
+
+    def test_one_performance_row_per_player_and_set(self):
+        current_set = self.match.sets.get()
+        player = self.match.home_team.players.first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PlayerPerformance.objects.create(match=self.match, set=current_set, player=player)
+
+        # Las filas de partido (sin set) no están limitadas
+        PlayerPerformance.objects.create(match=self.match, player=player)
+        PlayerPerformance.objects.create(match=self.match, player=player)
+
+
+class SetActionWriteTests(APITestCase):
+    """Tiempos fuera y fin de set escriben solo sus columnas, sin tocar el marcador"""
+
+    def setUp(self):
+        self.match = create_match(create_team('Local'), create_team('Visita'), sets=1)
+        self.set = self.match.sets.get()
+
+    def set_updates(self, context):
+        return [query['sql'] for query in context.captured_queries
+                if query['sql'].startswith('UPDATE "matches_set"')]
+
+    def test_timeout_only_writes_its_column(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('update-timeouts', args=[self.match.pk]), {'team': 'away'}, format='json')
+        self.assertEqual(response.data['away_timeouts'], 1)
+        updates = self.set_updates(context)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"away_timeouts"', updates[0])
+        self.assertNotIn('score', updates[0])
+
+    def test_end_set_uses_the_score_read_under_the_lock(self):
+        # El objeto que pudiera tener la vista antes de bloquear ya no vale: el marcador cambió después
+        Set.objects.filter(pk=self.set.pk).update(home_team_score=25, away_team_score=23)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('end-set', args=[self.match.pk]))
+        self.assertEqual(response.data['final_score'], {'home': 25, 'away': 23})
+        updates = self.set_updates(context)
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('score', updates[0])
+        self.assertEqual(MatchEvent.objects.filter(match=self.match, kind='set_ended').get().payload['home'], 25)
+
+    def test_start_set_reads_the_last_set_under_the_lock(self):
+        url = reverse('start-set', args=[self.match.pk])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        Set.objects.filter(pk=self.set.pk).update(end_time=timezone.now())
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(url)
+        self.assertEqual(response.data['set_data']['number'], 2)
+        # El partido se bloquea antes de leer el último set
+        queries = [query['sql'] for query in context.captured_queries]
+        lock = next(i for i, sql in enumerate(queries) if sql.startswith('SELECT') and 'FROM "matches_match"' in sql)
+        last_set = next(i for i, sql in enumerate(queries) if sql.startswith('SELECT') and 'FROM "matches_set"' in sql)
+        self.assertLess(lock, last_set)
+        self.assertEqual(MatchEvent.objects.filter(match=self.match, kind='set_started').get().payload, {'set_number': 2})
+
+    def test_unknown_match(self):
+        response = self.client.post(reverse('update-timeouts', args=[9999]), {'team': 'home'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(reverse('start-set', args=[9999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SeedLeagueTests(APITestCase):
+
+    def test_seeded_league_is_consistent(self):
+        """Los marcadores sembrados cuadran con sus eventos y los partidos en vivo tienen un set abierto"""
+        call_command('seed_league', teams=4, players=8, matches=6, live=1, upcoming=1, seed=7, stdout=StringIO())
+
+        self.assertEqual(Match.objects.count(), 8)
+        for current_set in Set.objects.all():
+            last = PointEvent.objects.filter(set=current_set).order_by('-home_score_after', '-away_score_after').first()
+            self.assertEqual(PointEvent.objects.filter(set=current_set).count(),
+                             current_set.home_team_score + current_set.away_team_score)
+            if current_set.end_time:
+                self.assertGreaterEqual(abs(last.home_score_after - last.away_score_after), 2)
+        live = Match.objects.get(status='live')
+        self.assertEqual(live.sets.filter(end_time__isnull=True).count(), 1)
+        for match in Match.objects.all():
+            self.assertEqual(check_projection(match.pk), [])
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('statistics')).data['totalMatches'], 8)
+
+    def test_benchmark_reports_every_endpoint(self):
+        call_command('seed_league', teams=2, players=6, matches=1, live=1, upcoming=0, seed=1, stdout=StringIO())
+        output = StringIO()
+        call_command('benchmark_api', repeat=1, json=True, stdout=output)
+
+        results = json.loads(output.getvalue())
+        self.assertTrue(all(row['status'] == 200 for row in results))
+        self.assertTrue(all(row['queries'] > 0 and row['bytes'] > 0 for row in results))
+        # Las escrituras medidas se deshacen
+        self.assertEqual(MatchEvent.objects.count(), 0)
+
+
+class PointEventExportTests(APITestCase):
+
+    def setUp(self):
+        self.home, self.away = create_team('Local'), create_team('Visita')
+        self.match = create_match(self.home, self.away, sets=2, points_per_set=3)
+        self.other = create_match(create_team('Otro'), create_team('Rival'), sets=1, points_per_set=2)
+        self.other.date = timezone.now() - timezone.timedelta(days=30)
+        self.other.save()
+        PointEvent.objects.filter(match=self.other).update(point_type='ACE')
+        self.url = reverse('export-point-events')
+
+    def fetch(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_streams_every_point(self):
+        rows = [json.loads(line) for line in self.fetch().splitlines()]
+        self.assertEqual(len(rows), 8)
+        self.assertEqual([row['id'] for row in rows], sorted(row['id'] for row in rows))
+        first = rows[0]
+        self.assertEqual(first['match_id'], self.match.pk)
+        self.assertEqual(first['set_number'], 1)
+        self.assertEqual(first['team'], 'Local')
+        self.assertEqual(first['player'], 'Local 1')
+
+    def test_filters(self):
+        by_match = self.fetch(match=self.match.pk).splitlines()
+        self.assertEqual(len(by_match), 6)
+        by_team = self.fetch(team=self.away.pk).splitlines()
+        self.assertEqual(len(by_team), 6)
+        self.assertEqual(len(self.fetch(point_type='ACE').splitlines()), 2)
+
+        today = timezone.localdate().isoformat()
+        self.assertEqual(len(self.fetch(date_from=today, date_to=today).splitlines()), 6)
+
+        response = self.client.get(self.url, {'point_type': 'XXX', 'date_from': 'ayer'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('point_type', response.data)
+        self.assertIn('date_from', response.data)
+
+    def test_csv_and_columnar_formats(self):
+        lines = self.fetch(type='csv', match=self.other.pk).splitlines()
+        self.assertTrue(lines[0].startswith('id,match_id,match_date,set_number'))
+        self.assertEqual(len(lines), 3)
+        self.assertIn(',ACE,', lines[1])
+
+        empty = self.fetch(type='csv', match=9999).splitlines()
+        self.assertEqual(len(empty), 1)
+
+        [batch] = [json.loads(line) for line in self.fetch(type='columns', match=self.match.pk).splitlines()]
+        self.assertEqual(batch['rows'], 6)
+        self.assertEqual(batch['columns']['home_score_after'], [1, 2, 3, 1, 2, 3])
+
+    def test_rows_are_read_in_keyset_chunks(self):
+        params = {'type': 'ndjson'}
+        with CaptureQueriesContext(connection) as context:
+            lines = ''.join(export_point_events(params, chunk_size=3)).splitlines()
+        self.assertEqual(len(lines), 8)
+        # 3 + 3 + 2 filas y una consulta vacía que cierra el recorrido
+        self.assertEqual(len(context.captured_queries), 4)
+        self.assertTrue(all('LIMIT 3' in query['sql'] for query in context.captured_queries))
+
+
+@skipIf(analytics.pa is None, "pyarrow no está instalado")
+class SeasonExportTests(APITestCase):
+
+    def setUp(self):
+        self.match = create_match(create_team('Local'), create_team('Visita'), sets=2, points_per_set=3)
+        self.season, self.month = self.match.date.year, timezone.localtime(self.match.date).month
+        PointEvent.objects.filter(pk=PointEvent.objects.first().pk).update(point_type='ACE')
+
+    def test_command_writes_partitioned_parquet(self):
+        pq = analytics.pq
+        with tempfile.TemporaryDirectory() as output:
+            call_command('export_season', str(self.season), '--output', output, '--chunk-size', '4', stdout=StringIO())
+            partition = os.path.join(output, 'point_events', f'season={self.season}', f'month={self.month:02d}')
+            table = pq.read_table(os.path.join(partition, 'part-0.parquet'))
+
+            self.assertEqual(table.num_rows, 6)
+            self.assertEqual(str(table.schema.field('point_type').type), 'dictionary<values=string, indices=int8, ordered=0>')
+            self.assertEqual(str(table.schema.field('set_number').type), 'int16')
+            self.assertEqual(table.column('point_type').to_pylist().count('ACE'), 1)
+
+            sets = pq.read_table(os.path.join(output, 'sets', f'season={self.season}', f'month={self.month:02d}', 'part-0.parquet'))
+            self.assertEqual(sorted(sets.column('set_number').to_pylist()), [1, 2])
+            performances = pq.read_table(
+                os.path.join(output, 'performances', f'season={self.season}', f'month={self.month:02d}', 'part-0.parquet'))
+            self.assertEqual(set(performances.column('position').to_pylist()), {'CE'})
+
+    def test_endpoint_streams_arrow_ipc(self):
+        response = self.client.get(reverse('export-season', args=[self.season, 'point_events']),
+                                   {'type': 'arrow', 'month': self.month})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        reader = analytics.pa.ipc.open_file(BytesIO(b''.join(response.streaming_content)))
+        table = reader.read_all()
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(table.column('match_id').to_pylist(), [self.match.pk] * 6)
+
+        other_month = self.month % 12 + 1
+        response = self.client.get(reverse('export-season', args=[self.season, 'sets']), {'month': other_month})
+        table = analytics.pq.read_table(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.num_rows, 0)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(reverse('export-season', args=[self.season, 'matches'])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('export-season', args=[self.season, 'sets']), {'month': 13}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        with mock.patch.object(analytics, 'pa', None):
+            response = self.client.get(reverse('export-season', args=[self.season, 'sets']))
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+
+class MatchPaginationTests(APITestCase):
+
+    def setUp(self):
+        home, away = create_team('Local'), create_team('Visita')
+        now = timezone.now()
+        self.matches = Match.objects.bulk_create([
+            Match(home_team=home, away_team=away, date=now - timezone.timedelta(days=day), location='Estadio')
+            for day in range(8)
+        ])
+
+    def test_matches_cursor_goes_from_newest_to_oldest(self):
+        response = self.client.get(reverse('match-list'), {'pagination': 'cursor', 'view': 'summary'})
+        first = [match['id'] for match in response.data['results']]
+        response = self.client.get(response.data['next'])
+        second = [match['id'] for match in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(first + second, [match.pk for match in self.matches])
+
+    def test_performances_are_only_paginated_on_request(self):
+        create_match(create_team('A'), create_team('B'), sets=3)
+        response = self.client.get(reverse('playerperformance-list'))
+        self.assertEqual(len(response.data), 3)
+
+        response = self.client.get(reverse('playerperformance-list'), {'pagination': 'cursor', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+
+class MaterializedMatchTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=2, points_per_set=3)
+        self.detail_url = reverse('match-detail', args=[self.match.pk])
+
+    def finish(self):
+        response = self.client.post(reverse('match-end', args=[self.match.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.match.refresh_from_db()
+
+    def queried_tables(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, ' '.join(query['sql'] for query in context.captured_queries)
+
+    def test_end_match_stores_representation(self):
+        self.assertIsNone(self.match.materialized)
+        self.finish()
+
+        self.assertEqual(len(self.match.materialized['sets']), 2)
+        self.assertNotIn('home_team', self.match.materialized)
+
+    def test_finished_match_is_served_without_nested_queries(self):
+        live = self.client.get(self.detail_url).data
+        self.finish()
+        expected = MatchSerializer(Match.objects.defer('materialized').get(pk=self.match.pk)).data
+
+        for url in (self.detail_url, reverse('match-list')):
+            response, sql = self.queried_tables(url)
+            self.assertNotIn('matches_set', sql)
+            self.assertNotIn('matches_pointevent', sql)
+            self.assertNotIn('matches_playerperformance', sql)
+        detail = self.client.get(self.detail_url).data
+        self.assertEqual(json.loads(json.dumps(detail)), json.loads(json.dumps(expected)))
+        # Sets y puntos no cambian al finalizar
+        self.assertEqual(detail['sets'], live['sets'])
+
+    def test_team_changes_are_still_visible(self):
+        self.finish()
+        self.client.get(self.detail_url)
+        self.client.patch(reverse('team-detail', args=[self.home_team.pk]), {'name': 'Renombrado'}, format='json')
+
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['home_team']['name'], 'Renombrado')
+
+    @override_settings(ROSTER_CACHE_ENABLED=False)
+    def test_teams_keep_players_without_roster_cache(self):
+        self.finish()
+        response = self.client.get(reverse('match-list'))
+
+        self.assertEqual(len(response.data['results'][0]['home_team']['players']), 6)
+        self.assertEqual(len(response.data['results'][0]['sets']), 2)
+
+    def test_sparse_requests_bypass_representation(self):
+        self.finish()
+        Match.objects.filter(pk=self.match.pk).update(materialized={'sets': []})
+
+        response = self.client.get(self.detail_url, {'fields': 'id,sets'})
+        self.assertEqual(len(response.data['sets']), 2)
+
+    def test_api_and_admin_edits_rebuild_representation(self):
+        self.finish()
+        response = self.client.put(self.detail_url, {
+            'home_team_id': self.home_team.pk, 'away_team_id': self.away_team.pk,
+            'date': self.match.date.isoformat(), 'location': 'Coliseo'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.materialized['location'], 'Coliseo')
+
+        current_set = self.match.sets.get(set_number=2)
+        current_set.home_team_score = 25
+        admin.site._registry[Set].save_model(None, current_set, None, True)
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.materialized['sets'][1]['home_team_score'], 25)
+
+    def test_player_renames_are_still_visible(self):
+        self.finish()
+        scorer = self.home_team.players.first()
+        stored = {**self.match.materialized, 'player_performances': [
+            {'id': 1, 'player': scorer.pk, 'player_name': scorer.name, 'points': 6,
+             'spike_points': 6, 'block_points': 0, 'aces': 0, 'errors': 0}]}
+        Match.objects.filter(pk=self.match.pk).update(materialized=stored)
+
+        def player_name(url=self.detail_url):
+            data = self.client.get(url).data
+            return (data['results'][0] if 'results' in data else data)['player_performances'][0]['player_name']
+
+        self.client.patch(reverse('player-detail', args=[scorer.pk]), {'name': 'Por id'}, format='json')
+        self.assertEqual(player_name(), 'Por id')
+
+        # Desde el plantel del equipo (bulk_update, sin señales)
+        roster = [{'id': player.pk} for player in self.home_team.players.all()]
+        roster[0] = {'id': scorer.pk, 'name': 'Por plantel'}
+        self.client.patch(reverse('team-detail', args=[self.home_team.pk]), {'players': roster}, format='json')
+        self.assertEqual(player_name(), 'Por plantel')
+
+        # Un jugador que ya no está en ninguno de los dos equipos se lee de la base
+        Player.objects.filter(pk=scorer.pk).update(team=create_team('Otro'), name='Traspasado')
+        cache.clear()
+        self.assertEqual(player_name(reverse('match-list')), 'Traspasado')
+
+    def test_weather_edits_rebuild_representation(self):
+        self.finish()
+        weather_url = reverse('weather-detail', args=[self.match.current_weather_id])
+        self.client.patch(weather_url, {'temperature': 31}, format='json')
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.materialized['current_weather']['temperature'], 31)
+
+        self.client.delete(weather_url)
+        self.match.refresh_from_db()
+        self.assertIsNone(self.match.materialized['current_weather'])
+
+    def test_command_backfills_finished_matches(self):
+        Match.objects.filter(pk=self.match.pk).update(status='finished')
+        call_command('materialize_matches', stdout=StringIO())
+
+        self.match.refresh_from_db()
+        self.assertEqual(len(self.match.materialized['sets']), 2)
+
+
+class FastSerializationTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=3, points_per_set=4)
+        PointEvent.objects.filter(set__set_number=1).update(description='Remate «cruzado»\u2028')
+        self.detail_url = reverse('match-detail', args=[self.match.pk])
+
+    def get(self, url, params=None, **flags):
+        with override_settings(**flags):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_plain_functions_match_field_serializers(self):
+        fast = self.get(self.detail_url, FAST_SERIALIZERS_ENABLED=True).data
+        slow = self.get(self.detail_url, FAST_SERIALIZERS_ENABLED=False).data
+
+        self.assertEqual(json.loads(json.dumps(fast)), json.loads(json.dumps(slow)))
+        self.assertEqual(fast['sets'][0]['point_events'][0]['description'], 'Remate «cruzado»\u2028')
+
+        url = reverse('playerperformance-list')
+        self.assertEqual(self.get(url, FAST_SERIALIZERS_ENABLED=True).json(),
+                         self.get(url, FAST_SERIALIZERS_ENABLED=False).json())
+
+    def test_sparse_fields_use_field_serializers(self):
+        response = self.get(self.detail_url, {'fields': 'sets.set_number,sets.point_events.point_type'})
+
+        self.assertEqual(response.data['sets'][0], {'set_number': 1, 'point_events': [{'point_type': 'SPK'}] * 4})
+
+    @skipIf(orjson is None, "orjson no está instalado")
+    def test_orjson_renderer_matches_drf_output(self):
+        fast = self.get(self.detail_url, FAST_JSON_ENABLED=True)
+        slow = self.get(self.detail_url, FAST_JSON_ENABLED=False)
+
+        self.assertEqual(fast.content, slow.content)
+        self.assertIn(b'\\u2028', fast.content)
+
+    @skipIf(orjson is None, "orjson no está instalado")
+    def test_orjson_renderer_matches_drf_for_raw_values(self):
+        """Valores sin pasar por un serializer (p. ej. respuestas armadas a mano en las acciones)"""
+        data = {
+            'utc': datetime.datetime(2024, 5, 1, 18, 30, 15, 250000, tzinfo=datetime.timezone.utc),
+            'local': timezone.localtime(timezone.now(), zoneinfo.ZoneInfo('America/Santiago')),
+            'naive': datetime.datetime(2024, 5, 1, 18, 30),
+            'date': datetime.date(2024, 5, 1),
+            'time': datetime.time(18, 30, 15),
+            'duration': datetime.timedelta(minutes=25, seconds=3),
+            'decimal': decimal.Decimal('21.50'),
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        }
+        with override_settings(FAST_JSON_ENABLED=True):
+            fast = FastJSONRenderer().render(data)
+        self.assertEqual(fast, JSONRenderer().render(data))
+        self.assertIn(b'"2024-05-01T18:30:15.250000Z"', fast)
+
+    @skipIf(orjson is None, "orjson no está instalado")
+    def test_orjson_parser(self):
+        url = reverse('team-list')
+        response = self.client.post(url, '{"name": "Ñandú", "gender": "F", "players": []}', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['name'], 'Ñandú')
+
+        response = self.client.post(url, '{"name": NaN}', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('JSON parse error', response.data['detail'])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_serialization', match=self.match.pk, repeat=2, json=True, stdout=out, stderr=StringIO())
+
+        results = json.loads(out.getvalue())
+        self.assertEqual(results[0]['case'], 'DRF campo a campo + JSONRenderer')
+        self.assertTrue(all(row['bytes'] > 0 for row in results))
+
+
+class ConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=1, points_per_set=2)
+        self.detail_url = reverse('match-detail', args=[self.match.pk])
+
+    def tearDown(self):
+        cache.clear()
+
+    def score(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('match-update-score', args=[self.match.pk]),
+                {'set_number': 1, 'player_id': self.home_team.players.first().pk, 'point_type': 'SPK'},
+                format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unchanged_match_returns_not_modified_without_queries(self):
+        first = self.client.get(self.detail_url)
+        self.assertEqual(first['Cache-Control'], 'no-cache')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_scoring_changes_detail_and_list_etags(self):
+        detail = self.client.get(self.detail_url)
+        listing = self.client.get(reverse('match-list'))
+        self.score()
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['sets'][0]['home_team_score'], 1)
+        response = self.client.get(reverse('match-list'), HTTP_IF_NONE_MATCH=listing['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_team_and_weather_changes_change_etag(self):
+        first = self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('team-detail', args=[self.home_team.pk]), {'name': 'Renombrado'}, format='json')
+        second = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('weather-update-match-weather'),
+                             {'match_id': self.match.pk, 'temperature': 5, 'condition': 'Snowy'}, format='json')
+        third = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertEqual(third.data['current_weather']['condition'], 'Snowy')
+
+    def test_etag_depends_on_query_string(self):
+        first = self.client.get(reverse('match-list'))
+        response = self.client.get(reverse('match-list'), {'view': 'summary'}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_gzip_response_keeps_conditional_get(self):
+        first = self.client.get(self.detail_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertTrue(first['ETag'].startswith('W/'))
+        self.assertIn('Accept-Encoding', first['Vary'])
+
+        response = self.client.get(self.detail_url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @skipIf(compression.brotli is None, "brotli no está instalado")
+    def test_brotli_is_preferred(self):
+        response = self.client.get(self.detail_url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(compression.brotli.decompress(response.content))['id'], self.match.pk)
+
+    def test_live_stream_is_not_compressed(self):
+        response = HttpResponse('data: {}\n\n' * 100, content_type='text/event-stream')
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        middleware = compression.CompressionMiddleware(lambda request: response)
+
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+
+    def test_process_local_cache_fails_the_system_check(self):
+        """Con varios workers, una versión en memoria local dejaría respondiendo 304 con datos viejos"""
+        with override_settings(REQUIRE_SHARED_CACHE=True):
+            errors = checks.check_shared_caches(None)
+        self.assertEqual([error.id for error in errors], ['volley_back.E001'])
+
+        shared = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'},
+        }
+        with override_settings(REQUIRE_SHARED_CACHE=True, CACHES=shared, RESOURCE_VERSION_CACHE_ALIAS='shared',
+                               IDEMPOTENCY_CACHE_ALIAS='shared', STATISTICS_CACHE_ALIAS='shared'):
+            self.assertEqual(checks.check_shared_caches(None), [])
+        with override_settings(REQUIRE_SHARED_CACHE=False):
+            self.assertEqual(checks.check_shared_caches(None), [])
+
+
+class RosterCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.home, self.away = create_team('Local'), create_team('Visita')
+        for _ in range(3):
+            create_match(self.home, self.away)
+
+    def player_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [query for query in context.captured_queries if 'FROM "teams_player"' in query['sql']]
+
+    def test_warm_match_list_reuses_roster_fragments(self):
+        cold, queries = self.player_queries(reverse('match-list'))
+        self.assertEqual(len(queries), 1)
+
+        warm, queries = self.player_queries(reverse('match-list'))
+        self.assertEqual(queries, [])
+        self.assertEqual(warm.data, cold.data)
+        self.assertEqual(len(warm.data['results'][0]['home_team']['players']), 6)
+
+        _, queries = self.player_queries(reverse('match-detail', args=[Match.objects.first().pk]))
+        self.assertEqual(queries, [])
+        _, queries = self.player_queries(reverse('team-list'))
+        self.assertEqual(queries, [])
+
+    def test_player_changes_invalidate_the_roster(self):
+        self.client.get(reverse('match-list'))
+        player = self.home.players.first()
+        player.name = 'Renombrado'
+        player.save()
+
+        response, queries = self.player_queries(reverse('match-list'))
+        self.assertEqual(len(queries), 1)
+        names = [item['name'] for item in response.data['results'][0]['home_team']['players']]
+        self.assertIn('Renombrado', names)
+
+        removed = self.away.players.last()
+        self.client.delete(reverse('team-remove-player', args=[self.away.pk, removed.pk]))
+        response, _ = self.player_queries(reverse('match-detail', args=[Match.objects.first().pk]))
+        self.assertEqual(len(response.data['away_team']['players']), 5)
+
+    def test_team_update_invalidates_the_roster(self):
+        self.client.get(reverse('team-detail', args=[self.home.pk]))
+        self.client.patch(reverse('team-detail', args=[self.home.pk]), {'name': 'Nuevo Nombre'}, format='json')
+        response = self.client.get(reverse('match-list'))
+        self.assertEqual(response.data['results'][0]['home_team']['name'], 'Nuevo Nombre')
+
+    def test_sparse_teams_skip_the_cache(self):
+        self.client.get(reverse('match-list'))
+        response, queries = self.player_queries(reverse('match-list'), {'fields': 'id,home_team.name'})
+        self.assertEqual(response.data['results'][0], {'id': response.data['results'][0]['id'], 'home_team': {'name': 'Local'}})
+        self.assertEqual(queries, [])
+
+    @override_settings(ROSTER_CACHE_ENABLED=False)
+    def test_disabled_cache_prefetches_as_before(self):
+        self.player_queries(reverse('match-list'))
+        _, queries = self.player_queries(reverse('match-list'))
+        # Una precarga por equipo local y otra por visitante en cada petición
+        self.assertEqual(len(queries), 2)
+
+
+class RequestMetricsTests(APITestCase):
+
+    def setUp(self):
+        registry.reset()
+        self.match = create_match(create_team('Local'), create_team('Visita'), sets=2, points_per_set=3)
+
+    def test_server_timing_reports_queries_and_serializer_time(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('match-detail', args=[self.match.pk]))
+
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{len(context.captured_queries)} queries"', timing)
+        self.assertIn('serializer;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_metrics_endpoint_aggregates_per_route(self):
+        self.client.get(reverse('match-detail', args=[self.match.pk]))
+        self.client.get(reverse('match-detail', args=[self.match.pk]))
+        self.client.get(reverse('match-detail', args=[9999]))
+
+        response = self.client.get('/api/_metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        labels = 'method="GET",route="api/matches/<int:pk>/"'
+        self.assertIn(f'volley_http_requests_total{{{labels},status="2xx"}} 2', body)
+        self.assertIn(f'volley_http_requests_total{{{labels},status="4xx"}} 1', body)
+        self.assertIn(f'volley_http_request_duration_seconds_count{{{labels}}} 3', body)
+        self.assertIn('volley_statistics_cache_total{result="hit"}', body)
+
+    @override_settings(REQUEST_METRICS_SLOW_MS=0)
+    def test_slow_requests_are_logged_with_duplicated_sql(self):
+        with self.assertLogs('volley_back.slow_requests', level='WARNING') as logs:
+            self.client.get(reverse('match-detail', args=[self.match.pk]))
+        self.assertIn('Petición lenta GET', logs.output[0])
+
+        metrics = RequestMetrics()
+        for _ in range(3):
+            metrics(lambda *args: None, 'SELECT 1', (), False, {})
+        self.assertEqual(metrics.duplicated_statements(), [('SELECT 1', 3)])
+
+
+class IdempotencyKeyTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        self.set = Set.objects.create(match=self.match, set_number=1, start_time=timezone.now())
+        self.url = reverse('match-update-score', args=[self.match.pk])
+        self.data = {'set_number': 1, 'player_id': self.home_team.players.first().pk, 'point_type': 'SPK'}
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_retry_with_same_key_is_not_applied_twice(self):
+        """Un reintento con la misma Idempotency-Key devuelve la respuesta guardada"""
+        first = self.client.patch(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        with CaptureQueriesContext(connection) as context:
+            retry = self.client.patch(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(PointEvent.objects.filter(match=self.match).count(), 1)
+
+    def test_different_keys_are_applied(self):
+        self.client.patch(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='uno')
+        self.client.patch(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='dos')
+        self.assertEqual(PointEvent.objects.filter(match=self.match).count(), 2)
+
+    def test_key_reused_with_other_payload_is_rejected(self):
+        self.client.patch(self.url, self.data, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        response = self.client.patch(self.url, {**self.data, 'point_type': 'ACE'}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_set_actions_honor_the_key(self):
+        """Las acciones de SetViewSet también respetan la cabecera"""
+        url = reverse('update-timeouts', args=[self.match.pk])
+        self.client.post(url, {'team': 'home'}, format='json', HTTP_IDEMPOTENCY_KEY='to-1')
+        self.client.post(url, {'team': 'home'}, format='json', HTTP_IDEMPOTENCY_KEY='to-1')
+        self.set.refresh_from_db()
+        self.assertEqual(self.set.home_timeouts, 1)
+
+
+class LiveScoreTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        Set.objects.create(match=self.match, set_number=1, start_time=timezone.now())
+        self.player = self.home_team.players.first()
+
+    def score(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse('match-update-score', args=[self.match.pk]),
+                {'set_number': 1, 'player_id': self.player.pk, 'point_type': 'SPK'}, format='json')
+
+    def test_broker_fans_out_one_frame_to_every_subscriber(self):
+        """Un punto se serializa una vez y llega a todos los suscriptores del partido"""
+        async def listen():
+            broker = InProcessBroker()
+            subscriptions = [broker.subscribe(self.match.pk) for _ in range(50)]
+            other = broker.subscribe(self.match.pk + 1)
+            frame = encode_event('point', {'home': 1, 'away': 0})
+            await asyncio.get_running_loop().run_in_executor(None, broker.publish, self.match.pk, frame)
+            received = [await asyncio.wait_for(sub.get(), 1) for sub in subscriptions]
+            for sub in subscriptions + [other]:
+                sub.close()
+            return received, other.queue.qsize(), broker.subscriber_count(self.match.pk)
+
+        received, other_pending, remaining = asyncio.run(listen())
+        self.assertTrue(all(frame is received[0] for frame in received))
+        self.assertEqual(other_pending, 0)
+        self.assertEqual(remaining, 0)
+
+    async def test_stream_sends_snapshot_and_point_deltas(self):
+        """El canal SSE envía el snapshot y después el delta de cada punto confirmado"""
+        response = await self.async_client.get(reverse('match-live', args=[self.match.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        snapshot = await anext(stream)
+        self.assertTrue(snapshot.startswith(b'event: snapshot'))
+
+        await sync_to_async(self.score)()
+        frame = await asyncio.wait_for(anext(stream), 2)
+        self.assertTrue(frame.startswith(b'event: point'))
+        payload = json.loads(frame.decode().split('data: ', 1)[1])
+        self.assertEqual((payload['home'], payload['away']), (1, 0))
+        await stream.aclose()
+
+    def test_stream_unknown_match(self):
+        response = self.client.get(reverse('match-live', args=[9999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConcurrentScoringTests(TransactionTestCase):
+
+    # Sin SELECT ... FOR UPDATE (SQLite) los hilos no se serializan por el bloqueo del partido
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_parallel_points_are_not_lost(self):
+        """Muchos anotadores a la vez: el marcador final coincide con el número de peticiones"""
+        home_team = create_team('Local')
+        away_team = create_team('Visita')
+        match = create_match(home_team, away_team, sets=0)
+        current_set = Set.objects.create(match=match, set_number=1, start_time=timezone.now())
+        player = home_team.players.first()
+        url = reverse('match-update-score', args=[match.pk])
+        requests_count = 20
+        responses = []
+
+        def score():
+            try:
+                response = APIClient().patch(
+                    url, {'set_number': 1, 'player_id': player.pk, 'point_type': 'SPK'}, format='json')
+                responses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=score) for _ in range(requests_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(responses, [status.HTTP_200_OK] * requests_count)
+        current_set.refresh_from_db()
+        self.assertEqual(current_set.home_team_score, requests_count)
+        performance = PlayerPerformance.objects.get(match=match, set=current_set, player=player)
+        self.assertEqual(performance.points, requests_count)
+        self.assertEqual(PointEvent.objects.filter(set=current_set).count(), requests_count)
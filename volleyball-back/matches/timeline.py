@@ -0,0 +1,252 @@
+# matches/timeline.py
+from django.db import transaction
+from volley_back.conditional import bump_versions, match_scopes
+from .models import Match, MatchEvent, MatchSnapshot, PlayerPerformance, Set
+
+# Cada cuántos eventos se guarda una instantánea: reconstruir cualquier estado cuesta como
+# mucho este número de eventos reproducidos
+SNAPSHOT_INTERVAL = 50
+
+COUNTER_FIELDS = {
+    'SPK': 'spike_points',
+    'BLK': 'block_points',
+    'ACE': 'aces',
+    'ERR': 'errors',
+}
+SCORING_POINT_TYPES = ('SPK', 'BLK', 'ACE')
+PERFORMANCE_COUNTERS = ('points', 'spike_points', 'block_points', 'aces', 'errors')
+
+# Acciones que entran en la pila de deshacer; cada evento guarda en `previous` la cima anterior
+UNDOABLE_KINDS = ('point', 'timeout')
+
+
+def empty_state():
+    return {'status': None, 'weather': None, 'sets': {}, 'performances': {}}
+
+
+def _empty_set():
+    return {'home': 0, 'away': 0, 'home_timeouts': 0, 'away_timeouts': 0, 'ended': False}
+
+
+def performance_key(set_number, player_id):
+    # Las claves JSON son cadenas: "<set>:<jugador>"
+    return f"{set_number}:{player_id}"
+
+
+def apply_event(state, kind, payload):
+    """
+    Aplica un evento al estado (lo modifica y lo devuelve)
+
+    `undo` y `redo` llevan en `action` la acción que revierten o repiten (los `undo` de
+    `update_score` no la llevan: siempre son puntos). Lo deshecho resta sin bajar de cero.
+    """
+    if kind == 'redo':
+        return apply_event(state, payload['action'], payload)
+    if kind == 'undo':
+        return _revert_event(state, payload.get('action', 'point'), payload)
+
+    if kind == 'status':
+        state['status'] = payload['status']
+    elif kind == 'weather':
+        state['weather'] = {'temperature': payload['temperature'], 'condition': payload['condition']}
+    elif kind == 'set_started':
+        state['sets'].setdefault(str(payload['set_number']), _empty_set())
+    elif kind == 'set_ended':
+        state['sets'].setdefault(str(payload['set_number']), _empty_set())['ended'] = True
+    elif kind == 'timeout':
+        _shift_timeout(state, payload, 1)
+    elif kind == 'point':
+        _shift_point(state, payload, 1)
+    return state
+
+
+def _revert_event(state, action, payload):
+    if action == 'timeout':
+        _shift_timeout(state, payload, -1)
+    elif action == 'point':
+        _shift_point(state, payload, -1)
+    return state
+
+
+def _shift_timeout(state, payload, sign):
+    current_set = state['sets'].setdefault(str(payload['set_number']), _empty_set())
+    field = f"{payload['team']}_timeouts"
+    current_set[field] = max(0, current_set[field] + sign)
+
+
+def _shift_point(state, payload, sign):
+    current_set = state['sets'].setdefault(str(payload['set_number']), _empty_set())
+    current_set[payload['side']] = max(0, current_set[payload['side']] + sign)
+
+    key = performance_key(payload['set_number'], payload['player_id'])
+    performance = state['performances'].setdefault(key, dict.fromkeys(PERFORMANCE_COUNTERS, 0))
+    counter = COUNTER_FIELDS[payload['point_type']]
+    performance[counter] = max(0, performance[counter] + sign)
+    if payload['point_type'] in SCORING_POINT_TYPES:
+        performance['points'] = max(0, performance['points'] + sign)
+
+
+def capture_state(match_id):
+    """Lee el estado actual desde las tablas (proyección), sin pasar por el registro"""
+    state = empty_state()
+    match = Match.objects.filter(pk=match_id).values(
+        'status', 'current_weather__temperature', 'current_weather__condition').first()
+    if match is None:
+        return state
+    state['status'] = match['status']
+    if match['current_weather__condition'] is not None:
+        state['weather'] = {
+            'temperature': match['current_weather__temperature'],
+            'condition': match['current_weather__condition'],
+        }
+
+    for row in Set.objects.filter(match_id=match_id).values(
+            'set_number', 'home_team_score', 'away_team_score', 'home_timeouts', 'away_timeouts', 'end_time'):
+        state['sets'][str(row['set_number'])] = {
+            'home': row['home_team_score'],
+            'away': row['away_team_score'],
+            'home_timeouts': row['home_timeouts'],
+            'away_timeouts': row['away_timeouts'],
+            'ended': row['end_time'] is not None,
+        }
+
+    for row in PlayerPerformance.objects.filter(match_id=match_id, set__isnull=False).values(
+            'set__set_number', 'player_id', *PERFORMANCE_COUNTERS):
+        key = performance_key(row['set__set_number'], row['player_id'])
+        performance = state['performances'].setdefault(key, dict.fromkeys(PERFORMANCE_COUNTERS, 0))
+        for counter in PERFORMANCE_COUNTERS:
+            performance[counter] += row[counter]
+    return state
+
+
+def append_events(match, entries, locked=False, stack=None):
+    """
+    Añade eventos al registro del partido y devuelve la secuencia del primero
+
+    Debe llamarse dentro de una transacción y antes de tocar las tablas derivadas. El primer
+    evento de un partido guarda la instantánea 0 con el estado de las tablas, de modo que
+    los partidos anteriores al registro también se pueden reproducir. Los puntos y tiempos
+    fuera se apilan para deshacer y vacían la pila de rehacer.
+
+    Args:
+        match: Partido; `last_sequence`, `undo_head` y `redo_head` quedan actualizados en memoria
+        entries: Lista de (kind, payload)
+        locked: True si el llamador ya bloqueó la fila del partido con SELECT ... FOR UPDATE
+        stack: (undo_head, redo_head) que fija una operación de deshacer/rehacer
+    """
+    if not locked:
+        match.last_sequence, match.undo_head, match.redo_head = Match.objects.select_for_update().values_list(
+            'last_sequence', 'undo_head', 'redo_head').get(pk=match.pk)
+    start = match.last_sequence
+    if start == 0:
+        MatchSnapshot.objects.create(match_id=match.pk, sequence=0, state=capture_state(match.pk))
+
+    undo_head, redo_head = match.undo_head, match.redo_head
+    events = []
+    for sequence, (kind, payload) in enumerate(entries, start=start + 1):
+        if kind in UNDOABLE_KINDS:
+            payload = {**payload, 'previous': undo_head}
+            undo_head, redo_head = sequence, 0
+        events.append(MatchEvent(match_id=match.pk, sequence=sequence, kind=kind, payload=payload))
+    if stack is not None:
+        undo_head, redo_head = stack
+
+    end = start + len(entries)
+    Match.objects.filter(pk=match.pk).update(last_sequence=end, undo_head=undo_head, redo_head=redo_head)
+    # Las escrituras de puntuación usan update()/bulk_create, sin señales
+    bump_versions(*match_scopes(match.pk))
+    match.last_sequence, match.undo_head, match.redo_head = end, undo_head, redo_head
+    MatchEvent.objects.bulk_create(events)
+
+    if start // SNAPSHOT_INTERVAL != end // SNAPSHOT_INTERVAL:
+        MatchSnapshot.objects.create(match_id=match.pk, sequence=end, state=state_at(match.pk, end))
+    return start + 1
+
+
+def state_at(match_id, sequence=None):
+    """
+    Reconstruye el estado del partido tras el evento `sequence` (o el actual si es None)
+
+    Parte de la instantánea más cercana y reproduce como mucho SNAPSHOT_INTERVAL eventos:
+    dos consultas sin importar la longitud del partido.
+    """
+    snapshots = MatchSnapshot.objects.filter(match_id=match_id)
+    if sequence is not None:
+        snapshots = snapshots.filter(sequence__lte=sequence)
+    snapshot = snapshots.order_by('-sequence').only('sequence', 'state').first()
+    if snapshot is None:
+        # Partido sin registro todavía: las tablas son la única fuente
+        return capture_state(match_id)
+
+    state = snapshot.state
+    events = MatchEvent.objects.filter(match_id=match_id, sequence__gt=snapshot.sequence)
+    if sequence is not None:
+        events = events.filter(sequence__lte=sequence)
+    for kind, payload in events.order_by('sequence').values_list('kind', 'payload'):
+        apply_event(state, kind, payload)
+    return state
+
+
+def check_projection(match_id):
+    """
+    Compara las tablas derivadas con el estado reconstruido desde el registro
+
+    Returns:
+        list: Descripción de cada diferencia encontrada
+    """
+    expected = state_at(match_id)
+    current = capture_state(match_id)
+    differences = []
+    for number, expected_set in expected['sets'].items():
+        current_set = current['sets'].get(number)
+        for field in ('home', 'away', 'home_timeouts', 'away_timeouts'):
+            found = current_set[field] if current_set else None
+            if found != expected_set[field]:
+                differences.append(f"set {number} {field}: tablas={found} registro={expected_set[field]}")
+
+    zeros = dict.fromkeys(PERFORMANCE_COUNTERS, 0)
+    for key in expected['performances'].keys() | current['performances'].keys():
+        found = current['performances'].get(key, zeros)
+        wanted = expected['performances'].get(key, zeros)
+        for counter in PERFORMANCE_COUNTERS:
+            if found[counter] != wanted[counter]:
+                differences.append(f"rendimiento {key} {counter}: tablas={found[counter]} registro={wanted[counter]}")
+    return differences
+
+
+@transaction.atomic
+def rebuild_projection(match_id):
+    """Reescribe marcadores, tiempos fuera y rendimientos por set desde el registro"""
+    match = Match.objects.select_for_update().get(pk=match_id)
+    state = state_at(match.pk)
+    bump_versions(*match_scopes(match.pk))
+
+    sets = {str(current_set.set_number): current_set for current_set in Set.objects.filter(match=match)}
+    for number, current_set in sets.items():
+        values = state['sets'].get(number, _empty_set())
+        current_set.home_team_score = values['home']
+        current_set.away_team_score = values['away']
+        current_set.home_timeouts = values['home_timeouts']
+        current_set.away_timeouts = values['away_timeouts']
+    Set.objects.bulk_update(sets.values(), ['home_team_score', 'away_team_score', 'home_timeouts', 'away_timeouts'])
+
+    performances = {}
+    duplicates = []
+    for performance in PlayerPerformance.objects.filter(match=match, set__isnull=False).select_related('set'):
+        key = performance_key(performance.set.set_number, performance.player_id)
+        if key in performances:
+            duplicates.append(performance.pk)
+            continue
+        performances[key] = performance
+        for counter, value in state['performances'].get(key, dict.fromkeys(PERFORMANCE_COUNTERS, 0)).items():
+            setattr(performance, counter, value)
+    PlayerPerformance.objects.bulk_update(performances.values(), PERFORMANCE_COUNTERS)
+    # Filas repetidas de un mismo jugador y set duplicarían los contadores
+    PlayerPerformance.objects.filter(pk__in=duplicates).delete()
+
+    PlayerPerformance.objects.bulk_create([
+        PlayerPerformance(match=match, set=sets[key.split(':')[0]], player_id=int(key.split(':')[1]), **counters)
+        for key, counters in state['performances'].items()
+        if key not in performances and key.split(':')[0] in sets
+    ])
+    return state
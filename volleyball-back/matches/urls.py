@@ -1,7 +1,7 @@
 # matches/urls.py
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
-from .views import MatchViewSet, SetViewSet, PlayerPerformanceViewSet
+from .views import MatchViewSet, SetViewSet, PlayerPerformanceViewSet, live_score_stream, point_events_export, season_export
 
 # Router simple para PlayerPerformance
 performance_router = SimpleRouter()
@@ -25,6 +25,25 @@ urlpatterns = [
     # Rutas para Score y PlayerPerformance
     path('matches/<int:pk>/update_score/',
          MatchViewSet.as_view({'patch': 'update_score'}), name='match-update-score'),
+    path('matches/<int:pk>/points/batch/',
+         MatchViewSet.as_view({'post': 'batch_points'}), name='match-points-batch'),
+
+    # Pilas de deshacer/rehacer del partido (puntos y tiempos fuera)
+    path('matches/<int:pk>/undo/',
+         MatchViewSet.as_view({'post': 'undo'}), name='match-undo'),
+    path('matches/<int:pk>/redo/',
+         MatchViewSet.as_view({'post': 'redo'}), name='match-redo'),
+
+    # Estado reconstruido desde el registro de eventos (actual o en `?at=<secuencia>`)
+    path('matches/<int:pk>/timeline/',
+         MatchViewSet.as_view({'get': 'timeline'}), name='match-timeline'),
+
+    # Eventos posteriores a `?since=<secuencia>` (ponerse al día tras reconectar)
+    path('matches/<int:pk>/events/',
+         MatchViewSet.as_view({'get': 'events'}), name='match-events'),
+
+    # Marcador en vivo (Server-Sent Events, requiere ASGI)
+    path('matches/<int:pk>/live/', live_score_stream, name='match-live'),
 
 
     # Rutas para Set, incluyendo update_timeouts
@@ -37,6 +56,11 @@ urlpatterns = [
     path('matches/<int:match_id>/sets/end_set/',
          SetViewSet.as_view({'post': 'end_set'}), name='end-set'),
 
+    # Historial punto a punto en streaming (NDJSON, CSV o por columnas)
+    path('exports/point-events', point_events_export, name='export-point-events'),
+    # Tablas de una temporada en Parquet o Arrow IPC (requiere pyarrow)
+    path('exports/seasons/<int:season>/<str:table>', season_export, name='export-season'),
+
     # Incluimos las rutas de PlayerPerformance
     path('', include(performance_router.urls)),
 ]
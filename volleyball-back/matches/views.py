@@ -1,31 +1,118 @@
 # matches/views.py
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
-from .models import Match, Set, PlayerPerformance, PointEvent
-from .serializers import MatchSerializer, SetSerializer, PlayerPerformanceSerializer
+from . import analytics
+from .exports import CONTENT_TYPES, PointEventExportParams, export_point_events
+from .live import encode_event, get_broker, publish_live
+from .materialized import materialize_match
+from .models import Match, MatchEvent, Set, PlayerPerformance, PointEvent
+from .scoring import apply_point, apply_points_batch, lock_match, redo_last, revert_point, undo_last, ScoringError
+from .serializers import MatchSerializer, MatchSummarySerializer, SetSerializer, PlayerPerformanceSerializer, match_event_data
+from .timeline import append_events, state_at
 from django.db.utils import IntegrityError
 from django.db import transaction
-from django.db.models import F
-from django.core.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
+from django.db.models import prefetch_related_objects
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
+from statistic.cache import invalidate_statistics
+from statistic.tracking import record_set_won
+from volley_back.conditional import MATCHES, TEAMS, ConditionalGetMixin, match_scopes
+from volley_back.idempotency import idempotent
+from volley_back.pagination import OptionalResultsSetPagination, StandardResultsSetPagination
+from volley_back.query_planner import PlannedQuerysetMixin
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 6
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+# Eventos por respuesta de `events` (ver MatchViewSet.events)
+EVENTS_PAGE_SIZE = 500
+EVENTS_MAX_PAGE_SIZE = 2000
 
-class MatchViewSet(viewsets.ModelViewSet):
-    queryset = Match.objects.all()
+
+class MatchViewSet(ConditionalGetMixin, PlannedQuerysetMixin, viewsets.ModelViewSet):
+    # Orden fijo para las páginas numeradas (el mismo que la paginación por cursor)
+    queryset = Match.objects.order_by('-date', '-id')
     serializer_class = MatchSerializer
     pagination_class = StandardResultsSetPagination
+    # Paginación por cursor (`?cursor=`): índice match_date_idx
+    cursor_ordering = ('-date', '-id')
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
 
+    def version_scopes(self):
+        # Los equipos con sus planteles van anidados en cada partido
+        if self.object_key() is None:
+            return [MATCHES, TEAMS]
+        return [match_scopes(self.object_key())[1], TEAMS]
+
+    def is_summary_view(self):
+        """`GET /api/matches/?view=summary` devuelve la versión ligera del listado"""
+        return (
+            self.action == 'list'
+            and self.request is not None
+            and self.request.query_params.get('view') == 'summary'
+        )
+
+    def get_serializer_class(self):
+        if self.is_summary_view():
+            return MatchSummarySerializer
+        return super().get_serializer_class()
+
+    def uses_materialized(self):
+        """El listado y el detalle completos sirven la representación guardada de los partidos finalizados"""
+        if self.action not in ('list', 'retrieve') or self.request is None or self.is_summary_view():
+            return False
+        return not any(name in self.request.query_params for name in ('fields', 'omit', 'expand'))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.is_summary_view():
+            queryset = queryset.with_summary()
+        if not self.uses_materialized():
+            queryset = queryset.defer('materialized')
+        return queryset
+
+    def apply_plan(self, queryset, select, prefetch):
+        if self.uses_materialized():
+            # Las precargas se aplican después, solo a los partidos sin representación guardada
+            self.deferred_prefetches = prefetch
+            prefetch = []
+        return super().apply_plan(queryset, select, prefetch)
+
+    def load_deferred_prefetches(self, matches):
+        lookups = getattr(self, 'deferred_prefetches', ())
+        if not lookups:
+            return
+        pending = [match for match in matches if match.materialized is None]
+        if pending:
+            prefetch_related_objects(pending, *lookups)
+        # Los equipos de los finalizados siguen saliendo en vivo (planteles fuera de caché)
+        team_lookups = [lookup for lookup in lookups
+                        if getattr(lookup, 'prefetch_to', lookup).startswith(('home_team__', 'away_team__'))]
+        finished = [match for match in matches if match.materialized is not None]
+        if finished and team_lookups:
+            prefetch_related_objects(finished, *team_lookups)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.load_deferred_prefetches(page)
+        return page
+
+    def get_object(self):
+        match = super().get_object()
+        self.load_deferred_prefetches([match])
+        return match
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        materialize_match(serializer.instance.pk)
+
     @action(detail=True, methods=['POST'])
+    @idempotent
     def start_match(self, request, pk=None):
         try:
             match = self.get_object()
@@ -37,6 +124,8 @@ class MatchViewSet(viewsets.ModelViewSet):
                 )
 
             with transaction.atomic():
+                append_events(match, [('set_started', {'set_number': 1}), ('status', {'status': 'live'})])
+
                 # Verificar si ya existe un set inicial
                 initial_set, created = Set.objects.get_or_create(
                     match=match,
@@ -69,6 +158,8 @@ class MatchViewSet(viewsets.ModelViewSet):
                 match.start_time = timezone.now()
                 match.status = 'live'
                 match.save()
+                publish_live(match.pk, 'status', {'status': match.status})
+                invalidate_statistics(match.pk)
 
                 return Response({
                     "status": "success",
@@ -95,6 +186,7 @@ class MatchViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['POST'])
+    @idempotent
     def end_match(self, request, pk=None):
         match = self.get_object()
         if match.start_time is None:
@@ -103,24 +195,33 @@ class MatchViewSet(viewsets.ModelViewSet):
             return Response({"error": "El partido no está en vivo"}, status=status.HTTP_400_BAD_REQUEST)
 
         end_time = timezone.now()
-        match.duration = end_time - match.start_time
-        match.status = 'finished'
-        match.end_time = end_time
-        match.save()
+        with transaction.atomic():
+            append_events(match, [('status', {'status': 'finished'})])
+            match.duration = end_time - match.start_time
+            match.status = 'finished'
+            match.end_time = end_time
+            match.save()
+            materialize_match(match.pk)
+            publish_live(match.pk, 'status', {'status': match.status})
+            invalidate_statistics(match.pk)
         return Response({"message": "El partido ha finalizado", "duration": match.duration})
 
     @action(detail=True, methods=['POST'])
+    @idempotent
     def suspend_match(self, request, pk=None):
         match = self.get_object()
         if match.status != 'live':
             return Response({"error": "El partido no está en vivo"}, status=status.HTTP_400_BAD_REQUEST)
 
-        match.status = 'suspended'  # Cambiar el estado a "Suspendido"
-        match.save()
+        with transaction.atomic():
+            append_events(match, [('status', {'status': 'suspended'})])
+            match.status = 'suspended'  # Cambiar el estado a "Suspendido"
+            match.save()
 
         return Response({"message": "El partido ha sido suspendido"})
 
     @action(detail=True, methods=['POST'])
+    @idempotent
     def reschedule_match(self, request, pk=None):
         match = self.get_object()
 
@@ -128,150 +229,189 @@ class MatchViewSet(viewsets.ModelViewSet):
         if not new_date:
             return Response({"error": "Debe proporcionar una nueva fecha"}, status=status.HTTP_400_BAD_REQUEST)
 
-        match.date = new_date
-        match.status = 'rescheduled'  # Cambiar el estado a "Reprogramado"
-        match.save()
+        with transaction.atomic():
+            append_events(match, [('status', {'status': 'rescheduled'})])
+            match.date = new_date
+            match.status = 'rescheduled'  # Cambiar el estado a "Reprogramado"
+            match.save()
 
         return Response({"message": "El partido ha sido reprogramado", "new_date": new_date})
 
     @action(detail=True, methods=['PATCH'])
+    @idempotent
     def update_score(self, request, pk=None):
-        with transaction.atomic():
-            match = self.get_object()
+        set_number = request.data.get('set_number')
+        player_id = request.data.get('player_id')
+        point_type = request.data.get('point_type')
+        undo = request.data.get('undo', False)  # Nuevo parámetro para rollback
 
-            # Validar que el partido esté en curso
-            if match.status != 'live':
-                return Response({"error": "El partido no está en curso"}, status=status.HTTP_400_BAD_REQUEST)
+        if not all([set_number, player_id, point_type]):
+            return Response({"error": "Faltan datos requeridos"}, status=status.HTTP_400_BAD_REQUEST)
 
-            set_number = request.data.get('set_number')
-            player_id = request.data.get('player_id')
-            point_type = request.data.get('point_type')
-            undo = request.data.get('undo', False)  # Nuevo parámetro para rollback
+        try:
+            if undo:
+                result = revert_point(pk, set_number, player_id, point_type)
+            else:
+                result = apply_point(pk, set_number, player_id, point_type)
+        except ScoringError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        publish_live(pk, 'point', {
+            'set_number': int(set_number),
+            'home': result['home_score'],
+            'away': result['away_score'],
+            'undo': bool(undo),
+        })
 
-            if not all([set_number, player_id, point_type]):
-                return Response({"error": "Faltan datos requeridos"}, status=status.HTTP_400_BAD_REQUEST)
+        performance = result['performance']
+        response_data = {
+            "status": "success",
+            "home_score": result['home_score'],
+            "away_score": result['away_score'],
+            "player_performance": PlayerPerformanceSerializer(performance).data if performance else None
+        }
+        if undo:
+            response_data["message"] = "Último cambio revertido"
+        return Response(response_data)
+
+    @action(detail=True, methods=['POST'])
+    @idempotent
+    def undo(self, request, pk=None):
+        """Deshace el último punto o tiempo fuera del partido, sea del jugador que sea"""
+        return self._stack_response(pk, undo_last, "Acción deshecha")
 
+    @action(detail=True, methods=['POST'])
+    @idempotent
+    def redo(self, request, pk=None):
+        """Repite la última acción deshecha con `undo`"""
+        return self._stack_response(pk, redo_last, "Acción rehecha")
+
+    def _stack_response(self, pk, operation, message):
+        try:
+            result = operation(pk)
+        except ScoringError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        undone = operation is undo_last
+        if result['action'] == 'point':
+            publish_live(pk, 'point', {
+                'set_number': result['set_number'],
+                'home': result['home_score'],
+                'away': result['away_score'],
+                'undo': undone,
+            })
+        else:
+            publish_live(pk, 'timeout', {
+                'set_number': result['set_number'],
+                'home_timeouts': result['home_timeouts'],
+                'away_timeouts': result['away_timeouts'],
+            })
+
+        performance = result.pop('performance')
+        return Response({
+            "status": "success",
+            "message": message,
+            **result,
+            "player_performance": PlayerPerformanceSerializer(performance).data if performance else None,
+        })
+
+    @action(detail=True, methods=['GET'])
+    def timeline(self, request, pk=None):
+        """Estado del partido reconstruido desde su registro de eventos, actual o en `?at=<secuencia>`"""
+        match = get_object_or_404(Match.objects.only('id', 'last_sequence'), pk=pk)
+        at = request.query_params.get('at')
+        if at is not None:
             try:
-                current_set = Set.objects.get(match=match, set_number=set_number)
-                performance, created = PlayerPerformance.objects.get_or_create(
-                    match=match,
-                    set=current_set,
-                    player_id=player_id,
-                    defaults={
-                        'points': 0,
-                        'spike_points': 0,
-                        'block_points': 0,
-                        'aces': 0,
-                        'errors': 0
-                    }
+                at = int(at)
+            except ValueError:
+                return Response({"error": "`at` debe ser un número de secuencia"}, status=status.HTTP_400_BAD_REQUEST)
+            if not 0 <= at <= match.last_sequence:
+                return Response(
+                    {"error": f"Secuencia fuera de rango (0-{match.last_sequence})"},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
 
-                point_updates = {
-                    'SPK': 'spike_points',
-                    'BLK': 'block_points',
-                    'ACE': 'aces',
-                    'ERR': 'errors'
-                }
-
-                # Si es un rollback
-                if undo:
-                    last_event = PointEvent.objects.filter(
-                        match=match,
-                        set=current_set,
-                        player_id=player_id,
-                        point_type=point_type
-                    ).order_by('-timestamp').first()
-
-                    if not last_event:
-                        return Response({"error": "No hay eventos para deshacer"}, status=status.HTTP_400_BAD_REQUEST)
-
-                    # Revertir el evento y actualizar las estadísticas
-                    if point_type in point_updates and getattr(performance, point_updates[point_type]) > 0:
-                        setattr(performance, point_updates[point_type], getattr(performance, point_updates[point_type]) - 1)
-
-                    # Actualizar puntos totales (excluyendo errores)
-                    performance.points = performance.spike_points + performance.block_points + performance.aces
-                    performance.save()
-
-                    # Revertir marcador del set
-                    if performance.player.team == match.home_team:
-                        current_set.home_team_score -= 1
-                    else:
-                        current_set.away_team_score -= 1
-                    current_set.save()
-
-                    # Borrar el último evento registrado
-                    last_event.delete()
-
-                    return Response({
-                        "status": "success",
-                        "message": "Último cambio revertido",
-                        "home_score": current_set.home_team_score,
-                        "away_score": current_set.away_team_score,
-                        "player_performance": PlayerPerformanceSerializer(performance).data
-                    })
-
-                # Si no es un rollback, agregar el punto
-                else:
-                    if point_type in point_updates:
-                        setattr(performance, point_updates[point_type], getattr(performance, point_updates[point_type]) + 1)
-
-                    # Recalcular puntos totales (sin errores)
-                    performance.points = performance.spike_points + performance.block_points + performance.aces
-                    performance.save()
-
-                    # Actualizar marcador del set
-                    if performance.player.team == match.home_team:
-                        current_set.home_team_score += 1
-                    else:
-                        current_set.away_team_score += 1
-                    current_set.save()
-
-                    # Crear un evento de punto en PointEvent
-                    PointEvent.objects.create(
-                        match=match,
-                        set=current_set,
-                        player=performance.player,
-                        team=performance.player.team,
-                        timestamp=timezone.now(),
-                        point_type=point_type,
-                        home_score_after=current_set.home_team_score,
-                        away_score_after=current_set.away_team_score,
-                        description=f"Punto por {point_type} del jugador {performance.player.name}"
-                    )
+        return Response({
+            "match": match.pk,
+            "sequence": match.last_sequence if at is None else at,
+            "last_sequence": match.last_sequence,
+            "state": state_at(match.pk, at),
+        })
 
-                    return Response({
-                        "status": "success",
-                        "home_score": current_set.home_team_score,
-                        "away_score": current_set.away_team_score,
-                        "player_performance": PlayerPerformanceSerializer(performance).data
-                    })
+    @action(detail=True, methods=['GET'])
+    def events(self, request, pk=None):
+        """Eventos del registro posteriores a `?since=<secuencia>`, para ponerse al día tras reconectar"""
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', EVENTS_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "`since` y `limit` deben ser números enteros"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limit <= EVENTS_MAX_PAGE_SIZE:
+            return Response({"error": f"`limit` debe estar entre 1 y {EVENTS_MAX_PAGE_SIZE}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def respond():
+            match = get_object_or_404(Match.objects.only('id', 'last_sequence'), pk=pk)
+            if not 0 <= since <= match.last_sequence:
+                return Response(
+                    {"error": f"Secuencia fuera de rango (0-{match.last_sequence})"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Rango sobre el índice único (match, sequence); una fila de más indica si quedan eventos
+            rows = list(
+                MatchEvent.objects.filter(match_id=match.pk, sequence__gt=since).order_by('sequence')
+                .values_list('sequence', 'kind', 'payload', 'created_at')[:limit + 1])
+            return Response({
+                "match": match.pk,
+                "since": since,
+                "last_sequence": match.last_sequence,
+                "has_more": len(rows) > limit,
+                "events": [match_event_data(*row) for row in rows[:limit]],
+            })
+
+        # Los clientes que sondean sin cambios reciben 304 sin consultar la base
+        return self.conditional_response(request, respond)
+
+    @action(detail=True, methods=['POST'], url_path='points/batch')
+    @idempotent
+    def batch_points(self, request, pk=None):
+        """Registra en una sola petición los puntos acumulados por un cliente sin conexión"""
+        try:
+            result = apply_points_batch(pk, request.data.get('points'))
+        except ScoringError as e:
+            return Response({"error": e.message}, status=e.status_code)
 
-            except Set.DoesNotExist:
-                return Response({"error": "Set no encontrado"}, status=status.HTTP_404_NOT_FOUND)
-            except PlayerPerformance.DoesNotExist:
-                return Response({"error": "Registro de jugador no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        if result['applied']:
+            publish_live(pk, 'points', {'sets': result['sets']})
+        return Response({"status": "success", **result})
 
 class SetViewSet(viewsets.ModelViewSet):
     queryset = Set.objects.select_related('match').all()
     serializer_class = SetSerializer
 
     @action(detail=False, methods=['POST'], url_path='matches/(?P<match_id>[^/.]+)/sets/start_set')
+    @idempotent
     def start_set(self, request, match_id=None):
         """Inicia un nuevo set dinámicamente si el partido está en curso y el set anterior está finalizado"""
-        match = get_object_or_404(Match, pk=match_id)
-
-        if match.status != 'live':
-            return Response({"error": "El partido no está en vivo"}, status=status.HTTP_400_BAD_REQUEST)
-
-        last_set = Set.objects.filter(
-            match=match).order_by('-set_number').first()
-        if last_set and not last_set.end_time:
-            return Response({"error": "El set anterior no ha finalizado"}, status=status.HTTP_400_BAD_REQUEST)
-
-        new_set_number = last_set.set_number + 1 if last_set else 1
-        new_set = Set.objects.create(
-            match=match, set_number=new_set_number, start_time=timezone.now())
+        try:
+            with transaction.atomic():
+                # El último set se lee bajo el bloqueo: dos inicios simultáneos no crean el mismo número
+                match = lock_match(match_id, live_only=False)
+                if match.status != 'live':
+                    return Response({"error": "El partido no está en vivo"}, status=status.HTTP_400_BAD_REQUEST)
+
+                last_set = Set.objects.filter(
+                    match=match).order_by('-set_number').first()
+                if last_set and not last_set.end_time:
+                    return Response({"error": "El set anterior no ha finalizado"}, status=status.HTTP_400_BAD_REQUEST)
+
+                new_set_number = last_set.set_number + 1 if last_set else 1
+                append_events(match, [('set_started', {'set_number': new_set_number})], locked=True)
+                new_set = Set.objects.create(
+                    match=match, set_number=new_set_number, start_time=timezone.now())
+                publish_live(match.pk, 'set_started', {'set_number': new_set_number})
+                invalidate_statistics(match.pk)
+        except ScoringError as e:
+            return Response({"error": e.message}, status=e.status_code)
 
         return Response({
             "message": f"Set {new_set_number} iniciado",
@@ -284,23 +424,44 @@ class SetViewSet(viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['POST'], url_path='matches/(?P<match_id>[^/.]+)/sets/end_set')
+    @idempotent
     def end_set(self, request, match_id=None):
         """Finaliza el último set activo de un partido específico"""
-        match = get_object_or_404(Match, pk=match_id)
-
-        current_set = Set.objects.filter(
-            match=match, end_time__isnull=True).order_by('-set_number').first()
-        if not current_set:
-            return Response({"error": "No hay un set activo para finalizar"}, status=status.HTTP_400_BAD_REQUEST)
-
-        is_valid, error_message = self._is_valid_set_score(current_set)
-        if not is_valid:
-            return Response({"error": error_message}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic():
+                # El set se lee bajo el bloqueo del partido: los puntos que llegan a la vez esperan
+                match = lock_match(match_id, live_only=False)
+                current_set = Set.objects.filter(
+                    match=match, end_time__isnull=True).order_by('-set_number').first()
+                if not current_set:
+                    return Response({"error": "No hay un set activo para finalizar"}, status=status.HTTP_400_BAD_REQUEST)
+
+                is_valid, error_message = self._is_valid_set_score(current_set)
+                if not is_valid:
+                    return Response({"error": error_message}, status=status.HTTP_400_BAD_REQUEST)
 
-        current_set.end_time = timezone.now()
-        current_set.duration = current_set.end_time - \
-            current_set.start_time if current_set.start_time else None
-        current_set.save()
+                append_events(match, [('set_ended', {
+                    'set_number': current_set.set_number,
+                    'home': current_set.home_team_score,
+                    'away': current_set.away_team_score,
+                })], locked=True)
+                current_set.end_time = timezone.now()
+                current_set.duration = current_set.end_time - \
+                    current_set.start_time if current_set.start_time else None
+                current_set.save(update_fields=['end_time', 'duration'])
+                if current_set.home_team_score != current_set.away_team_score:
+                    record_set_won(match.home_team_id if current_set.home_team_score > current_set.away_team_score else match.away_team_id)
+                if match.status == 'finished':
+                    # Último set cerrado después de finalizar el partido
+                    materialize_match(match.pk)
+                publish_live(match.pk, 'set_ended', {
+                    'set_number': current_set.set_number,
+                    'home': current_set.home_team_score,
+                    'away': current_set.away_team_score,
+                })
+                invalidate_statistics(match.pk)
+        except ScoringError as e:
+            return Response({"error": e.message}, status=e.status_code)
 
         return Response({
             "message": f"Set {current_set.set_number} finalizado",
@@ -335,185 +496,148 @@ class SetViewSet(viewsets.ModelViewSet):
 
         return True, ""
 
-        try:
-            with transaction.atomic():
-                current_set = self.get_object()
-                match = current_set.match
-
-                if match.status != 'live':
-                    return Response(
-                        {"error": "El partido no está en curso"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                if current_set.end_time:
-                    return Response(
-                        {"error": "Este set ya ha sido finalizado"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                # Validación de puntaje con solo los scores
-                is_valid, error_message = self._is_valid_set_score(
-                    current_set.home_team_score,
-                    current_set.away_team_score
-                )
-
-                if not is_valid:
-                    return Response({
-                        "error": "Puntuación inválida para finalizar el set",
-                        "details": {
-                            "home_score": current_set.home_team_score,
-                            "away_score": current_set.away_team_score,
-                            "set_number": current_set.set_number,
-                            "reason": error_message,
-                            "rules": {
-                                "sets_1_4": "Mínimo 25 puntos con diferencia de 2",
-                                "set_5": "Mínimo 15 puntos con diferencia de 2"
-                            }
-                        }
-                    }, status=status.HTTP_400_BAD_REQUEST)
-
-                # Finalizar el set
-                current_set.end_time = timezone.now()
-                if current_set.start_time:
-                    current_set.duration = current_set.end_time - current_set.start_time
-                current_set.save()
-
-                # Determinar ganador
-                winner_team = match.home_team if current_set.home_team_score > current_set.away_team_score else match.away_team
-
-                # Registrar el evento
-                PointEvent.objects.create(
-                    match=match,
-                    set=current_set,
-                    team=winner_team,
-                    timestamp=timezone.now(),
-                    home_score_after=current_set.home_team_score,
-                    away_score_after=current_set.away_team_score,
-                    description=f"Fin del Set {current_set.set_number}"
-                )
-
-                # Actualizar estadísticas
-                sets_stats = self._get_sets_stats(match)
-
-                response_data = {
-                    "status": "success",
-                    "message": "Set finalizado correctamente",
-                    "set_data": {
-                        "number": current_set.set_number,
-                        "duration": str(current_set.duration) if current_set.duration else None,
-                        "final_score": {
-                            "home": current_set.home_team_score,
-                            "away": current_set.away_team_score
-                        }
-                    },
-                    "match_status": {
-                        "sets_won": sets_stats
-                    }
-                }
-
-                # Verificar si el partido ha terminado
-                if sets_stats['sets_home'] == 3 or sets_stats['sets_away'] == 3:
-                    match.status = 'finished'
-                    match.end_time = timezone.now()
-                    match.duration = match.end_time - match.start_time
-                    match.save()
-                    response_data.update({
-                        "match_finished": True,
-                        "match_data": {
-                            "duration": str(match.duration),
-                            "winner": "home" if sets_stats['sets_home'] == 3 else "away",
-                            "final_score": f"{sets_stats['sets_home']}-{sets_stats['sets_away']}"
-                        }
-                    })
-
-                return Response(response_data)
-
-        except ValidationError as e:
-            return Response(
-                {"error": str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        except Exception as e:
-            return Response(
-                {"error": f"Error inesperado: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-
-        """
-        Verifica si la puntuación es válida para terminar un set
-        
-        Args:
-            set_obj: Objeto Set actual
-            home_score: Puntuación del equipo local
-            away_score: Puntuación del equipo visitante
-        """
-        max_score = max(home_score, away_score)
-        min_score = min(home_score, away_score)
-        score_difference = max_score - min_score
-
-        # Set decisivo (5º set)
-        if set_obj.set_number == 5:
-            if max_score >= 15 and score_difference >= 2:
-                return True
-            return False
-
-        # Sets normales (1-4)
-        if max_score >= 25 and score_difference >= 2:
-            return True
-        return False
-
-    def _get_sets_stats(self, match):
-        """Obtiene las estadísticas de sets ganados"""
-        sets_home = Set.objects.filter(
-            match=match,
-            home_team_score__gt=F('away_team_score'),
-            end_time__isnull=False
-        ).count()
-
-        sets_away = Set.objects.filter(
-            match=match,
-            away_team_score__gt=F('home_team_score'),
-            end_time__isnull=False
-        ).count()
-
-        return {
-            'sets_home': sets_home,
-            'sets_away': sets_away
-        }
-
     # Endpoint para actualizar tiempos fuera
     @action(detail=False, methods=['POST'], url_path='matches/(?P<match_id>[^/.]+)/update_timeouts')
+    @idempotent
     def update_timeouts(self, request, match_id=None):
-        match = get_object_or_404(Match, pk=match_id)
         team = request.data.get("team")
-
-        # Encuentra el set en curso (sin `end_time`)
-        current_set = Set.objects.filter(match=match, end_time__isnull=True).order_by('-set_number').first()
-        if not current_set:
-            return Response({"error": "No hay un set activo para este partido"}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Verificación y actualización de tiempos fuera
-        if team == "home":
-            if current_set.home_timeouts < 2:
-                current_set.home_timeouts += 1
-                current_set.save()
-                return Response({"message": "Tiempo fuera agregado para el equipo local", "home_timeouts": current_set.home_timeouts})
-            else:
-                return Response({"error": "El equipo local ya ha usado todos sus tiempos fuera en este set"}, status=status.HTTP_400_BAD_REQUEST)
-        elif team == "away":
-            if current_set.away_timeouts < 2:
-                current_set.away_timeouts += 1
-                current_set.save()
-                return Response({"message": "Tiempo fuera agregado para el equipo visitante", "away_timeouts": current_set.away_timeouts})
-            else:
-                return Response({"error": "El equipo visitante ya ha usado todos sus tiempos fuera en este set"}, status=status.HTTP_400_BAD_REQUEST)
-        else:
+        if team not in ('home', 'away'):
             return Response({"error": "Equipo no válido, debe ser 'home' o 'away'"}, status=status.HTTP_400_BAD_REQUEST)
+        field = f"{team}_timeouts"
 
+        try:
+            with transaction.atomic():
+                match = lock_match(match_id, live_only=False)
+                # Encuentra el set en curso (sin `end_time`), leído bajo el bloqueo
+                current_set = Set.objects.filter(match=match, end_time__isnull=True).order_by('-set_number').first()
+                if not current_set:
+                    return Response({"error": "No hay un set activo para este partido"}, status=status.HTTP_400_BAD_REQUEST)
+
+                # Verificación y actualización de tiempos fuera
+                if getattr(current_set, field) >= 2:
+                    error = {
+                        'home': "El equipo local ya ha usado todos sus tiempos fuera en este set",
+                        'away': "El equipo visitante ya ha usado todos sus tiempos fuera en este set",
+                    }[team]
+                    return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+                append_events(match, [('timeout', {'set_number': current_set.set_number, 'team': team})], locked=True)
+                setattr(current_set, field, getattr(current_set, field) + 1)
+                # Solo la columna del tiempo fuera: no se pisan los marcadores
+                current_set.save(update_fields=[field])
+        except ScoringError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        self._publish_timeouts(match, current_set)
+        message = {
+            'home': "Tiempo fuera agregado para el equipo local",
+            'away': "Tiempo fuera agregado para el equipo visitante",
+        }[team]
+        return Response({"message": message, field: getattr(current_set, field)})
+
+    def _publish_timeouts(self, match, current_set):
+        publish_live(match.pk, 'timeout', {
+            'set_number': current_set.set_number,
+            'home_timeouts': current_set.home_timeouts,
+            'away_timeouts': current_set.away_timeouts,
+        })
 
 
 class PlayerPerformanceViewSet(viewsets.ModelViewSet):
     queryset = PlayerPerformance.objects.select_related(
         'player', 'match').all()
     serializer_class = PlayerPerformanceSerializer
+    # Sin parámetros devuelve la lista completa, como siempre
+    pagination_class = OptionalResultsSetPagination
+    cursor_ordering = ('id',)
+
+
+def _live_snapshot(match_id):
+    """Estado mínimo con el que arranca un espectador: estado del partido y último set"""
+    match = Match.objects.filter(pk=match_id).values('status').first()
+    if match is None:
+        return None
+    current_set = Set.objects.filter(match_id=match_id).order_by('-set_number').values(
+        'set_number', 'home_team_score', 'away_team_score', 'home_timeouts', 'away_timeouts').first()
+    return {'match': match_id, 'status': match['status'], 'set': current_set}
+
+
+async def live_score_stream(request, pk):
+    """
+    Canal Server-Sent Events con los deltas del marcador de un partido
+
+    Envía primero un `snapshot` y luego un evento por cada punto, set, tiempo fuera o
+    cambio de clima confirmado. Cada delta se serializa una sola vez en `publish_live`
+    y se reparte a todos los espectadores conectados. Requiere servir la app por ASGI.
+    """
+    if not await sync_to_async(Match.objects.filter(pk=pk).exists)():
+        raise Http404("Partido no encontrado")
+
+    heartbeat = getattr(settings, 'LIVE_SCORE_HEARTBEAT', 15)
+
+    async def stream():
+        # Suscribir antes de leer el snapshot para no perder puntos intermedios
+        subscription = get_broker().subscribe(pk)
+        try:
+            yield encode_event('snapshot', await sync_to_async(_live_snapshot)(pk))
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+def point_events_export(request):
+    """
+    Exporta en streaming el historial punto a punto (NDJSON, CSV o por columnas)
+
+    Filtros opcionales: `match`, `team`, `date_from`, `date_to` y `point_type`; el formato
+    se elige con `type`. Las filas se leen por bloques, nunca todas a la vez.
+    """
+    params = PointEventExportParams(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    file_format = params.validated_data['type']
+
+    response = StreamingHttpResponse(export_point_events(params.validated_data),
+                                     content_type=CONTENT_TYPES[file_format])
+    extension = 'csv' if file_format == 'csv' else 'ndjson'
+    response['Content-Disposition'] = f'attachment; filename="point-events.{extension}"'
+    return response
+
+
+@api_view(['GET'])
+def season_export(request, season, table):
+    """
+    Descarga una tabla de la temporada (`point_events`, `sets` o `performances`) en Parquet o
+    Arrow IPC (`?type=`), entera o de un mes (`?month=`). Requiere pyarrow.
+    """
+    if table not in analytics.TABLES:
+        return Response({'error': f'Tabla no válida. Use: {", ".join(analytics.TABLES)}.'},
+                        status=status.HTTP_404_NOT_FOUND)
+    file_format = request.query_params.get('type', 'parquet')
+    if file_format not in analytics.ANALYTICS_FORMATS:
+        return Response({'error': f'Formato no soportado. Use: {", ".join(analytics.ANALYTICS_FORMATS)}.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    month = request.query_params.get('month')
+    if month is not None:
+        if not month.isdigit() or not 1 <= int(month) <= 12:
+            return Response({'error': 'El mes debe ser un número entre 1 y 12.'}, status=status.HTTP_400_BAD_REQUEST)
+        month = int(month)
+    try:
+        analytics.require_pyarrow()
+    except analytics.AnalyticsUnavailable as e:
+        return Response({'error': str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    response = StreamingHttpResponse(analytics.stream_table(table, season, month, file_format),
+                                     content_type=analytics.CONTENT_TYPES[file_format])
+    suffix = f"-{month:02d}" if month else ''
+    response['Content-Disposition'] = (
+        f'attachment; filename="{table}-{season}{suffix}.{analytics.EXTENSIONS[file_format]}"')
+    return response
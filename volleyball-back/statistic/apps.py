@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class StatisticConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'statistic'
+
+    def ready(self):
+        # Mantiene total_matches / total_teams al crear o borrar partidos y equipos
+        from . import signals  # noqa: F401
+        from volley_back.instrumentation import registry
+        from .cache import metrics_lines
+        registry.register_collector(metrics_lines)
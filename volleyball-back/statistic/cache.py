@@ -0,0 +1,124 @@
+# statistic/cache.py
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+GLOBAL_SCOPE = 'global'
+
+_counters = {'hit': 0, 'miss': 0, 'not_modified': 0}
+_counters_lock = threading.Lock()
+
+
+def _store():
+    return caches[getattr(settings, 'STATISTICS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(scope):
+    return f"stats:version:{scope}"
+
+
+def match_scope(match_id):
+    return f"match:{int(match_id)}"
+
+
+def get_version(scope):
+    """
+    Versión de datos de un ámbito (global o un partido)
+
+    La versión es un timestamp en nanosegundos: sirve a la vez de ETag y de Last-Modified, y
+    si la caché pierde la clave la nueva versión nunca coincide con respuestas ya guardadas.
+    """
+    store = _store()
+    version = store.get(_version_key(scope))
+    if version is None:
+        version = time.time_ns()
+        if not store.add(_version_key(scope), version, timeout=None):
+            version = store.get(_version_key(scope), version)
+    return version
+
+
+def _bump(scope):
+    store = _store()
+    current = store.get(_version_key(scope)) or 0
+    store.set(_version_key(scope), max(time.time_ns(), current + 1), timeout=None)
+
+
+def invalidate_statistics(match_id=None):
+    """Cambia la versión global (y la del partido) cuando se confirma una escritura de puntuación"""
+    def bump():
+        _bump(GLOBAL_SCOPE)
+        if match_id is not None:
+            _bump(match_scope(match_id))
+    transaction.on_commit(bump)
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def get_counters():
+    with _counters_lock:
+        return dict(_counters)
+
+
+def metrics_lines():
+    """Contadores de la caché en formato Prometheus, para /api/_metrics"""
+    lines = [
+        '# HELP volley_statistics_cache_total Respuestas de estadísticas por resultado de caché',
+        '# TYPE volley_statistics_cache_total counter',
+    ]
+    for result, count in sorted(get_counters().items()):
+        lines.append(f'volley_statistics_cache_total{{result="{result}"}} {count}')
+    return lines
+
+
+def cached_response(request, scope, build):
+    """
+    Sirve una respuesta de estadísticas desde caché, validada con ETag/Last-Modified
+
+    Args:
+        request: Petición DRF
+        scope: Ámbito de versión (GLOBAL_SCOPE o match_scope(id))
+        build: Función sin argumentos que devuelve (data, status_code, permanent). Si
+            `permanent` es True (partido finalizado) la entrada no caduca.
+    """
+    version = get_version(scope)
+    etag = f'"{scope}:{version}"'
+    last_modified = version // 1_000_000_000
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        _count('not_modified')
+        return not_modified
+
+    store = _store()
+    key = f"stats:response:{scope}:{version}"
+    cached = store.get(key)
+    if cached is not None:
+        _count('hit')
+        data, status_code, permanent = cached
+        cache_status = 'HIT'
+    else:
+        _count('miss')
+        data, status_code, permanent = build()
+        cache_status = 'MISS'
+        # Los errores (p. ej. 404) no se guardan
+        if status_code < 400:
+            timeout = None if permanent else getattr(settings, 'STATISTICS_CACHE_TTL', 300)
+            store.set(key, (data, status_code, permanent), timeout=timeout)
+
+    response = Response(data, status=status_code)
+    if status_code < 400:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Un partido finalizado no cambia; el resto debe revalidarse con el ETag
+        response['Cache-Control'] = 'public, max-age=86400' if permanent else 'no-cache'
+    response['X-Cache'] = cache_status
+    return response
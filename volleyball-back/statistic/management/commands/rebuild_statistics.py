@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from statistic.tracking import check_statistics, rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = "Reconstruye las estadísticas globales desde cero o comprueba que el incremental coincide"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Solo compara la fila incremental con un cálculo completo, sin escribir")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            differences = check_statistics()
+            if differences:
+                for field, (incremental, full) in differences.items():
+                    self.stderr.write(f"{field}: incremental={incremental} completo={full}")
+                raise CommandError("Las estadísticas incrementales no coinciden con el cálculo completo")
+            self.stdout.write(self.style.SUCCESS("Las estadísticas incrementales son consistentes"))
+            return
+
+        stats = rebuild_statistics()
+        self.stdout.write(self.style.SUCCESS(
+            f"Estadísticas reconstruidas: {stats.total_matches} partidos, {stats.total_teams} equipos"))
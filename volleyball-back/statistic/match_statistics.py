@@ -0,0 +1,144 @@
+# statistic/match_statistics.py
+from teams.models import Player
+from matches.models import PointEvent, Set
+
+POINT_TYPES = [code for code, _ in PointEvent.POINT_TYPES]
+
+# Tipos que suman a los puntos del jugador; ERR es un error del rival a favor de su equipo
+SCORING_POINT_TYPES = ('SPK', 'BLK', 'ACE')
+
+COUNTER_FIELDS = {
+    'SPK': 'spike_points',
+    'BLK': 'block_points',
+    'ACE': 'aces',
+    'ERR': 'errors',
+}
+
+
+def _player_row(player):
+    return {
+        'player_id': player['id'],
+        'name': player['name'],
+        'jersey_number': player['jersey_number'],
+        'position': player['position'],
+        'team_id': player['team_id'],
+        'total_points': 0,
+        'spike_points': 0,
+        'block_points': 0,
+        'aces': 0,
+        'errors': 0,
+        'points_per_set': {},
+        'aces_per_set': {},
+    }
+
+
+def compute_match_statistics(match):
+    """
+    Calcula todas las estadísticas de un partido recorriendo una sola vez sus PointEvent
+
+    Los totales y repartos por set salen de los eventos (no de PlayerPerformance, cuyas filas
+    de `start_match` no tienen set), así que siempre cuadran con el marcador. Usa un número
+    fijo de consultas: sets, eventos y jugadores que aparecen en ellos.
+
+    Returns:
+        dict: sets, best_scorer, best_server, leaderboard, point_types y runs
+    """
+    sets = list(Set.objects.filter(match=match).order_by('set_number').values(
+        'set_number', 'home_team_score', 'away_team_score'))
+
+    events = PointEvent.objects.filter(match=match, point_type__isnull=False).order_by(
+        'set__set_number', 'timestamp', 'id').values_list('set__set_number', 'player_id', 'team_id', 'point_type')
+
+    sides = {match.home_team_id: 'home', match.away_team_id: 'away'}
+    per_player = {}
+    point_types = {'home': dict.fromkeys(POINT_TYPES, 0), 'away': dict.fromkeys(POINT_TYPES, 0)}
+    longest = {'home': 0, 'away': 0}
+    longest_run = None
+    run_side, run_length, run_set = None, 0, None
+
+    for set_number, player_id, team_id, point_type in events:
+        side = sides.get(team_id)
+        if side is None or point_type not in COUNTER_FIELDS:
+            continue
+
+        point_types[side][point_type] += 1
+
+        stats = per_player.setdefault(player_id, {})
+        stats[COUNTER_FIELDS[point_type]] = stats.get(COUNTER_FIELDS[point_type], 0) + 1
+        if point_type in SCORING_POINT_TYPES:
+            stats['total_points'] = stats.get('total_points', 0) + 1
+            per_set = stats.setdefault('points_per_set', {})
+            per_set[set_number] = per_set.get(set_number, 0) + 1
+        if point_type == 'ACE':
+            per_set = stats.setdefault('aces_per_set', {})
+            per_set[set_number] = per_set.get(set_number, 0) + 1
+
+        # Rachas: puntos seguidos del mismo equipo dentro de un set
+        if side == run_side and set_number == run_set:
+            run_length += 1
+        else:
+            run_side, run_length, run_set = side, 1, set_number
+        if run_length > longest[side]:
+            longest[side] = run_length
+            if longest_run is None or run_length > longest_run['length']:
+                longest_run = {'team': side, 'length': run_length, 'set_number': set_number}
+
+    players = Player.objects.filter(pk__in=per_player).values('id', 'name', 'jersey_number', 'position', 'team_id')
+    leaderboard = []
+    for player in players:
+        row = _player_row(player)
+        row.update(per_player[player['id']])
+        row['team'] = sides.get(player['team_id'])
+        leaderboard.append(row)
+    leaderboard.sort(key=lambda row: (-row['total_points'], -row['aces'], row['name']))
+
+    return {
+        'sets': sets,
+        'best_scorer': _best_scorer(leaderboard),
+        'best_server': _best_server(leaderboard),
+        'leaderboard': [_public_row(row) for row in leaderboard],
+        'point_types': point_types,
+        'runs': {
+            'longest_home': longest['home'],
+            'longest_away': longest['away'],
+            'longest': longest_run,
+            'current': {'team': run_side, 'length': run_length, 'set_number': run_set} if run_side else None,
+        },
+    }
+
+
+def _per_set_list(per_set):
+    return [{'set__set_number': number, 'points': points} for number, points in sorted(per_set.items())]
+
+
+def _public_row(row):
+    public = {key: value for key, value in row.items() if key != 'aces_per_set'}
+    public['points_per_set'] = _per_set_list(row['points_per_set'])
+    return public
+
+
+def _best_scorer(leaderboard):
+    if not leaderboard:
+        return None
+    best = leaderboard[0]
+    return {
+        'name': best['name'],
+        'jersey_number': best['jersey_number'],
+        'position': best['position'],
+        'total_points': best['total_points'],
+        'spike_attempts': best['spike_points'],
+        'points_per_set': _per_set_list(best['points_per_set']),
+    }
+
+
+def _best_server(leaderboard):
+    if not leaderboard:
+        return None
+    best = max(leaderboard, key=lambda row: row['aces'])
+    return {
+        'name': best['name'],
+        'jersey_number': best['jersey_number'],
+        'position': best['position'],
+        'total_aces': best['aces'],
+        'points_per_set': _per_set_list(best['aces_per_set']),
+    }
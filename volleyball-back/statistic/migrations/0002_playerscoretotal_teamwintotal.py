@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistic', '0001_initial'),
+        ('teams', '0004_rename_avatar_url_player_avatar_team_gender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerScoreTotal',
+            fields=[
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_total', serialize=False, to='teams.player')),
+                ('points', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-points'], name='player_total_points_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamWinTotal',
+            fields=[
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='win_total', serialize=False, to='teams.team')),
+                ('set_wins', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-set_wins'], name='team_total_wins_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+from django.db.models import Count, F, Sum
+
+STATISTICS_PK = 1
+
+
+def backfill_totals(apps, schema_editor):
+    """Llena los acumulados y la fila de estadísticas desde los partidos existentes (como rebuild_statistics)"""
+    Statistics = apps.get_model('statistic', 'Statistics')
+    PlayerScoreTotal = apps.get_model('statistic', 'PlayerScoreTotal')
+    TeamWinTotal = apps.get_model('statistic', 'TeamWinTotal')
+    Match = apps.get_model('matches', 'Match')
+    Set = apps.get_model('matches', 'Set')
+    PlayerPerformance = apps.get_model('matches', 'PlayerPerformance')
+    Team = apps.get_model('teams', 'Team')
+    Player = apps.get_model('teams', 'Player')
+
+    # Base vacía (instalación nueva o pruebas): la fila de estadísticas se crea con el primer cálculo
+    if not Match.objects.exists() and not Team.objects.exists():
+        return
+
+    player_points = dict(
+        PlayerPerformance.objects.values('player_id').annotate(total=Sum('points')).values_list('player_id', 'total'))
+
+    finished_sets = Set.objects.filter(end_time__isnull=False)
+    home_wins = finished_sets.filter(home_team_score__gt=F('away_team_score')).values(
+        'match__home_team').annotate(wins=Count('id')).values_list('match__home_team', 'wins')
+    away_wins = finished_sets.filter(away_team_score__gt=F('home_team_score')).values(
+        'match__away_team').annotate(wins=Count('id')).values_list('match__away_team', 'wins')
+    team_wins = {}
+    for team_id, wins in list(home_wins) + list(away_wins):
+        team_wins[team_id] = team_wins.get(team_id, 0) + wins
+
+    PlayerScoreTotal.objects.all().delete()
+    PlayerScoreTotal.objects.bulk_create(
+        [PlayerScoreTotal(player_id=player_id, points=points) for player_id, points in player_points.items()],
+        batch_size=2000)
+    TeamWinTotal.objects.all().delete()
+    TeamWinTotal.objects.bulk_create(
+        [TeamWinTotal(team_id=team_id, set_wins=wins) for team_id, wins in team_wins.items()], batch_size=2000)
+
+    data = {
+        'total_matches': Match.objects.count(),
+        'total_teams': Team.objects.count(),
+        'top_scorer_name': '',
+        'top_scorer_score': 0,
+        'most_wins_team': '',
+        'most_wins_count': 0,
+    }
+    if player_points:
+        player_id = max(player_points, key=player_points.get)
+        data['top_scorer_name'] = Player.objects.values_list('name', flat=True).get(pk=player_id)
+        data['top_scorer_score'] = player_points[player_id]
+    if team_wins:
+        team_id = max(team_wins, key=team_wins.get)
+        data['most_wins_team'] = Team.objects.values_list('name', flat=True).get(pk=team_id)
+        data['most_wins_count'] = team_wins[team_id]
+    Statistics.objects.update_or_create(pk=STATISTICS_PK, defaults=data)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('statistic', '0002_playerscoretotal_teamwintotal'),
+        ('matches', '0018_match_materialized'),
+        ('teams', '0005_list_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
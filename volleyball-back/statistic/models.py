@@ -10,4 +10,28 @@ class Statistics(models.Model):
     last_updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Statistics as of {self.last_updated}"
\ No newline at end of file
+        return f"Statistics as of {self.last_updated}"
+
+
+class PlayerScoreTotal(models.Model):
+    """Puntos acumulados por jugador, mantenidos en cada punto para no agregar PlayerPerformance"""
+    player = models.OneToOneField('teams.Player', on_delete=models.CASCADE, primary_key=True, related_name='score_total')
+    points = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['-points'], name='player_total_points_idx')]
+
+    def __str__(self):
+        return f"{self.player_id}: {self.points} puntos"
+
+
+class TeamWinTotal(models.Model):
+    """Sets ganados por equipo, mantenidos al finalizar cada set"""
+    team = models.OneToOneField('teams.Team', on_delete=models.CASCADE, primary_key=True, related_name='win_total')
+    set_wins = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['-set_wins'], name='team_total_wins_idx')]
+
+    def __str__(self):
+        return f"{self.team_id}: {self.set_wins} sets ganados"
@@ -0,0 +1,66 @@
+# statistic/signals.py
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from teams.models import Team
+from matches.models import Match, PlayerPerformance, Set
+from .models import PlayerScoreTotal, TeamWinTotal
+from .tracking import discount_deleted, record_count, refresh_leaders
+
+
+def _deleted_directly(origin, model):
+    """True si el borrado empezó en este modelo y no en una cascada (la descuenta su origen)"""
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return origin is None or isinstance(origin, model)
+
+
+@receiver(post_save, sender=Match)
+def count_created_match(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_count('total_matches', 1)
+
+
+@receiver(post_delete, sender=Match)
+def count_deleted_match(sender, instance, **kwargs):
+    record_count('total_matches', -1)
+
+
+@receiver(post_save, sender=Team)
+def count_created_team(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_count('total_teams', 1)
+
+
+@receiver(post_delete, sender=Team)
+def count_deleted_team(sender, instance, **kwargs):
+    record_count('total_teams', -1)
+
+
+@receiver(pre_delete, sender=Match)
+def discount_deleted_match(sender, instance, **kwargs):
+    # También en cascada (p. ej. al borrar un equipo): el rival pierde los puntos y sets de este partido
+    discount_deleted(PlayerPerformance.objects.filter(match=instance), Set.objects.filter(match=instance))
+
+
+@receiver(pre_delete, sender=Set)
+def discount_deleted_set(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, Set):
+        discount_deleted(PlayerPerformance.objects.filter(set=instance), Set.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_delete, sender=PlayerPerformance)
+def discount_deleted_performance(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, PlayerPerformance):
+        discount_deleted(PlayerPerformance.objects.filter(pk=instance.pk), Set.objects.none())
+
+
+@receiver(post_delete, sender=PlayerScoreTotal)
+def refresh_top_scorer_after_delete(sender, instance, **kwargs):
+    # Se borró el jugador (en cascada): podía ser el máximo anotador
+    refresh_leaders()
+
+
+@receiver(post_delete, sender=TeamWinTotal)
+def refresh_most_wins_after_delete(sender, instance, **kwargs):
+    refresh_leaders()
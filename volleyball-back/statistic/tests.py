@@ -1,3 +1,240 @@
-from django.test import TestCase
+# statistic/tests.py
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from matches.models import PlayerPerformance, Set
+from matches.tests import create_team, create_match
+from statistic.models import Statistics
+from statistic.cache import get_counters
+from statistic.tracking import check_statistics, rebuild_statistics
 
-# Create your tests here.
+
+class StatisticsTests(APITestCase):
+
+    def setUp(self):
+        self.url = reverse('statistics')
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        self.set = Set.objects.create(match=self.match, set_number=1, start_time=timezone.now())
+        rebuild_statistics()
+
+    def tearDown(self):
+        cache.clear()
+
+    def score(self, player, times=1, point_type='SPK'):
+        for _ in range(times):
+            self.client.patch(
+                reverse('match-update-score', args=[self.match.pk]),
+                {'set_number': 1, 'player_id': player.pk, 'point_type': point_type}, format='json')
+
+    def test_get_is_a_single_primary_key_read(self):
+        """El GET ya no recalcula ni escribe la fila de estadísticas"""
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(response.data['totalMatches'], 1)
+        self.assertEqual(response.data['totalTeams'], 2)
+
+    def test_scoring_updates_top_scorer_incrementally(self):
+        home_player = self.home_team.players.first()
+        away_player = self.away_team.players.first()
+        self.score(home_player, 3)
+        self.score(away_player, 4)
+        self.score(away_player, 2, point_type='ERR')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['topScorer'], {'name': away_player.name, 'score': 4})
+        self.assertEqual(check_statistics(), {})
+
+    def test_undo_of_top_scorer_recomputes_leader(self):
+        home_player = self.home_team.players.first()
+        away_player = self.away_team.players.first()
+        self.score(home_player, 2)
+        self.score(away_player, 3)
+        for _ in range(2):
+            self.client.patch(
+                reverse('match-update-score', args=[self.match.pk]),
+                {'set_number': 1, 'player_id': away_player.pk, 'point_type': 'SPK', 'undo': True}, format='json')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['topScorer'], {'name': home_player.name, 'score': 2})
+        self.assertEqual(check_statistics(), {})
+
+    def test_end_set_updates_most_wins(self):
+        Set.objects.filter(pk=self.set.pk).update(home_team_score=25, away_team_score=20)
+        self.client.post(reverse('end-set', args=[self.match.pk]))
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['mostWins'], {'name': 'Local', 'wins': 1})
+        self.assertEqual(check_statistics(), {})
+
+    def test_deleting_a_match_discounts_points_and_wins(self):
+        away_player = self.away_team.players.first()
+        self.score(away_player, 5)
+        Set.objects.filter(pk=self.set.pk).update(away_team_score=25)
+        self.client.post(reverse('end-set', args=[self.match.pk]))
+        other = create_match(self.home_team, create_team('Otro'))
+        PlayerPerformance.objects.filter(match=other).update(points=2)
+        Set.objects.filter(match=other).update(home_team_score=25, end_time=timezone.now())
+        rebuild_statistics()
+
+        response = self.client.delete(reverse('match-detail', args=[self.match.pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['topScorer'], {'name': self.home_team.players.first().name, 'score': 2})
+        self.assertEqual(response.data['mostWins'], {'name': 'Local', 'wins': 1})
+        self.assertEqual(check_statistics(), {})
+
+    def test_deleting_sets_performances_and_teams_keeps_totals_consistent(self):
+        home_player = self.home_team.players.first()
+        away_player = self.away_team.players.first()
+        self.score(home_player, 2)
+        self.score(away_player, 3)
+        PlayerPerformance.objects.filter(player=away_player).delete()
+        self.assertEqual(check_statistics(), {})
+
+        self.set.delete()
+        self.assertEqual(check_statistics(), {})
+
+        other = create_match(create_team('Otro A'), create_team('Otro B'))
+        PlayerPerformance.objects.filter(match=other).update(points=4)
+        rebuild_statistics()
+        self.home_team.delete()
+        self.assertEqual(check_statistics(), {})
+        self.assertEqual(Statistics.objects.get(pk=1).top_scorer_score, 4)
+
+    def test_created_teams_and_matches_are_counted(self):
+        create_match(create_team('Otro A'), create_team('Otro B'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['totalMatches'], 2)
+        self.assertEqual(response.data['totalTeams'], 4)
+
+    def test_rebuild_command_and_consistency_check(self):
+        """El comando reconstruye desde cero y --check detecta desajustes"""
+        Statistics.objects.filter(pk=1).update(total_matches=99)
+        with self.assertRaises(Exception):
+            call_command('rebuild_statistics', check=True, stdout=StringIO(), stderr=StringIO())
+
+        call_command('rebuild_statistics', stdout=StringIO())
+        self.assertEqual(Statistics.objects.get(pk=1).total_matches, 1)
+        call_command('rebuild_statistics', check=True, stdout=StringIO())
+
+
+class StatisticsCacheTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        Set.objects.create(match=self.match, set_number=1, start_time=timezone.now())
+        self.url = reverse('match-statistics', args=[self.match.pk])
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def score(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse('match-update-score', args=[self.match.pk]),
+                {'set_number': 1, 'player_id': self.home_team.players.first().pk, 'point_type': 'SPK'},
+                format='json')
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            second = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_etag_returns_not_modified_until_a_point_is_scored(self):
+        first = self.client.get(self.url)
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.score()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_last_modified_is_honored(self):
+        first = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_finished_match_is_cached_permanently(self):
+        self.match.status = 'finished'
+        self.match.save()
+        response = self.client.get(self.url)
+        self.assertIn('max-age', response['Cache-Control'])
+
+    def test_counters_track_hits_and_misses(self):
+        before = get_counters()
+        self.client.get(self.url)
+        self.client.get(self.url)
+        response = self.client.get(reverse('statistics-cache'))
+        self.assertEqual(response.data['miss'], before['miss'] + 1)
+        self.assertEqual(response.data['hit'], before['hit'] + 1)
+
+
+class MatchStatisticsTests(APITestCase):
+
+    def setUp(self):
+        self.home_team = create_team('Local')
+        self.away_team = create_team('Visita')
+        self.match = create_match(self.home_team, self.away_team, sets=0)
+        self.url = reverse('match-statistics', args=[self.match.pk])
+        self.home = list(self.home_team.players.all())
+        self.away = list(self.away_team.players.all())
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def play(self, set_number, points):
+        """`points`: lista de (jugador, tipo) en orden; el set se finaliza al terminar"""
+        Set.objects.create(match=self.match, set_number=set_number, start_time=timezone.now())
+        url = reverse('match-update-score', args=[self.match.pk])
+        for player, point_type in points:
+            self.client.patch(url, {'set_number': set_number, 'player_id': player.pk, 'point_type': point_type}, format='json')
+        Set.objects.filter(match=self.match, set_number=set_number).update(end_time=timezone.now())
+
+    def test_leaderboard_and_per_set_splits_come_from_events(self):
+        self.play(1, [(self.home[0], 'SPK'), (self.home[0], 'SPK'), (self.away[0], 'ACE'), (self.home[1], 'BLK')])
+        self.play(2, [(self.away[0], 'ACE'), (self.away[0], 'SPK'), (self.away[0], 'SPK'), (self.home[0], 'ERR')])
+
+        data = self.client.get(self.url).data
+        self.assertEqual(data['best_scorer']['name'], self.away[0].name)
+        self.assertEqual(data['best_scorer']['total_points'], 4)
+        self.assertEqual(data['best_scorer']['points_per_set'],
+                         [{'set__set_number': 1, 'points': 1}, {'set__set_number': 2, 'points': 3}])
+        self.assertEqual(data['best_server']['total_aces'], 2)
+
+        leaderboard = {row['name']: row for row in data['leaderboard']}
+        self.assertEqual(leaderboard[self.home[0].name]['total_points'], 2)
+        self.assertEqual(leaderboard[self.home[0].name]['errors'], 1)
+        self.assertEqual(data['point_types']['away'], {'SPK': 2, 'BLK': 0, 'ACE': 2, 'ERR': 0})
+        self.assertEqual(data['runs']['longest'], {'team': 'away', 'length': 3, 'set_number': 2})
+
+    def test_query_count_does_not_depend_on_roster_or_points(self):
+        self.play(1, [(self.home[0], 'SPK')])
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+
+        cache.clear()
+        self.play(2, [(player, 'SPK') for player in self.home + self.away] * 3)
+        with CaptureQueriesContext(connection) as big:
+            self.client.get(self.url)
+        self.assertEqual(len(small.captured_queries), len(big.captured_queries))
@@ -0,0 +1,230 @@
+# statistic/tracking.py
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Subquery, Sum, Value, When
+from django.utils import timezone
+from teams.models import Team, Player
+from matches.models import Match, PlayerPerformance, Set
+from .cache import invalidate_statistics
+from .models import Statistics, PlayerScoreTotal, TeamWinTotal
+
+STATISTICS_PK = 1
+
+
+def _add_to_totals(model, key_field, value_field, deltas):
+    """
+    Suma incrementos a los acumulados con F(), creando las filas que falten
+
+    Un solo jugador/equipo (el caso de cada punto) cuesta un UPDATE; varios (lotes) cuestan
+    un INSERT que ignora duplicados y un UPDATE con CASE, sin importar cuántos sean.
+    """
+    if len(deltas) == 1:
+        [(key, delta)] = deltas.items()
+        if model.objects.filter(pk=key).update(**{value_field: F(value_field) + delta}):
+            return
+        try:
+            with transaction.atomic():
+                model.objects.create(**{key_field: key, value_field: delta})
+            return
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            model.objects.filter(pk=key).update(**{value_field: F(value_field) + delta})
+            return
+
+    model.objects.bulk_create([model(**{key_field: key}) for key in deltas], ignore_conflicts=True)
+    model.objects.filter(pk__in=deltas).update(**{
+        value_field: F(value_field) + Case(
+            *[When(pk=key, then=Value(delta)) for key, delta in deltas.items()], default=Value(0))
+    })
+
+
+def _promote_leader(candidates, score_field, name_field, value_field, related_name):
+    """Un UPDATE: si el mejor de `candidates` supera al líder guardado, pasa a ser el líder"""
+    best = candidates.order_by(f'-{value_field}')
+    best_value = Subquery(best.values(value_field)[:1])
+    Statistics.objects.filter(pk=STATISTICS_PK, **{f'{score_field}__lt': best_value}).update(**{
+        name_field: Subquery(best.values(f'{related_name}__name')[:1]),
+        score_field: best_value,
+        'last_updated': timezone.now(),
+    })
+
+
+def record_points(deltas):
+    """
+    Actualiza los puntos acumulados y el máximo anotador tras registrar o deshacer puntos
+
+    Args:
+        deltas: dict {player_id: puntos sumados (o restados si es negativo)}
+    """
+    deltas = {player_id: delta for player_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    _add_to_totals(PlayerScoreTotal, 'player_id', 'points', deltas)
+
+    gained = [player_id for player_id, delta in deltas.items() if delta > 0]
+    if gained:
+        _promote_leader(PlayerScoreTotal.objects.filter(pk__in=gained),
+                        'top_scorer_score', 'top_scorer_name', 'points', 'player')
+
+    lost = [player_id for player_id, delta in deltas.items() if delta < 0]
+    lost_names = Player.objects.filter(pk__in=lost).values('name')
+    if lost and Statistics.objects.filter(pk=STATISTICS_PK, top_scorer_name__in=lost_names).exists():
+        _refresh_top_scorer()
+
+
+def record_set_won(team_id):
+    """Suma un set ganado al equipo y actualiza el equipo con más victorias"""
+    _add_to_totals(TeamWinTotal, 'team_id', 'set_wins', {team_id: 1})
+    _promote_leader(TeamWinTotal.objects.filter(pk=team_id),
+                    'most_wins_count', 'most_wins_team', 'set_wins', 'team')
+
+
+def record_count(field, delta):
+    """Ajusta total_matches / total_teams al crear o borrar partidos y equipos"""
+    Statistics.objects.filter(pk=STATISTICS_PK).update(**{field: F(field) + delta}, last_updated=timezone.now())
+    invalidate_statistics()
+
+
+def _refresh_top_scorer():
+    top = PlayerScoreTotal.objects.select_related('player').order_by('-points').first()
+    Statistics.objects.filter(pk=STATISTICS_PK).update(
+        top_scorer_name=top.player.name if top else '',
+        top_scorer_score=top.points if top else 0,
+        last_updated=timezone.now())
+
+
+def _refresh_most_wins():
+    top = TeamWinTotal.objects.select_related('team').order_by('-set_wins').first()
+    Statistics.objects.filter(pk=STATISTICS_PK).update(
+        most_wins_team=top.team.name if top else '',
+        most_wins_count=top.set_wins if top else 0,
+        last_updated=timezone.now())
+
+
+def _subtract_from_totals(model, value_field, deltas):
+    """Resta de los acumulados existentes en un UPDATE (un borrado nunca crea filas)"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return False
+    model.objects.filter(pk__in=deltas).update(**{
+        value_field: F(value_field) - Case(
+            *[When(pk=key, then=Value(delta)) for key, delta in deltas.items()], default=Value(0))
+    })
+    return True
+
+
+def set_wins(sets):
+    """{team_id: sets ganados} entre los sets finalizados de `sets`"""
+    finished_sets = sets.filter(end_time__isnull=False)
+    home_wins = finished_sets.filter(home_team_score__gt=F('away_team_score')).values(
+        'match__home_team').annotate(wins=Count('id')).values_list('match__home_team', 'wins')
+    away_wins = finished_sets.filter(away_team_score__gt=F('home_team_score')).values(
+        'match__away_team').annotate(wins=Count('id')).values_list('match__away_team', 'wins')
+
+    team_wins = {}
+    for team_id, wins in list(home_wins) + list(away_wins):
+        team_wins[team_id] = team_wins.get(team_id, 0) + wins
+    return team_wins
+
+
+def discount_deleted(performances, sets):
+    """
+    Descuenta de los acumulados lo que aportaban rendimientos y sets que se van a borrar
+
+    Se llama antes del borrado (pre_delete), con las filas aún en la base. Si cambia algún
+    acumulado se recalculan los líderes.
+
+    Args:
+        performances: QuerySet de PlayerPerformance que se borran
+        sets: QuerySet de Set que se borran (sus victorias dejan de contar)
+    """
+    player_points = dict(
+        performances.values('player_id').annotate(total=Sum('points')).values_list('player_id', 'total'))
+    changed = False
+    if _subtract_from_totals(PlayerScoreTotal, 'points', player_points):
+        _refresh_top_scorer()
+        changed = True
+    if _subtract_from_totals(TeamWinTotal, 'set_wins', set_wins(sets)):
+        _refresh_most_wins()
+        changed = True
+    if changed:
+        invalidate_statistics()
+
+
+def refresh_leaders():
+    """Recalcula los líderes tras borrar un jugador o equipo (sus acumulados se borran en cascada)"""
+    _refresh_top_scorer()
+    _refresh_most_wins()
+    invalidate_statistics()
+
+
+def compute_statistics():
+    """
+    Calcula las estadísticas globales desde cero, sin escribir nada
+
+    Returns:
+        tuple: (dict con los campos de Statistics, {player_id: puntos}, {team_id: sets ganados})
+    """
+    player_points = dict(
+        PlayerPerformance.objects.values('player_id').annotate(total=Sum('points'))
+        .values_list('player_id', 'total')
+    )
+
+    # Solo cuentan los sets finalizados: son los que emiten el evento de fin de set
+    team_wins = set_wins(Set.objects.all())
+
+    data = {
+        'total_matches': Match.objects.count(),
+        'total_teams': Team.objects.count(),
+        'top_scorer_name': '',
+        'top_scorer_score': 0,
+        'most_wins_team': '',
+        'most_wins_count': 0,
+    }
+    if player_points:
+        player_id = max(player_points, key=player_points.get)
+        data['top_scorer_name'] = Player.objects.values_list('name', flat=True).get(pk=player_id)
+        data['top_scorer_score'] = player_points[player_id]
+    if team_wins:
+        team_id = max(team_wins, key=team_wins.get)
+        data['most_wins_team'] = Team.objects.values_list('name', flat=True).get(pk=team_id)
+        data['most_wins_count'] = team_wins[team_id]
+    return data, player_points, team_wins
+
+
+@transaction.atomic
+def rebuild_statistics():
+    """Reconstruye los acumulados y la fila de Statistics desde las tablas de partidos"""
+    data, player_points, team_wins = compute_statistics()
+
+    PlayerScoreTotal.objects.all().delete()
+    PlayerScoreTotal.objects.bulk_create(
+        PlayerScoreTotal(player_id=player_id, points=points) for player_id, points in player_points.items())
+    TeamWinTotal.objects.all().delete()
+    TeamWinTotal.objects.bulk_create(
+        TeamWinTotal(team_id=team_id, set_wins=wins) for team_id, wins in team_wins.items())
+
+    stats, _ = Statistics.objects.update_or_create(pk=STATISTICS_PK, defaults=data)
+    invalidate_statistics()
+    return stats
+
+
+def check_statistics():
+    """
+    Compara la fila incremental con un cálculo completo
+
+    Los nombres solo se comparan a través de su marcador: con empates, el incremental puede
+    quedarse con otro jugador o equipo igual de válido.
+
+    Returns:
+        dict: {campo: (incremental, completo)} con las diferencias encontradas
+    """
+    full, _, _ = compute_statistics()
+    stats = Statistics.objects.filter(pk=STATISTICS_PK).first()
+    if stats is None:
+        return {'statistics': (None, 'missing')}
+
+    differences = {}
+    for field in ('total_matches', 'total_teams', 'top_scorer_score', 'most_wins_count'):
+        if getattr(stats, field) != full[field]:
+            differences[field] = (getattr(stats, field), full[field])
+    return differences
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import StatisticsView, MatchStatisticsView
+from .views import StatisticsView, MatchStatisticsView, StatisticsCacheView
 
 urlpatterns = [
     path('statistics/', StatisticsView.as_view(), name='statistics'),
     path('statistics/match/<int:match_id>/', MatchStatisticsView.as_view(), name='match-statistics'),
+    path('statistics/cache/', StatisticsCacheView.as_view(), name='statistics-cache'),
 ]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TeamsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'teams'
+
+    def ready(self):
+        # Invalida los fragmentos de plantel en caché al cambiar equipos o jugadores
+        from . import signals  # noqa: F401
@@ -0,0 +1,268 @@
+# teams/bulk.py
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from volley_back.conditional import TEAMS, bump_versions
+from .models import Team, Player
+
+FORMATS = ('csv', 'ndjson')
+
+# CSV: una fila por jugador; las filas de un mismo equipo van seguidas. Un equipo sin
+# jugadores es una fila con las columnas del jugador vacías.
+CSV_COLUMNS = ['team', 'gender', 'name', 'jersey_number', 'position', 'avatar', 'is_holding']
+
+# Errores que se devuelven como mucho: un archivo mal formado no llena la memoria de mensajes
+MAX_ERRORS = 50
+
+
+# Valores de texto aceptados para `is_holding` (CSV y NDJSON); una celda vacía es False
+TRUE_VALUES = ('1', 'true', 'yes', 'si', 'sí')
+FALSE_VALUES = ('0', 'false', 'no', '')
+
+
+def _parse_bool(value):
+    """Convierte `is_holding` a bool; devuelve None si el valor no se reconoce"""
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+    return None
+
+
+class ImportFailed(Exception):
+    """El archivo tiene filas inválidas; no se guardó nada"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} errores de validación")
+        self.errors = errors
+
+
+def detect_format(filename, default='csv'):
+    extension = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def read_teams(stream, file_format):
+    """
+    Recorre un archivo binario y produce (línea, equipo) sin cargarlo entero
+
+    Cada equipo tiene la forma del payload de la API: {"name", "gender", "players": [...]}.
+    En NDJSON cada línea es un equipo; en CSV se agrupan las filas seguidas del mismo equipo.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'ndjson':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                team = json.loads(line)
+            except ValueError:
+                yield line_number, None
+                continue
+            yield line_number, team
+        return
+
+    current, first_line = None, None
+    for line_number, row in enumerate(csv.DictReader(text), start=2):
+        key = (row.get('team') or '', row.get('gender') or '')
+        if current is None or key != (current['name'], current['gender']):
+            if current is not None:
+                yield first_line, current
+            current, first_line = {'name': key[0], 'gender': key[1], 'players': []}, line_number
+        if row.get('name'):
+            current['players'].append({
+                'name': row['name'],
+                'jersey_number': row.get('jersey_number'),
+                'position': row.get('position') or None,
+                'avatar': row.get('avatar') or None,
+                'is_holding': row.get('is_holding'),
+            })
+    if current is not None:
+        yield first_line, current
+
+
+class TeamImporter:
+    """
+    Importa equipos con sus jugadores por bloques con bulk_create
+
+    Cada bloque se valida completo en memoria (campos y la regla de género/avatar de
+    `Player.clean`) antes de escribir; si alguna fila falla no se guarda nada del archivo.
+    """
+
+    def __init__(self, chunk_size=500):
+        self.chunk_size = chunk_size
+
+    def run(self, records):
+        """
+        Args:
+            records: Iterable de (línea, equipo) como los de `read_teams`
+
+        Returns:
+            dict: Equipos y jugadores creados
+        """
+        totals = {'teams': 0, 'players': 0}
+        errors = []
+        with transaction.atomic():
+            chunk = []
+            for record in records:
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk, totals, errors)
+                    chunk = []
+            if chunk:
+                self._import_chunk(chunk, totals, errors)
+            if errors:
+                raise ImportFailed(errors)
+
+            # bulk_create no dispara las señales que cuentan equipos y cambian versiones
+            from statistic.tracking import record_count
+            if totals['teams']:
+                record_count('total_teams', totals['teams'])
+                bump_versions(TEAMS)
+        return totals
+
+    def _import_chunk(self, chunk, totals, errors):
+        teams, players = self.build(chunk, errors)
+        # Tras el primer error solo se sigue validando para informar del resto de filas
+        if errors:
+            del errors[MAX_ERRORS:]
+            return
+        Team.objects.bulk_create(teams)
+        # Los jugadores ya tienen su equipo asignado: bulk_create toma el id recién creado
+        Player.objects.bulk_create(players)
+        totals['teams'] += len(teams)
+        totals['players'] += len(players)
+
+    def build(self, chunk, errors):
+        teams, players = [], []
+        for line_number, data in chunk:
+            if not isinstance(data, dict):
+                errors.append(f"Línea {line_number}: no es un equipo válido.")
+                continue
+            team = Team(name=data.get('name') or '', gender=data.get('gender') or None)
+            problems = self._validate(team, exclude=['created_at', 'updated_at'])
+            if team.gender is None:
+                problems.append("gender: Este campo es requerido.")
+
+            roster = data.get('players') or []
+            if not isinstance(roster, list):
+                roster = []
+                problems.append("players: debe ser una lista.")
+            for index, player_data in enumerate(roster, start=1):
+                player = self._build_player(team, player_data, problems, index)
+                if player is not None:
+                    players.append(player)
+
+            if problems:
+                errors.extend(f"Línea {line_number} ({team.name or 'sin nombre'}): {problem}" for problem in problems)
+            teams.append(team)
+        return teams, players
+
+    def _build_player(self, team, data, problems, index):
+        if not isinstance(data, dict):
+            problems.append(f"jugador {index}: no es un jugador válido.")
+            return None
+        is_holding = _parse_bool(data.get('is_holding'))
+        player = Player(
+            team=team,
+            name=data.get('name') or '',
+            jersey_number=data.get('jersey_number'),
+            position=data.get('position') or None,
+            avatar=data.get('avatar') or None,
+            is_holding=bool(is_holding),
+        )
+        found = self._validate(player, exclude=['team'])
+        if is_holding is None:
+            found.append(f"is_holding: “{data.get('is_holding')}” no es un valor verdadero/falso válido.")
+        if not found:
+            try:
+                # El equipo está en memoria: clean() no consulta la base de datos
+                player.clean()
+            except ValidationError as e:
+                found.extend(e.messages)
+        if found:
+            problems.extend(f"jugador {index}: {message}" for message in found)
+            return None
+        player.assign_default_avatar()
+        return player
+
+    def _validate(self, instance, exclude):
+        try:
+            instance.clean_fields(exclude=exclude)
+        except ValidationError as e:
+            return [f"{field}: {message}" for field, messages in e.message_dict.items() for message in messages]
+        return []
+
+
+def export_teams(file_format, chunk_size=500):
+    """
+    Genera el archivo de equipos y jugadores por trozos (para StreamingHttpResponse o un archivo)
+
+    Recorre los equipos por bloques de id creciente y precarga los jugadores de cada bloque,
+    así que la memoria no depende del número de equipos.
+    """
+    if file_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        yield _drain(buffer)
+
+    last_pk = 0
+    while True:
+        teams = list(Team.objects.filter(pk__gt=last_pk).order_by('pk').prefetch_related('players')[:chunk_size])
+        if not teams:
+            return
+        last_pk = teams[-1].pk
+
+        lines = []
+        for team in teams:
+            players = sorted(team.players.all(), key=lambda player: (player.jersey_number, player.pk))
+            if file_format == 'ndjson':
+                lines.append(json.dumps({
+                    'name': team.name,
+                    'gender': team.gender,
+                    'players': [_player_dict(player) for player in players],
+                }, ensure_ascii=False) + '\n')
+                continue
+            for player in players or [None]:
+                row = _player_dict(player) if player else dict.fromkeys(CSV_COLUMNS[2:], '')
+                writer.writerow([team.name, team.gender or ''] + [_csv_value(row[column]) for column in CSV_COLUMNS[2:]])
+        yield ''.join(lines) if file_format == 'ndjson' else _drain(buffer)
+
+
+def _player_dict(player):
+    return {
+        'name': player.name,
+        'jersey_number': player.jersey_number,
+        'position': player.position,
+        'avatar': player.avatar,
+        'is_holding': player.is_holding,
+    }
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+def _drain(buffer):
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
@@ -0,0 +1,77 @@
+# teams/cache.py
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from .models import Team
+
+
+def _store():
+    return caches[getattr(settings, 'ROSTER_CACHE_ALIAS', 'default')]
+
+
+def roster_cache_enabled():
+    return getattr(settings, 'ROSTER_CACHE_ENABLED', True)
+
+
+def roster_key(team):
+    """
+    Clave del fragmento de un equipo: id más `updated_at`
+
+    Cualquier cambio del equipo o de sus jugadores mueve `updated_at` (ver teams/signals.py),
+    así que la clave vieja deja de usarse sin tener que borrarla.
+    """
+    return f"roster:{team.pk}:{team.updated_at.timestamp():.6f}"
+
+
+def prime_rosters(serializer, teams):
+    """
+    Deja en cada equipo su fragmento serializado (`team._roster_fragment`)
+
+    Una lectura `get_many` para todos los equipos; los que no están en caché cargan sus
+    jugadores en una sola consulta (salvo que ya vinieran precargados), se serializan con
+    `serializer.render_team` y se guardan.
+
+    Args:
+        serializer: TeamSerializer que renderiza los fragmentos que falten
+        teams: Equipos a preparar (pueden repetirse)
+    """
+    pending = {}
+    for team in teams:
+        if team is None:
+            continue
+        key = roster_key(team)
+        cached = getattr(team, '_roster_fragment', None)
+        if cached is None or cached[0] != key:
+            pending.setdefault(key, []).append(team)
+    if not pending:
+        return
+
+    store = _store()
+    found = store.get_many(pending)
+    missing = {key: instances for key, instances in pending.items() if key not in found}
+
+    without_players = [
+        instances[0] for instances in missing.values()
+        if 'players' not in getattr(instances[0], '_prefetched_objects_cache', {})
+    ]
+    if without_players:
+        prefetch_related_objects(without_players, 'players')
+
+    rendered = {key: serializer.render_team(instances[0]) for key, instances in missing.items()}
+    if rendered:
+        store.set_many(rendered, timeout=getattr(settings, 'ROSTER_CACHE_TTL', 60 * 60))
+
+    for key, instances in pending.items():
+        fragment = found[key] if key in found else rendered[key]
+        for team in instances:
+            team._roster_fragment = (key, fragment)
+
+
+def touch_team(team_id):
+    """Mueve `updated_at` del equipo para que su fragmento en caché deje de usarse"""
+    Team.objects.filter(pk=team_id).update(updated_at=timezone.now())
+
+
+def forget_team(team):
+    _store().delete(roster_key(team))
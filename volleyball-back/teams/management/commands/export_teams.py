@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from teams.bulk import FORMATS, export_teams
+
+
+class Command(BaseCommand):
+    help = "Exporta todos los equipos con sus jugadores en CSV o NDJSON (el mismo formato que import_teams)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv', help="Formato de salida")
+        parser.add_argument('--output', default=None, help="Archivo de salida (por defecto la salida estándar)")
+
+    def handle(self, *args, **options):
+        if options['output'] is None:
+            for part in export_teams(options['format']):
+                self.stdout.write(part, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for part in export_teams(options['format']):
+                output.write(part)
+        self.stderr.write(f"Exportado en {options['output']}")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from teams.bulk import FORMATS, ImportFailed, TeamImporter, detect_format, read_teams
+
+
+class Command(BaseCommand):
+    help = "Importa equipos y jugadores desde un archivo CSV o NDJSON con bulk_create por bloques"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Archivo a importar")
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help="Formato del archivo (por defecto según la extensión)")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Equipos por bloque")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as stream:
+                totals = TeamImporter(chunk_size=options['chunk_size']).run(read_teams(stream, file_format))
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+        except ImportFailed as e:
+            raise CommandError("No se importó nada:\n" + '\n'.join(e.errors))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Importados {totals['teams']} equipos y {totals['players']} jugadores "
+            f"en {time.perf_counter() - started:.1f}s"))
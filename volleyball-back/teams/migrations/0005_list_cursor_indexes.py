@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0004_rename_avatar_url_player_avatar_team_gender'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['created_at', 'id'], name='team_created_idx'),
+        ),
+    ]
@@ -14,6 +14,12 @@ class Team(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Orden del listado y paginación por cursor
+            models.Index(fields=['created_at', 'id'], name='team_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.get_gender_display()})"
 
@@ -42,7 +48,10 @@ class Player(models.Model):
     def save(self, *args, **kwargs):
         # Llamar a la validación antes de guardar
         self.clean()
+        self.assign_default_avatar()
+        super().save(*args, **kwargs)
 
+    def assign_default_avatar(self):
         # Asignar avatar por defecto según el género del equipo
         if not self.avatar:
             if self.team.gender == 'M':
@@ -50,8 +59,6 @@ class Player(models.Model):
             elif self.team.gender == 'F':
                 self.avatar = self.DEFAULT_AVATAR_FEMALE
 
-        super().save(*args, **kwargs)
-
     def clean(self):
         # Validar que el jugador solo pertenezca a un equipo de su mismo género
         if self.team.gender == 'M' and self.avatar == self.DEFAULT_AVATAR_FEMALE:
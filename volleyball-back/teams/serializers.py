@@ -3,47 +3,179 @@
 from rest_framework import serializers
 from .models import Team, Player
 from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from rest_framework.exceptions import ValidationError as DRFValidationError
+from volley_back.conditional import bump_versions, team_scopes
+from volley_back.serializers import DynamicFieldsMixin
+from .cache import prime_rosters, roster_cache_enabled
 
 
-class PlayerSerializer(serializers.ModelSerializer):
+class PlayerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Player
         fields = ['id', 'name', 'jersey_number',
                   'avatar', 'position', 'is_holding']
+        expandable_fields = {
+            'team': ('teams.serializers.TeamSerializer', {}),
+        }
 
 
-class TeamSerializer(serializers.ModelSerializer):
-    players = PlayerSerializer(many=True)
+class RosterPlayerSerializer(PlayerSerializer):
+    """Jugador dentro del plantel de un equipo: acepta `id` para actualizar al jugador existente"""
+    id = serializers.IntegerField(required=False)
+
+
+# Campos del jugador que se escriben desde el plantel: en un jugador existente se conservan los que
+# no se envían; en uno nuevo toman el valor por defecto (salvo jersey_number, obligatorio)
+ROSTER_FIELDS = ('name', 'jersey_number', 'avatar', 'position', 'is_holding')
+
+
+class RosterPrimingListSerializer(serializers.ListSerializer):
+    """Prepara de una vez los fragmentos de plantel de todos los elementos antes de renderizarlos"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        renderer = self.child.roster_renderer()
+        if renderer is not None:
+            prime_rosters(renderer, [team for item in items for team in self.child.roster_teams(item)])
+        return super().to_representation(items)
+
+
+class TeamSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Equipo con su plantel; la representación completa se guarda en caché por id y
+    `updated_at` (ver teams/cache.py) y se reutiliza en cada partido que lo incluye
+    """
+    players = RosterPlayerSerializer(many=True)
 
     class Meta:
         model = Team
         fields = ['id', 'name', 'gender',
                   'players', 'created_at', 'updated_at']
+        list_serializer_class = RosterPrimingListSerializer
+
+    def uses_roster_cache(self):
+        """Solo la representación completa se cachea: sin ?fields=, ?omit= ni ?expand= en este nivel"""
+        # Construir los campos resuelve las opciones que llegan de la petición o del padre
+        self.fields
+        return (roster_cache_enabled() and self._sparse_fields is None
+                and self._sparse_omit is None and self._sparse_expand is None)
+
+    def self_loaded_fields(self):
+        """
+        Relaciones que este serializer carga por su cuenta y `plan_queryset` no debe precargar
+
+        Los jugadores se cargan solo para los equipos que no están en caché, siempre que quien
+        renderiza prepare los fragmentos en bloque (la raíz o un padre con `primes_rosters`).
+        """
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        if self.uses_roster_cache() and (parent is None or getattr(parent, 'primes_rosters', False)):
+            return {'players'}
+        return set()
+
+    def roster_renderer(self):
+        return self if self.uses_roster_cache() else None
+
+    def roster_teams(self, team):
+        return [team]
+
+    def render_team(self, team):
+        return super().to_representation(team)
+
+    def to_representation(self, instance):
+        if not self.uses_roster_cache():
+            return super().to_representation(instance)
+        prime_rosters(self, [instance])
+        return instance._roster_fragment[1]
 
+    @transaction.atomic
     def create(self, validated_data):
         players_data = validated_data.pop('players')
         team = Team.objects.create(**validated_data)
-        for player_data in players_data:
-            try:
-                # Aquí capturamos la excepción de validación y la transformamos en un DRF ValidationError
-                Player.objects.create(team=team, **player_data)
-            except ValidationError as e:
-                raise DRFValidationError({"player_error": e.messages})
+        self.sync_roster(team, players_data, existing=[])
         return team
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        players_data = validated_data.pop('players')
+        players_data = validated_data.pop('players', None)
         instance.name = validated_data.get('name', instance.name)
         instance.gender = validated_data.get('gender', instance.gender)
         instance.save()
 
-        # Eliminar jugadores existentes y recrear jugadores
-        instance.players.all().delete()
+        # Un PATCH sin `players` no toca el plantel
+        if players_data is not None:
+            self.sync_roster(instance, players_data)
+        return instance
+
+    def sync_roster(self, team, players_data, existing=None):
+        """
+        Deja el plantel del equipo igual al enviado sin borrar y recrear a los jugadores
+
+        Cada jugador enviado se empareja con uno existente por `id` o, si no lo trae, por
+        número de camiseta; los emparejados conservan su id (y con él su historial de puntos
+        y rendimientos). Se valida todo en memoria antes de escribir y luego se hace un
+        bulk_update, un bulk_create y un único borrado de los que ya no están.
+        """
+        if existing is None:
+            existing = list(Player.objects.filter(team=team))
+        by_id = {player.pk: player for player in existing}
+        by_jersey = {}
+        for player in existing:
+            by_jersey.setdefault(player.jersey_number, []).append(player)
+        # Los ids pedidos explícitamente no se reparten por número de camiseta
+        requested = {player_data['id'] for player_data in players_data if player_data.get('id') is not None}
+
+        matched, to_update, to_create, errors = set(), [], [], []
         for player_data in players_data:
+            player_id = player_data.get('id')
+            if player_id is not None:
+                player = by_id.get(player_id)
+                if player is None:
+                    errors.append(f"El jugador {player_id} no pertenece a este equipo.")
+                    continue
+                if player.pk in matched:
+                    errors.append(f"El jugador {player_id} aparece más de una vez.")
+                    continue
+            else:
+                candidates = [candidate for candidate in by_jersey.get(player_data.get('jersey_number'), ())
+                              if candidate.pk not in matched and candidate.pk not in requested]
+                player = candidates[0] if candidates else None
+
+            if player is None:
+                if player_data.get('jersey_number') is None:
+                    errors.append("Los jugadores nuevos deben incluir su número de camiseta (jersey_number).")
+                    continue
+                player = Player(team=team)
+                to_create.append(player)
+                values = {field: player_data.get(field, Player._meta.get_field(field).get_default())
+                          for field in ROSTER_FIELDS}
+            else:
+                matched.add(player.pk)
+                player.team = team
+                previous = {field: getattr(player, field) for field in ROSTER_FIELDS}
+                # Edición parcial (p. ej. un PATCH con solo `id` y `name`): lo no enviado no cambia
+                values = {field: player_data[field] for field in ROSTER_FIELDS if field in player_data}
+            for field, value in values.items():
+                setattr(player, field, value)
+
             try:
-                Player.objects.create(team=instance, **player_data)
+                player.clean()
             except ValidationError as e:
-                raise DRFValidationError({"player_error": e.messages})
+                errors.extend(e.messages)
+                continue
+            player.assign_default_avatar()
+            if player.pk is not None and any(getattr(player, field) != value for field, value in previous.items()):
+                to_update.append(player)
+
+        if errors:
+            raise DRFValidationError({"player_error": errors})
+
+        Player.objects.bulk_update(to_update, ROSTER_FIELDS)
+        Player.objects.bulk_create(to_create)
+        removed = [player.pk for player in existing if player.pk not in matched]
+        if removed:
+            Player.objects.filter(pk__in=removed).delete()
+        # bulk_update y bulk_create no disparan las señales que cambian las versiones (ETag)
+        changed = [player.pk for player in to_update] + removed
+        bump_versions(*team_scopes(team.pk), *[f"player:{pk}" for pk in changed])
 
-        return instance
@@ -0,0 +1,27 @@
+# teams/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from volley_back.conditional import bump_versions, team_scopes
+from .cache import forget_team, touch_team
+from .models import Team, Player
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def invalidate_roster_for_player(sender, instance, raw=False, **kwargs):
+    # Alta, cambio o baja de un jugador (incluido `remove_player`): el plantel cambió
+    if not raw:
+        touch_team(instance.team_id)
+        bump_versions(*team_scopes(instance.team_id), f"player:{instance.pk}")
+
+
+@receiver(post_save, sender=Team)
+def bump_team_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_versions(*team_scopes(instance.pk))
+
+
+@receiver(post_delete, sender=Team)
+def forget_deleted_team(sender, instance, **kwargs):
+    forget_team(instance)
+    bump_versions(*team_scopes(instance.pk))
@@ -1,7 +1,17 @@
 # teams/tests.py
+import json
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from teams.models import Team, Player
 
 
@@ -99,3 +109,302 @@ class TeamTests(APITestCase):
         self.assertEqual(len(response.data['results']), 1)
         self.assertEqual(response.data['results']
                          [0]['name'], 'Equipo Masculino')
+
+    def test_get_teams_sparse_fields(self):
+        """`?fields=` recorta la respuesta y evita precargar jugadores"""
+        self.client.post(self.create_team_url,
+                         self.team_data_male, format='json')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.get_teams_url, {'fields': 'id,name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+        self.assertFalse(any('teams_player' in query['sql'] for query in context.captured_queries))
+
+
+class RosterSyncTests(APITestCase):
+
+    def setUp(self):
+        self.team = Team.objects.create(name='Plantel', gender='M')
+        Player.objects.bulk_create([
+            Player(team=self.team, name=f'Jugador {number}', jersey_number=number,
+                   position='CE', avatar=Player.DEFAULT_AVATAR_MALE)
+            for number in range(1, 15)
+        ])
+        self.players = list(self.team.players.order_by('jersey_number'))
+        self.url = reverse('team-detail', args=[self.team.pk])
+
+    def roster(self, players):
+        return {'name': 'Plantel', 'gender': 'M', 'players': players}
+
+    def test_update_keeps_player_ids_and_history(self):
+        from matches.models import Match, Set, PointEvent
+        from django.utils import timezone
+
+        rival = Team.objects.create(name='Rival', gender='M')
+        match = Match.objects.create(home_team=self.team, away_team=rival, date=timezone.now(), location='Gimnasio')
+        current_set = Set.objects.create(match=match, set_number=1)
+        PointEvent.objects.create(match=match, set=current_set, player=self.players[0], team=self.team,
+                                  point_type='SPK', home_score_after=1, away_score_after=0)
+
+        # El primero por id, el resto por número de camiseta; el 14 sale y entra el 15
+        payload = [{'id': self.players[0].pk, 'name': 'Capitán', 'jersey_number': 1, 'position': 'AR'}]
+        payload += [{'name': player.name, 'jersey_number': player.jersey_number, 'position': 'CE'}
+                    for player in self.players[1:13]]
+        payload.append({'name': 'Refuerzo', 'jersey_number': 15, 'position': 'LI'})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.put(self.url, self.roster(payload), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Lectura del equipo y del plantel, un UPDATE, un INSERT, el borrado con sus cascadas
+        # (y la invalidación del plantel) y la respuesta; antes eran dos consultas por jugador
+        # más los borrados
+        self.assertLessEqual(len(context.captured_queries), 14)
+
+        kept = {player.pk for player in self.players[:13]}
+        roster = {player.jersey_number: player for player in self.team.players.all()}
+        self.assertEqual(len(roster), 14)
+        self.assertTrue(kept <= {player.pk for player in roster.values()})
+        self.assertNotIn(14, roster)
+        self.assertEqual(roster[1].name, 'Capitán')
+        self.assertEqual(roster[15].avatar, Player.DEFAULT_AVATAR_MALE)
+        self.assertEqual(PointEvent.objects.filter(player=self.players[0]).count(), 1)
+
+    def test_player_from_another_team_is_rejected(self):
+        other = Team.objects.create(name='Otro', gender='M')
+        stranger = Player.objects.create(team=other, name='Ajeno', jersey_number=99)
+
+        response = self.client.put(self.url, self.roster(
+            [{'id': stranger.pk, 'name': 'Ajeno', 'jersey_number': 99}]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('player_error', response.data)
+        self.assertEqual(self.team.players.count(), 14)
+        self.assertEqual(stranger.team_id, other.pk)
+
+    def test_invalid_player_leaves_roster_untouched(self):
+        response = self.client.put(self.url, self.roster([
+            {'name': 'Nuevo', 'jersey_number': 20},
+            {'name': 'Jugadora', 'jersey_number': 21, 'avatar': Player.DEFAULT_AVATAR_FEMALE},
+        ]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.team.players.count(), 14)
+
+    def test_patch_renames_player_by_id_keeping_other_fields(self):
+        captain = self.players[0]
+        payload = [{'id': player.pk} for player in self.players]
+        payload[0] = {'id': captain.pk, 'name': 'Renombrado'}
+
+        response = self.client.patch(self.url, {'players': payload}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        captain.refresh_from_db()
+        self.assertEqual((captain.name, captain.jersey_number, captain.position, captain.avatar),
+                         ('Renombrado', 1, 'CE', Player.DEFAULT_AVATAR_MALE))
+        self.assertEqual(self.team.players.count(), 14)
+
+    def test_new_player_without_jersey_number_is_rejected(self):
+        payload = [{'id': player.pk} for player in self.players] + [{'name': 'Sin número'}]
+
+        response = self.client.patch(self.url, {'players': payload}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('player_error', response.data)
+        self.assertEqual(self.team.players.count(), 14)
+
+    def test_partial_update_without_players_keeps_roster(self):
+        response = self.client.patch(self.url, {'name': 'Renombrado'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.team.players.count(), 14)
+
+
+class TeamImportExportTests(APITestCase):
+
+    def csv_file(self, content, name='equipos.csv'):
+        return SimpleUploadedFile(name, content.encode('utf-8'), content_type='text/csv')
+
+    def test_import_csv_creates_teams_in_bulk(self):
+        content = (
+            "team,gender,name,jersey_number,position,avatar,is_holding\n"
+            "Leones,M,Jugador 1,1,CE,,true\n"
+            "Leones,M,Jugador 2,2,AR,,false\n"
+            "Panteras,F,Jugadora 1,7,LI,,\n"
+            "Sin Plantel,F,,,,,\n"
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('team-import-teams'), {'file': self.csv_file(content)})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'teams': 3, 'players': 3})
+
+        leones = Team.objects.get(name='Leones')
+        self.assertEqual(sorted(leones.players.values_list('jersey_number', flat=True)), [1, 2])
+        self.assertTrue(leones.players.get(jersey_number=1).is_holding)
+        self.assertEqual(Player.objects.get(name='Jugadora 1').avatar, Player.DEFAULT_AVATAR_FEMALE)
+        self.assertEqual(Team.objects.get(name='Sin Plantel').players.count(), 0)
+        inserts = [query for query in context.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertLessEqual(len(inserts), 3)
+
+    def test_invalid_rows_import_nothing(self):
+        content = (
+            "team,gender,name,jersey_number,position,avatar,is_holding\n"
+            f"Leones,M,Jugador 1,1,CE,{Player.DEFAULT_AVATAR_FEMALE},\n"
+            "Panteras,X,Jugadora 1,siete,LI,,\n"
+        )
+        response = self.client.post(reverse('team-import-teams'), {'file': self.csv_file(content)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data['errors']), 3)
+        self.assertIn('Línea 2 (Leones)', response.data['errors'][0])
+        self.assertFalse(Team.objects.exists())
+
+    def test_is_holding_strings_are_parsed(self):
+        content = (
+            '{"name": "Leones", "gender": "M", "players": ['
+            '{"name": "Titular", "jersey_number": 1, "is_holding": "false"}, '
+            '{"name": "Suplente", "jersey_number": 2, "is_holding": "0"}, '
+            '{"name": "Capitán", "jersey_number": 3, "is_holding": "true"}]}\n'
+        )
+        upload = SimpleUploadedFile('equipos.ndjson', content.encode('utf-8'))
+        response = self.client.post(reverse('team-import-teams'), {'file': upload})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(dict(Player.objects.values_list('name', 'is_holding')),
+                         {'Titular': False, 'Suplente': False, 'Capitán': True})
+
+        content = (
+            "team,gender,name,jersey_number,position,avatar,is_holding\n"
+            "Panteras,F,Jugadora 1,7,LI,,quizás\n"
+        )
+        response = self.client.post(reverse('team-import-teams'), {'file': self.csv_file(content)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('is_holding', response.data['errors'][0])
+        self.assertFalse(Team.objects.filter(name='Panteras').exists())
+
+    def test_export_round_trips_through_import_command(self):
+        team = Team.objects.create(name='Leones', gender='M')
+        Player.objects.create(team=team, name='Jugador 1', jersey_number=4, position='OP', is_holding=True)
+        Team.objects.create(name='Vacío', gender='F')
+
+        response = self.client.get(reverse('team-export'), {'type': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        exported = b''.join(response.streaming_content)
+        lines = [json.loads(line) for line in exported.decode().splitlines()]
+        self.assertEqual([line['name'] for line in lines], ['Leones', 'Vacío'])
+        self.assertEqual(lines[0]['players'][0]['jersey_number'], 4)
+
+        csv_response = self.client.get(reverse('team-export'))
+        self.assertEqual(b''.join(csv_response.streaming_content).decode().splitlines()[1],
+                         f'Leones,M,Jugador 1,4,OP,{Player.DEFAULT_AVATAR_MALE},true')
+
+        Team.objects.all().delete()
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as source:
+            source.write(exported)
+            source.flush()
+            call_command('import_teams', source.name, stdout=StringIO())
+        self.assertEqual(Team.objects.count(), 2)
+        self.assertTrue(Player.objects.get(name='Jugador 1').is_holding)
+
+    def test_import_command_reports_errors(self):
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as source:
+            source.write(b'{"name": "Sin genero", "players": []}\nno es json\n')
+            source.flush()
+            with self.assertRaisesMessage(CommandError, 'Línea 2: no es un equipo válido.'):
+                call_command('import_teams', source.name, stdout=StringIO())
+        self.assertFalse(Team.objects.exists())
+
+
+class ListPaginationTests(APITestCase):
+
+    def setUp(self):
+        Team.objects.bulk_create([Team(name=f'Equipo {number:02d}', gender='M') for number in range(1, 15)])
+        self.url = reverse('team-list')
+
+    def test_cursor_pages_walk_the_whole_list_without_count(self):
+        names, url, params = [], self.url, {'pagination': 'cursor', 'fields': 'id,name'}
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+            self.assertFalse(any('OFFSET' in query['sql'] for query in context.captured_queries))
+            names += [team['name'] for team in response.data['results']]
+            url, params = response.data['next'], {}
+        self.assertEqual(names, [f'Equipo {number:02d}' for number in range(1, 15)])
+
+    def test_page_numbers_without_count(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'count': 'false', 'page': 3, 'fields': 'name'})
+        self.assertIsNone(response.data['count'])
+        self.assertEqual([team['name'] for team in response.data['results']], ['Equipo 13', 'Equipo 14'])
+        self.assertIsNone(response.data['next'])
+        self.assertIn('page=2', response.data['previous'])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+
+        response = self.client.get(self.url, {'count': 'false', 'fields': 'name'})
+        self.assertIn('page=2', response.data['next'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_default_pages_keep_the_total(self):
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(response.data['count'], 14)
+        self.assertEqual(len(response.data['results']), 6)
+
+
+class TeamConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Local', gender='M')
+        self.player = Player.objects.create(team=self.team, name='Uno', jersey_number=1, position='CE')
+
+    def tearDown(self):
+        cache.clear()
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_team_detail_changes_only_with_its_roster(self):
+        url = reverse('team-detail', args=[self.team.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidate(url, etag), status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Team.objects.create(name='Otro', gender='F')
+        self.assertEqual(self.revalidate(url, etag), status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('team-remove-player', args=[self.team.pk, self.player.pk]))
+        self.assertEqual(self.revalidate(url, etag), status.HTTP_200_OK)
+
+    def test_player_detail_and_lists(self):
+        player_url = reverse('player-detail', args=[self.player.pk])
+        player_etag = self.client.get(player_url)['ETag']
+        players_etag = self.client.get(reverse('player-list'))['ETag']
+        teams_etag = self.client.get(reverse('team-list'))['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(player_url, {'name': 'Renombrado'}, format='json')
+        self.assertEqual(self.revalidate(player_url, player_etag), status.HTTP_200_OK)
+        self.assertEqual(self.revalidate(reverse('player-list'), players_etag), status.HTTP_200_OK)
+        self.assertEqual(self.revalidate(reverse('team-list'), teams_etag), status.HTTP_200_OK)
+
+    def test_roster_edit_through_team_changes_player_detail(self):
+        player_url = reverse('player-detail', args=[self.player.pk])
+        etag = self.client.get(player_url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(reverse('team-detail', args=[self.team.pk]), {
+                'name': 'Local', 'gender': 'M',
+                'players': [{'id': self.player.pk, 'name': 'Renombrado', 'jersey_number': 1, 'position': 'CE'}],
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(player_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Renombrado')
+
+    def test_bulk_import_changes_team_list(self):
+        etag = self.client.get(reverse('team-list'))['ETag']
+        upload = SimpleUploadedFile('equipos.ndjson', b'{"name": "Importado", "gender": "F", "players": []}\n')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('team-import-teams'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.revalidate(reverse('team-list'), etag), status.HTTP_200_OK)
@@ -1,31 +1,37 @@
 # teams/views.py
 from .serializers import TeamSerializer, PlayerSerializer
 from .models import Team, Player
+from .bulk import FORMATS, ImportFailed, TeamImporter, detect_format, export_teams, read_teams
+from django.http import StreamingHttpResponse
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.pagination import PageNumberPagination
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
+from volley_back.conditional import TEAMS, ConditionalGetMixin, team_scopes
+from volley_back.pagination import StandardResultsSetPagination
+from volley_back.query_planner import PlannedQuerysetMixin
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 6
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
-class TeamViewSet(viewsets.ModelViewSet):
-    queryset = Team.objects.prefetch_related('players').all().order_by(
-        'created_at') 
+class TeamViewSet(ConditionalGetMixin, PlannedQuerysetMixin, viewsets.ModelViewSet):
+    # Las precargas (players) las decide PlannedQuerysetMixin según los campos pedidos
+    queryset = Team.objects.all().order_by('created_at')
     serializer_class = TeamSerializer
     pagination_class = StandardResultsSetPagination
+    # Paginación por cursor (`?cursor=`): índice team_created_idx
+    cursor_ordering = ('created_at', 'id')
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['name']
     search_fields = ['name', 'players__name']
     ordering_fields = ['name', 'created_at']
 
+    def version_scopes(self):
+        if self.object_key() is None:
+            return [TEAMS]
+        return [team_scopes(self.object_key())[1]]
+
     # Añadimos esta acción para eliminar un jugador de un equipo
     @action(detail=True, methods=['DELETE'], url_path='remove-player/(?P<player_id>[^/.]+)')
     def remove_player(self, request, pk=None, player_id=None):
@@ -37,12 +43,48 @@ class TeamViewSet(viewsets.ModelViewSet):
         except Player.DoesNotExist:
             return Response({'error': 'Jugador no encontrado en este equipo.'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=False, methods=['POST'], url_path='import', parser_classes=[MultiPartParser])
+    def import_teams(self, request):
+        """Importa equipos y jugadores desde un archivo CSV o NDJSON (campo `file`)"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Debe enviarse un archivo en el campo "file".'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('type') or detect_format(upload.name)
+        if file_format not in FORMATS:
+            return Response({'error': f'Formato no soportado. Use: {", ".join(FORMATS)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            totals = TeamImporter().run(read_teams(upload.file, file_format))
+        except ImportFailed as e:
+            return Response({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(totals, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['GET'], url_path='export')
+    def export(self, request):
+        """Descarga todos los equipos con sus jugadores en CSV o NDJSON (`?type=`)"""
+        file_format = request.query_params.get('type', 'csv')
+        if file_format not in FORMATS:
+            return Response({'error': f'Formato no soportado. Use: {", ".join(FORMATS)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        content_type = 'text/csv; charset=utf-8' if file_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(export_teams(file_format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="teams.{file_format}"'
+        return response
 
-class PlayerViewSet(viewsets.ModelViewSet):
-    queryset = Player.objects.select_related('team').all()
+
+class PlayerViewSet(ConditionalGetMixin, PlannedQuerysetMixin, viewsets.ModelViewSet):
+    queryset = Player.objects.select_related('team').order_by('id')
     serializer_class = PlayerSerializer
     pagination_class = StandardResultsSetPagination
+    cursor_ordering = ('id',)
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['name', 'jersey_number', 'team__name']
     search_fields = ['name', 'team__name']
     ordering_fields = ['name', 'jersey_number']
+
+    def version_scopes(self):
+        # Cualquier cambio de jugadores cambia la versión de los equipos; `?expand=team` depende de ellos
+        if self.object_key() is None or 'expand' in self.request.query_params:
+            return [TEAMS]
+        return [f"player:{self.object_key()}"]
@@ -0,0 +1,43 @@
+# volley_back/checks.py
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends que no comparten lo guardado entre procesos (cada worker de gunicorn tendría el suyo)
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Cachés que deben verse igual desde todos los procesos: versiones de los ETag, claves de
+# idempotencia y versiones de las estadísticas
+SHARED_CACHE_SETTINGS = (
+    'RESOURCE_VERSION_CACHE_ALIAS',
+    'IDEMPOTENCY_CACHE_ALIAS',
+    'STATISTICS_CACHE_ALIAS',
+)
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    """
+    Con `REQUIRE_SHARED_CACHE` (por defecto, cuando DEBUG=False) las cachés de versiones,
+    idempotencia y estadísticas no pueden ser de memoria local: un worker que no atendió la
+    escritura seguiría respondiendo 304 con datos viejos o aplicaría dos veces un reintento
+    """
+    if not getattr(settings, 'REQUIRE_SHARED_CACHE', False):
+        return []
+    by_alias = {}
+    for setting in SHARED_CACHE_SETTINGS:
+        by_alias.setdefault(getattr(settings, setting, 'default'), []).append(setting)
+    errors = []
+    for alias, names in by_alias.items():
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in PROCESS_LOCAL_BACKENDS:
+            errors.append(Error(
+                f"La caché '{alias}' ({', '.join(names)}) usa {backend.rsplit('.', 1)[-1]}, "
+                "que no se comparte entre procesos.",
+                hint="Configura CACHE_BACKEND/CACHE_LOCATION con Redis o memcached, o REQUIRE_SHARED_CACHE=False "
+                     "si el servidor corre en un solo proceso.",
+                id='volley_back.E001',
+            ))
+    return errors
@@ -0,0 +1,66 @@
+# volley_back/compression.py
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional: pip install brotli
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+# Eventos en vivo (se deben entregar sin esperar a llenar un bloque) y formatos ya comprimidos
+UNCOMPRESSED_CONTENT_TYPES = ('text/event-stream', 'application/vnd.apache.parquet')
+
+
+def _compress_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in sequence:
+        # Cada bloque se envía entero, como hace compress_sequence con gzip
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Comprime las respuestas con brotli o gzip según `Accept-Encoding`
+
+    Brotli (si está instalado) tiene preferencia; si no, se usa GZipMiddleware de Django. Las
+    respuestas SSE y los archivos Parquet se envían sin comprimir.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type in UNCOMPRESSED_CONTENT_TYPES:
+            return response
+        ae = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        # Los iteradores asíncronos siguen con gzip
+        if brotli is None or not re_accepts_brotli.search(ae) or (response.streaming and response.is_async):
+            return super().process_response(request, response)
+
+        if not response.streaming and len(response.content) < 200:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        quality = getattr(settings, 'BROTLI_QUALITY', 5)
+        if response.streaming:
+            response.streaming_content = _compress_sequence(response.streaming_content, quality)
+            del response.headers['Content-Length']
+        else:
+            compressed_content = brotli.compress(response.content, quality=quality)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
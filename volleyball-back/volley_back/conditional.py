@@ -0,0 +1,107 @@
+# volley_back/conditional.py
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+
+MATCHES = 'matches'
+TEAMS = 'teams'
+WEATHER = 'weather'
+
+
+def _store():
+    return caches[getattr(settings, 'RESOURCE_VERSION_CACHE_ALIAS', 'default')]
+
+
+def _version_key(scope):
+    return f"version:{scope}"
+
+
+def match_scopes(match_id):
+    """Un cambio en un partido (o sus sets, puntos, rendimientos o clima) cambia también el listado"""
+    return (MATCHES, f"match:{match_id}")
+
+
+def team_scopes(team_id):
+    return (TEAMS, f"team:{team_id}")
+
+
+def weather_scopes(weather_id):
+    return (WEATHER, f"weather:{weather_id}")
+
+
+def get_versions(scopes):
+    """
+    Versiones actuales de varios ámbitos en una lectura de caché
+
+    Como en statistic/cache.py, la versión es un timestamp en nanosegundos: si la caché pierde
+    una clave, la nueva versión nunca coincide con un ETag ya enviado.
+    """
+    store = _store()
+    keys = [_version_key(scope) for scope in scopes]
+    found = store.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = time.time_ns()
+            if not store.add(key, version, timeout=None):
+                version = store.get(key, version)
+            found[key] = version
+        versions.append(version)
+    return versions
+
+
+def bump_versions(*scopes):
+    """Cambia la versión de los ámbitos cuando se confirma la transacción en curso"""
+    def bump():
+        store = _store()
+        keys = [_version_key(scope) for scope in set(scopes)]
+        current = store.get_many(keys)
+        now = time.time_ns()
+        store.set_many({key: max(now, current.get(key, 0) + 1) for key in keys}, timeout=None)
+    transaction.on_commit(bump)
+
+
+class ConditionalGetMixin:
+    """
+    ETag y `304 Not Modified` para `list` y `retrieve` sin serializar la respuesta
+
+    El ETag se arma con las versiones de `version_scopes()` (ámbitos que se cambian con
+    `bump_versions` al escribir), la URL completa y el formato de salida, así que validar
+    una petición cuesta una lectura de caché y ninguna consulta.
+    """
+
+    def version_scopes(self):
+        """Ámbitos de los que depende la respuesta; `self.object_key()` es None en el listado"""
+        raise NotImplementedError
+
+    def object_key(self):
+        return self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+
+    def get_etag(self, request):
+        versions = '-'.join(str(version) for version in get_versions(self.version_scopes()))
+        path = zlib.crc32(request.get_full_path().encode())
+        return f'"{path:08x}-{versions}-{request.accepted_renderer.format}"'
+
+    def conditional_response(self, request, respond):
+        etag = self.get_etag(request)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        response = respond()
+        if response.status_code == 200:
+            response['ETag'] = etag
+            # Los clientes deben revalidar siempre: el ETag es barato de comprobar
+            response['Cache-Control'] = 'no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
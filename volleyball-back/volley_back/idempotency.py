@@ -0,0 +1,77 @@
+# volley_back/idempotency.py
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def _store():
+    return caches[getattr(settings, 'IDEMPOTENCY_CACHE_ALIAS', 'default')]
+
+
+def _fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def idempotent(view_method):
+    """
+    Respeta la cabecera `Idempotency-Key` en una acción de escritura
+
+    La primera respuesta exitosa se guarda (código y datos) en la caché configurada en
+    `IDEMPOTENCY_CACHE_ALIAS` durante `IDEMPOTENCY_KEY_TTL` segundos; los reintentos con la
+    misma clave reciben esa respuesta sin volver a ejecutar la acción. Sin cabecera la acción
+    se ejecuta normalmente.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        store = _store()
+        ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+        user_id = getattr(request.user, 'pk', None) or 'anon'
+        cache_key = f"idempotency:{user_id}:{request.method}:{request.path}:{key}"
+        fingerprint = _fingerprint(request)
+
+        cached = store.get(cache_key)
+        if cached is not None:
+            if cached['fingerprint'] != fingerprint:
+                return Response(
+                    {"error": "La Idempotency-Key ya se usó con otro contenido"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            response = Response(cached['data'], status=cached['status'])
+            response[REPLAYED_HEADER] = 'true'
+            return response
+
+        # Marca la clave como en curso para que un reintento simultáneo no se ejecute dos veces
+        lock_key = f"{cache_key}:lock"
+        if not store.add(lock_key, True, timeout=60):
+            return Response(
+                {"error": "Ya hay una petición en curso con esta Idempotency-Key"},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            # Solo se guardan los éxitos: un error no escribe nada y puede reintentarse
+            if status.is_success(response.status_code):
+                store.set(cache_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                }, timeout=ttl)
+        finally:
+            store.delete(lock_key)
+        return response
+
+    return wrapper
@@ -0,0 +1,204 @@
+# volley_back/instrumentation.py
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger('volley_back.slow_requests')
+
+# Límites (en segundos) del histograma de latencia
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Mediciones de una petición: consultas, tiempo en base de datos y en serializers"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # `execute_wrapper` de Django: envuelve cada consulta de la conexión
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def duplicated_statements(self, limit=5):
+        return [(sql, count) for sql, count in self.statements.most_common(limit) if count > 1]
+
+
+@contextmanager
+def serializer_timer():
+    """Suma al tiempo de serialización de la petición en curso (si se está midiendo)"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_seconds += time.perf_counter() - started
+
+
+class MetricsRegistry:
+    """Acumulados por endpoint (método + ruta de la URL) de este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._collectors = []
+
+    def record(self, method, route, status_code, seconds, metrics):
+        with self._lock:
+            entry = self._endpoints.setdefault((method, route), {
+                'requests': Counter(),
+                'seconds': 0.0,
+                'buckets': [0] * len(LATENCY_BUCKETS),
+                'queries': 0,
+                'db_seconds': 0.0,
+                'serializer_seconds': 0.0,
+            })
+            entry['requests'][f"{status_code // 100}xx"] += 1
+            entry['seconds'] += seconds
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    entry['buckets'][index] += 1
+            entry['queries'] += metrics.queries
+            entry['db_seconds'] += metrics.db_seconds
+            entry['serializer_seconds'] += metrics.serializer_seconds
+
+    def register_collector(self, collector):
+        """
+        Añade métricas de otras partes de la app a /api/_metrics
+
+        `collector` es una función sin argumentos que devuelve líneas ya en formato Prometheus.
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def render(self):
+        with self._lock:
+            endpoints = {key: {**value, 'requests': Counter(value['requests']), 'buckets': list(value['buckets'])}
+                         for key, value in self._endpoints.items()}
+
+        lines = [
+            '# HELP volley_http_requests_total Peticiones atendidas',
+            '# TYPE volley_http_requests_total counter',
+        ]
+        for (method, route), entry in sorted(endpoints.items()):
+            for status_class, count in sorted(entry['requests'].items()):
+                lines.append(f'volley_http_requests_total{{{_labels(method, route)},status="{status_class}"}} {count}')
+
+        lines += [
+            '# HELP volley_http_request_duration_seconds Latencia total de la petición',
+            '# TYPE volley_http_request_duration_seconds histogram',
+        ]
+        for (method, route), entry in sorted(endpoints.items()):
+            labels = _labels(method, route)
+            for bound, count in zip(LATENCY_BUCKETS, entry['buckets']):
+                lines.append(f'volley_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            total = sum(entry['requests'].values())
+            lines.append(f'volley_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {total}')
+            lines.append(f'volley_http_request_duration_seconds_sum{{{labels}}} {entry["seconds"]:.6f}')
+            lines.append(f'volley_http_request_duration_seconds_count{{{labels}}} {total}')
+
+        for name, key, help_text, kind in (
+                ('volley_db_queries_total', 'queries', 'Consultas SQL ejecutadas', 'counter'),
+                ('volley_db_duration_seconds_total', 'db_seconds', 'Tiempo en base de datos', 'counter'),
+                ('volley_serializer_duration_seconds_total', 'serializer_seconds', 'Tiempo en serializers', 'counter')):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for (method, route), entry in sorted(endpoints.items()):
+                value = entry[key]
+                lines.append(f'{name}{{{_labels(method, route)}}} {value if isinstance(value, int) else f"{value:.6f}"}')
+
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(method, route):
+    return f'method="{_escape(method)}",route="{_escape(route)}"'
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada petición: número de consultas, tiempo en base de datos, en serializers y total
+
+    Las mediciones se envían en la cabecera `Server-Timing`, se acumulan por endpoint para
+    `/api/_metrics` y, si la petición supera `REQUEST_METRICS_SLOW_MS`, se registran en el
+    logger `volley_back.slow_requests` junto con las consultas más repetidas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        seconds = time.perf_counter() - started
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries"',
+            f'serializer;dur={metrics.serializer_seconds * 1000:.1f}',
+            f'total;dur={seconds * 1000:.1f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        registry.record(request.method, route, response.status_code, seconds, metrics)
+
+        slow_ms = getattr(settings, 'REQUEST_METRICS_SLOW_MS', None)
+        if slow_ms is not None and seconds * 1000 >= slow_ms:
+            self.log_slow_request(request, response, seconds, metrics)
+        return response
+
+    def log_slow_request(self, request, response, seconds, metrics):
+        duplicated = '\n'.join(
+            f"  {count}x {sql}" for sql, count in metrics.duplicated_statements()) or '  (ninguna)'
+        logger.warning(
+            "Petición lenta %s %s -> %s en %.1f ms: %s consultas (%.1f ms), serializers %.1f ms\n"
+            "Consultas repetidas:\n%s",
+            request.method, request.get_full_path(), response.status_code, seconds * 1000,
+            metrics.queries, metrics.db_seconds * 1000, metrics.serializer_seconds * 1000, duplicated)
+
+
+def metrics_view(request):
+    """Métricas acumuladas del proceso en formato de texto de Prometheus"""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,96 @@
+# volley_back/pagination.py
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginación por cursor sobre una columna indexada: cada página es `WHERE col > último
+    ORDER BY col LIMIT n`, sin COUNT ni OFFSET, así que cuesta lo mismo a cualquier profundidad
+
+    La columna sale de `cursor_ordering` en la vista (o de `?ordering=` si la vista lo permite).
+    """
+    page_size = 6
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        return super().paginate_queryset(queryset, request, view)
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Paginación por número de página (por defecto) con dos opciones para listados largos
+
+    - `?cursor=` (o `?pagination=cursor` para la primera página): paginación por cursor,
+      constante a cualquier profundidad (ver KeysetPagination)
+    - `?count=false`: páginas numeradas sin el COUNT(*) del total (`count` es null)
+    """
+    page_size = 6
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_class = KeysetPagination
+
+    def __init__(self):
+        self.delegate = None
+        self.skip_count = False
+
+    def wants_cursor(self, request):
+        return 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_cursor(request):
+            self.delegate = self.cursor_class()
+            return self.delegate.paginate_queryset(queryset, request, view)
+        if request.query_params.get('count', '').lower() in ('false', '0'):
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_without_count(self, queryset, request):
+        self.skip_count = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = max(1, int(request.query_params.get(self.page_query_param, 1)))
+        except ValueError:
+            self.page_number = 1
+        offset = (self.page_number - 1) * page_size
+        # Una fila de más indica si hay página siguiente
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        if self.delegate is not None:
+            return self.delegate.get_paginated_response(data)
+        if self.skip_count:
+            return Response(OrderedDict([
+                ('count', None),
+                ('next', self._page_link(self.page_number + 1) if self.has_next else None),
+                ('previous', self._page_link(self.page_number - 1) if self.page_number > 1 else None),
+                ('results', data),
+            ]))
+        return super().get_paginated_response(data)
+
+    def _page_link(self, number):
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, number)
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count']['nullable'] = True
+        return schema
+
+
+class OptionalResultsSetPagination(StandardResultsSetPagination):
+    """Como StandardResultsSetPagination, pero solo pagina si se pide (`page`, `page_size` o cursor)"""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if not (self.wants_cursor(request) or self.page_query_param in params or self.page_size_query_param in params):
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,107 @@
+# volley_back/query_planner.py
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def plan_queryset(queryset, serializer):
+    """
+    Aplica select_related/prefetch_related a un queryset recorriendo el árbol del serializer
+
+    Las relaciones directas (FK / OneToOne) que el serializer anida se resuelven con
+    select_related, y las relaciones inversas o M2M con un Prefetch cuyo queryset se
+    planifica a su vez con el serializer hijo. Así el número de consultas queda fijo
+    sin importar cuántos sets, puntos o jugadores tenga cada partido.
+
+    Args:
+        queryset: QuerySet base del modelo del serializer
+        serializer: Clase o instancia del serializer que se va a renderizar
+    Returns:
+        QuerySet: El queryset con las relaciones precargadas
+    """
+    select, prefetch = plan_relations(serializer, queryset.model)
+    return _apply_plan(queryset, select, prefetch)
+
+
+def plan_relations(serializer, model):
+    """Devuelve las listas (select_related, prefetch_related) que `plan_queryset` aplicaría"""
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    return _plan(serializer, model)
+
+
+def _apply_plan(queryset, select, prefetch):
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class PlannedQuerysetMixin:
+    """Aplica `plan_queryset` con el serializer de la petición en las acciones de lectura"""
+    planned_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.planned_actions:
+            # Se usa la instancia para respetar ?fields=, ?omit= y ?expand=
+            select, prefetch = plan_relations(self.get_serializer(), queryset.model)
+            queryset = self.apply_plan(queryset, select, prefetch)
+        return queryset
+
+    def apply_plan(self, queryset, select, prefetch):
+        """Aplica las relaciones planificadas; una vista puede sobrescribirlo para diferir parte de ellas"""
+        return _apply_plan(queryset, select, prefetch)
+
+
+def _plan(serializer, model, prefix=''):
+    """Devuelve (select_related, prefetch_related) para un serializer sobre `model`"""
+    select, prefetch = [], []
+    # Relaciones que el serializer carga por su cuenta (p. ej. planteles en caché)
+    self_loaded = serializer.self_loaded_fields() if hasattr(serializer, 'self_loaded_fields') else ()
+
+    for name, field in serializer.fields.items():
+        if field.write_only or field.source == '*' or name in self_loaded:
+            continue
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        is_nested = isinstance(nested, serializers.BaseSerializer)
+        current_model = model
+        path = prefix
+
+        for index, attr in enumerate(field.source_attrs):
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # Propiedades, anotaciones o campos calculados: nada que precargar
+                break
+            if not model_field.is_relation:
+                break
+
+            is_last = index == len(field.source_attrs) - 1
+            lookup = path + attr
+            related_model = model_field.related_model
+
+            if model_field.many_to_one or model_field.one_to_one:
+                # Un PrimaryKeyRelatedField solo necesita el <campo>_id
+                if is_last and not is_nested:
+                    break
+                select.append(lookup)
+                current_model = related_model
+                path = lookup + '__'
+                if is_last:
+                    nested_select, nested_prefetch = _plan(nested, related_model, path)
+                    select.extend(nested_select)
+                    prefetch.extend(nested_prefetch)
+            else:
+                if is_last and is_nested:
+                    child_queryset = plan_queryset(related_model._default_manager.all(), nested)
+                    prefetch.append(Prefetch(lookup, queryset=child_queryset))
+                else:
+                    prefetch.append(lookup)
+                break
+
+    return select, prefetch
@@ -0,0 +1,62 @@
+# volley_back/renderers.py
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional: pip install orjson
+    orjson = None
+
+
+def fast_json_enabled():
+    return orjson is not None and getattr(settings, 'FAST_JSON_ENABLED', True)
+
+
+_encoder = JSONEncoder()
+
+
+def _default(value):
+    # Decimal, textos traducibles, timedelta, etc.: mismas conversiones que el JSON de DRF
+    return _encoder.default(value)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer de DRF con orjson para las respuestas compactas
+
+    La salida es equivalente (UTF-8, sin espacios); con `; indent=` en el Accept, o si orjson
+    no está instalado, se usa el renderer de DRF.
+    """
+    # Como el JSONEncoder de DRF: fechas UTC con sufijo "Z" en lugar de "+00:00"
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not fast_json_enabled():
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_default, option=self.options)
+        # Como DRF: U+2028 y U+2029 escapados para poder incrustar la respuesta en JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser de DRF con orjson (mismo rechazo de NaN e Infinity)"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not fast_json_enabled():
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            content = stream.read()
+            if codecs.lookup(encoding).name != 'utf-8':
+                content = content.decode(encoding).encode('utf-8')
+            return orjson.loads(content)
+        except (ValueError, UnicodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,115 @@
+# volley_back/serializers.py
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from .instrumentation import serializer_timer
+
+
+def _parse_param(value):
+    """Convierte 'id,sets.home_team_score' en ['id', 'sets.home_team_score']"""
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _split_paths(paths):
+    """Separa ['a', 'b.c'] en nombres de este nivel ({'a'}, {'b'}) y rutas hijas ({'b': ['c']})"""
+    own, parents, nested = set(), set(), {}
+    for path in paths or []:
+        name, _, rest = path.partition('.')
+        if rest:
+            parents.add(name)
+            nested.setdefault(name, []).append(rest)
+        else:
+            own.add(name)
+    return own, parents, nested
+
+
+class DynamicFieldsMixin:
+    """
+    Recorta o expande la salida de un serializer con ?fields=, ?omit= y ?expand=
+
+    Los campos anidados se indican con punto, por ejemplo
+    `?fields=id,sets.home_team_score&expand=sets.point_events.player`. Solo el serializer
+    raíz lee los parámetros de la petición (y solo en GET); los anidados reciben su parte
+    del árbol desde el padre. Como el árbol de campos queda recortado antes de renderizar,
+    `plan_queryset` deja de precargar las relaciones que no se van a mostrar.
+
+    Las relaciones expandibles se declaran en `Meta.expandable_fields` como
+    `{'campo': (SerializerClass o 'ruta.al.Serializer', {kwargs})}`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._sparse_fields = kwargs.pop('fields', None)
+        self._sparse_omit = kwargs.pop('omit', None)
+        self._sparse_expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def _read_request_options(self):
+        request = self.context.get('request')
+        if request is None or request.method != 'GET' or not self._is_root():
+            return
+        params = request.query_params
+        if self._sparse_fields is None:
+            self._sparse_fields = _parse_param(params.get('fields'))
+        if self._sparse_omit is None:
+            self._sparse_omit = _parse_param(params.get('omit'))
+        if self._sparse_expand is None:
+            self._sparse_expand = _parse_param(params.get('expand'))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        self._read_request_options()
+
+        expand, expand_parents, nested_expand = _split_paths(self._sparse_expand)
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in (expand | expand_parents) & set(expandable):
+            serializer_class, extra_kwargs = expandable[name]
+            if isinstance(serializer_class, str):
+                serializer_class = import_string(serializer_class)
+            fields[name] = serializer_class(read_only=True, **extra_kwargs)
+
+        only, only_parents, nested_fields = _split_paths(self._sparse_fields)
+        if self._sparse_fields is not None:
+            allowed = only | only_parents
+            fields = {name: field for name, field in fields.items() if name in allowed}
+
+        omit, _, nested_omit = _split_paths(self._sparse_omit)
+        fields = {name: field for name, field in fields.items() if name not in omit}
+
+        # Pasar a cada serializer anidado su parte del árbol
+        for name, field in fields.items():
+            target = field.child if isinstance(field, serializers.ListSerializer) else field
+            if not isinstance(target, DynamicFieldsMixin):
+                continue
+            # `?fields=sets` sin subcampos muestra el set completo
+            target._sparse_fields = nested_fields.get(name) if name not in only else None
+            target._sparse_omit = nested_omit.get(name)
+            target._sparse_expand = nested_expand.get(name)
+
+        return fields
+
+    def has_default_shape(self):
+        """Sin recortes ni expansiones: la salida son exactamente los campos de Meta.fields"""
+        self.fields  # En la raíz, las opciones de la petición se leen al construir los campos
+        return self._sparse_fields is None and self._sparse_omit is None and self._sparse_expand is None
+
+    def _represent(self, instance):
+        # `plain_representation(instance)`: versión sin recorrer campos para la forma por defecto
+        plain = getattr(self, 'plain_representation', None)
+        if plain is not None and settings.FAST_SERIALIZERS_ENABLED and self.has_default_shape():
+            return plain(instance)
+        return super().to_representation(instance)
+
+    def to_representation(self, instance):
+        if not self._is_root():
+            return self._represent(instance)
+        # Tiempo de serialización para Server-Timing y /api/_metrics (ver instrumentation.py)
+        with serializer_timer():
+            return self._represent(instance)
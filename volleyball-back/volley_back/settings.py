@@ -53,10 +53,24 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON con orjson si está instalado (ver volley_back/renderers.py); si no, el de DRF
+    'DEFAULT_RENDERER_CLASSES': [
+        'volley_back.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'volley_back.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 MIDDLEWARE = [
+    # Primero, para que la latencia medida incluya al resto de middlewares
+    'volley_back.instrumentation.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # Antes que el resto para comprimir la respuesta final (brotli si está instalado, si no gzip)
+    'volley_back.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -107,6 +121,56 @@ DATABASES = {
 if not all([DATABASES['default']['NAME'], DATABASES['default']['USER'], DATABASES['default']['PASSWORD'], DATABASES['default']['HOST']]):
     raise ValueError("La configuración de la base de datos no está completa en las variables de entorno.")
 
+# Caché
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'volley-back'),
+    }
+}
+
+# Las versiones de los ETag, las claves de idempotencia y las estadísticas deben verse igual desde
+# todos los procesos: sin DEBUG, el chequeo volley_back.E001 rechaza una caché en memoria local
+# (ver volley_back/checks.py). REQUIRE_SHARED_CACHE=False solo si el servidor usa un único proceso
+REQUIRE_SHARED_CACHE = os.getenv('REQUIRE_SHARED_CACHE', str(not DEBUG)).lower() == 'true'
+
+# Respuestas guardadas para la cabecera Idempotency-Key de las acciones de partidos y sets
+IDEMPOTENCY_CACHE_ALIAS = 'default'
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 60 * 60 * 24))
+
+# Respuestas de /api/statistics/ (versionadas; las de partidos finalizados no caducan)
+STATISTICS_CACHE_ALIAS = 'default'
+STATISTICS_CACHE_TTL = 300
+
+# Fragmentos serializados de equipo + plantel que se reutilizan en cada partido; otro alias
+# permite llevarlos a un backend propio (Redis, memcached)
+ROSTER_CACHE_ENABLED = os.getenv('ROSTER_CACHE_ENABLED', 'True').lower() == 'true'
+ROSTER_CACHE_ALIAS = 'default'
+ROSTER_CACHE_TTL = 60 * 60
+
+# Marcador en vivo: broker que reparte los deltas a los espectadores (SSE) y latido en segundos
+LIVE_SCORE_BROKER = os.getenv('LIVE_SCORE_BROKER', 'matches.live.InProcessBroker')
+LIVE_SCORE_HEARTBEAT = 15
+
+# Métricas por petición (Server-Timing y /api/_metrics); las peticiones que tarden más de
+# REQUEST_METRICS_SLOW_MS se registran en el logger `volley_back.slow_requests`
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'True').lower() == 'true'
+REQUEST_METRICS_SLOW_MS = int(os.getenv('REQUEST_METRICS_SLOW_MS', 1000))
+
+# Serialización rápida: orjson en renderer/parser y funciones planas para sets, puntos y
+# rendimientos cuando la petición no recorta ni expande campos
+FAST_JSON_ENABLED = os.getenv('FAST_JSON_ENABLED', 'True').lower() == 'true'
+FAST_SERIALIZERS_ENABLED = os.getenv('FAST_SERIALIZERS_ENABLED', 'True').lower() == 'true'
+
+# Versiones por recurso (partidos, equipos, clima) para los ETag de list/retrieve
+# (ver volley_back/conditional.py); debe ser una caché compartida (REQUIRE_SHARED_CACHE)
+RESOURCE_VERSION_CACHE_ALIAS = 'default'
+
+# Nivel de brotli para respuestas dinámicas (0-11; los altos son lentos)
+BROTLI_QUALITY = 5
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
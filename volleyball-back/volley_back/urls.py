@@ -1,10 +1,12 @@
 # urls.py
 from django.urls import path, include
 from django.contrib import admin
+from .instrumentation import metrics_view
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/_metrics', metrics_view, name='metrics'),
     path('api/auth/', include('users.urls')),
     path('', include('docs.urls')),
     path('api/', include('teams.urls')),
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class WeatherConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'weather'
+
+    def ready(self):
+        # Versiones de clima (y del partido) para los ETag de list/retrieve
+        from . import signals  # noqa: F401
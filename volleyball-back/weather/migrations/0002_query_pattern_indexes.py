@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0016_query_pattern_indexes'),
+        ('weather', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='weather',
+            index=models.Index(fields=['match', '-timestamp'], name='weather_match_latest_idx'),
+        ),
+    ]
@@ -6,5 +6,10 @@ class Weather(models.Model):
     temperature = models.IntegerField()  # Temperatura en grados Celsius
     condition = models.CharField(max_length=50)  # Clear, Cloudy, Rainy, Snowy, Stormy
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['match', '-timestamp'], name='weather_match_latest_idx'),
+        ]
+
     def __str__(self):
         return f"Weather for Match {self.match_id} at {self.timestamp}"
\ No newline at end of file
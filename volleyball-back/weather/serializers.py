@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from .models import Weather
+from volley_back.serializers import DynamicFieldsMixin
 
 
-class WeatherSerializer(serializers.ModelSerializer):
+class WeatherSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Weather
         fields = ['id', 'timestamp', 'temperature', 'condition']
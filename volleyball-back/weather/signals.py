@@ -0,0 +1,13 @@
+# weather/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from volley_back.conditional import bump_versions, match_scopes, weather_scopes
+from .models import Weather
+
+
+@receiver(post_save, sender=Weather)
+@receiver(post_delete, sender=Weather)
+def bump_weather_version(sender, instance, raw=False, **kwargs):
+    # El clima actual va anidado en el partido
+    if not raw:
+        bump_versions(*weather_scopes(instance.pk), *match_scopes(instance.match_id))
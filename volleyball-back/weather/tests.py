@@ -1,3 +1,61 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from matches.models import Match
+from teams.models import Team
+from .models import Weather
 
-# Create your tests here.
+
+class WeatherConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        match = Match.objects.create(
+            home_team=Team.objects.create(name='Local', gender='M'),
+            away_team=Team.objects.create(name='Visita', gender='M'),
+            date=timezone.now(), location='Estadio')
+        self.weather = Weather.objects.create(match=match, temperature=20, condition='Clear')
+        self.url = reverse('weather-detail', args=[self.weather.pk])
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_weather_detail_returns_not_modified_until_updated(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.url, {'temperature': 25}, format='json')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['temperature'], 25)
+
+
+class WeatherPaginationTests(APITestCase):
+
+    def setUp(self):
+        match = Match.objects.create(
+            home_team=Team.objects.create(name='Local', gender='M'),
+            away_team=Team.objects.create(name='Visita', gender='M'),
+            date=timezone.now(), location='Estadio')
+        self.records = [Weather.objects.create(match=match, temperature=20 + i, condition='Clear') for i in range(8)]
+
+    def test_list_without_parameters_is_a_plain_list(self):
+        response = self.client.get(reverse('weather-list'))
+        self.assertEqual([row['id'] for row in response.data], [w.pk for w in reversed(self.records)])
+
+    def test_page_numbers_are_opt_in(self):
+        response = self.client.get(reverse('weather-list'), {'page': 1})
+        self.assertEqual(response.data['count'], 8)
+        self.assertEqual([row['id'] for row in response.data['results']], [w.pk for w in reversed(self.records)][:6])
+
+    def test_cursor_pages_cover_every_record(self):
+        response = self.client.get(reverse('weather-list'), {'pagination': 'cursor', 'page_size': 5})
+        ids = [row['id'] for row in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [row['id'] for row in response.data['results']]
+        self.assertEqual(ids, [w.pk for w in reversed(self.records)])
+        self.assertIsNone(response.data['next'])
@@ -1,13 +1,38 @@
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Weather
 from .serializers import WeatherSerializer
 from matches.models import Match
+from matches.live import publish_live
+from matches.materialized import materialize_match
+from matches.timeline import append_events
+from volley_back.conditional import WEATHER, ConditionalGetMixin, weather_scopes
+from volley_back.pagination import OptionalResultsSetPagination
 
-class WeatherViewSet(viewsets.ModelViewSet):
-    queryset = Weather.objects.all()
+class WeatherViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    # Los registros más recientes primero (el id crece con `timestamp`, que es auto_now_add)
+    queryset = Weather.objects.order_by('-id')
     serializer_class = WeatherSerializer
+    # Paginación opcional (`page`, `page_size` o cursor): sin parámetros sigue siendo una lista
+    pagination_class = OptionalResultsSetPagination
+    cursor_ordering = ('-id',)
+
+    def version_scopes(self):
+        if self.object_key() is None:
+            return [WEATHER]
+        return [weather_scopes(self.object_key())[1]]
+
+    # El clima va dentro de la representación guardada de los partidos finalizados
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        materialize_match(serializer.instance.match_id)
+
+    def perform_destroy(self, instance):
+        match_id = instance.match_id
+        super().perform_destroy(instance)
+        materialize_match(match_id)
 
     @action(detail=False, methods=['POST'])
     def update_match_weather(self, request):
@@ -27,16 +52,27 @@ class WeatherViewSet(viewsets.ModelViewSet):
             return Response({"error": "Match not found"}, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            # Crear nuevo registro de clima
-            weather = Weather.objects.create(
-                match=match,
-                temperature=temperature,
-                condition=condition
-            )
-            
-            # Actualizar el clima actual del partido
-            match.current_weather = weather
-            match.save()
+            with transaction.atomic():
+                # Crear nuevo registro de clima
+                weather = Weather.objects.create(
+                    match=match,
+                    temperature=temperature,
+                    condition=condition
+                )
+                append_events(match, [('weather', {
+                    'temperature': int(weather.temperature),
+                    'condition': weather.condition,
+                })])
+
+                # Actualizar el clima actual del partido
+                match.current_weather = weather
+                match.save()
+                if match.status == 'finished':
+                    materialize_match(match.pk)
+            publish_live(match.pk, 'weather', {
+                'temperature': weather.temperature,
+                'condition': weather.condition,
+            })
             
             # Devolver los datos del nuevo clima creado
             return Response(WeatherSerializer(weather).data)